@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -81,6 +83,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The web server and run_audio_workers write concurrently; wait for locks
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -138,6 +142,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings for API
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'range')  # byte ranges of the binary audio endpoint
+CORS_EXPOSE_HEADERS = ['Content-Range', 'Accept-Ranges']
 
 # REST Framework configuration
 REST_FRAMEWORK = {
@@ -153,3 +159,26 @@ REST_FRAMEWORK = {
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
+
+# Audio processing queue (see application/jobs.py and `manage.py run_audio_workers`)
+AUDIO_JOB_QUEUE_LIMIT = 100  # pending jobs accepted before new ones are rejected
+AUDIO_JOB_MAX_ATTEMPTS = 3
+AUDIO_JOB_RETRY_BACKOFF = 5  # seconds, doubled after every failed attempt
+AUDIO_JOB_DEBOUNCE = 0.5  # seconds an envelope update waits for a newer one to replace it
+AUDIO_JOB_LEASE = 60  # seconds without a worker heartbeat before a running job is requeued
+
+# Dtype of stored envelopes ('float32', or 'float16' to halve the files at ~3 digit precision)
+AUDIO_ENVELOPE_DTYPE = 'float32'
+
+# gzip full binary audio-data responses when the client accepts it (samples compress only ~5-10%)
+AUDIO_BINARY_GZIP = True
+
+# Decoded-audio cache (application/audio_cache.py): in-memory LRU plus memory-mapped .npy files
+AUDIO_CACHE_MAX_BYTES = 256 * 1024 * 1024  # samples kept in memory per process
+AUDIO_CACHE_DIR = BASE_DIR / 'cache' / 'audio'  # None keeps the cache in memory only
+
+# Visualizations are rendered on first request, at one of these widths in pixels
+AUDIO_RENDER_WIDTHS = (400, 800, 1600, 3200)
+
+# Gallery thumbnails: 'webp' (PNG where Pillow has no WebP support) or 'png'
+AUDIO_THUMBNAIL_FORMAT = 'webp'
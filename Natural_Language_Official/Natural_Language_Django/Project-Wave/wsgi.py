@@ -8,6 +8,11 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 """
 
 import os
+import sys
+from pathlib import Path
+
+# envelope_engine.py, shared with the desktop tool, lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
 from django.core.wsgi import get_wsgi_application
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AudioProject
+from .models import Artifact, AudioProject, ProcessingJob
 
 
 @admin.register(AudioProject)
@@ -35,7 +35,22 @@ class AudioProjectAdmin(admin.ModelAdmin):
             'fields': ('is_processing', 'processing_error', 'created_at', 'updated_at')
         }),
         ('Envelope Data', {
-            'fields': ('envelope_data',),
+            'fields': ('envelope_data', 'envelope_file'),
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'project', 'status', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'last_error']
+
+
+@admin.register(Artifact)
+class ArtifactAdmin(admin.ModelAdmin):
+    list_display = ['key', 'kind', 'size', 'reuse_count', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['key']
+    readonly_fields = ['key', 'kind', 'file', 'size', 'reuse_count', 'created_at']
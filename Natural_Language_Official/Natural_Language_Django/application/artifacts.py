@@ -0,0 +1,280 @@
+"""
+Content-addressed store for processing outputs.
+
+Projects with the same inputs produce the same modified WAV and the same
+visualizations. The inputs are the audio source (audio_cache's digest: the
+uploaded file's checksum or the wave type and parameters), the envelope as
+stored, and the colours. inputs_key() hashes them. Each output is written
+once under artifacts/<key>/ with an Artifact row:
+
+- the kinds in KINDS back an AudioProject file field; every project with
+  the key points that field at the same file
+- everything else (the views of renders) is looked up by key alone
+
+A project records the key of its current outputs in inputs_key.
+
+Shared files are never modified: the incremental path only patches files
+that belong to a single project (see is_shared). A file is deleted by
+collect_garbage once no project has its key or points at it.
+"""
+import hashlib
+import json
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+
+from . import audio_cache, envelope_store
+from .models import Artifact, AudioProject
+
+# Bump when processing output changes for the same inputs, so old artifacts are not reused
+ARTIFACT_VERSION = 1
+
+# kind -> (AudioProject file field, file extension) of the outputs processing produces
+KINDS = {
+    'modified': ('modified_file', 'wav'),
+}
+
+# Views rendered by processing before they were rendered on request; projects
+# may still point at such files
+LEGACY_FIELDS = (
+    'final_drawing', 'final_drawing_svg', 'natural_lang', 'natural_lang_svg',
+    'wave_comparison', 'wave_comparison_svg',
+)
+
+
+def storage():
+    return Artifact._meta.get_field('file').storage
+
+
+def inputs_key(project, envelope_digest):
+    """
+    Hash of everything the outputs of processing a project depend on.
+    envelope_digest identifies the applied envelope, or is None when no
+    envelope was applied.
+    """
+    inputs = {
+        'version': ARTIFACT_VERSION,
+        'source': audio_cache.source_digest(project),
+        'colors': [project.background_color, project.positive_color, project.negative_color],
+        'envelope': envelope_digest,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def artifact_path(key, kind, ext):
+    return f'artifacts/{key[:2]}/{key}/{kind}.{ext}'
+
+
+def project_files(project):
+    """{kind: file name} of the outputs a project currently points at"""
+    files = {}
+    for kind, (field, _) in KINDS.items():
+        name = getattr(project, field).name
+        if name:
+            files[kind] = name
+    return files
+
+
+def key_files(key):
+    """File names of every artifact stored under key"""
+    if not key:
+        return []
+    return list(Artifact.objects.filter(key=key).values_list('file', flat=True))
+
+
+def reuse(project, key):
+    """
+    Point the project at an existing complete set of artifacts for key.
+    Returns False, leaving the project untouched, when there is none. The
+    caller saves the project.
+    """
+    artifacts = {a.kind: a for a in Artifact.objects.filter(key=key, kind__in=KINDS)}
+    if len(artifacts) < len(KINDS) or not all(storage().exists(a.file.name) for a in artifacts.values()):
+        return False
+
+    current = project_files(project)
+    with transaction.atomic():
+        for kind, artifact in artifacts.items():
+            setattr(project, KINDS[kind][0], artifact.file.name)
+        AudioProject.objects.filter(id=project.id).update(
+            **{KINDS[kind][0]: artifact.file.name for kind, artifact in artifacts.items()}
+        )
+        # collect_garbage may have removed them between the lookup and the update above
+        if Artifact.objects.filter(id__in=[a.id for a in artifacts.values()]).count() < len(artifacts):
+            transaction.set_rollback(True)
+            for kind in artifacts:
+                setattr(project, KINDS[kind][0], current.get(kind))
+            return False
+        if any(current.get(kind) != artifact.file.name for kind, artifact in artifacts.items()):
+            # only count reuse by another project, not reprocessing one with unchanged inputs
+            Artifact.objects.filter(id__in=[a.id for a in artifacts.values()]).update(
+                reuse_count=F('reuse_count') + 1
+            )
+    return True
+
+
+def lookup(key, kind):
+    """File name of the artifact of key and kind, or None if it is not stored"""
+    existing = Artifact.objects.filter(key=key, kind=kind).first()
+    if existing is not None and storage().exists(existing.file.name):
+        return existing.file.name
+    return None
+
+
+def put(key, kind, ext, data):
+    """
+    Store bytes as the artifact of key and kind unless it exists; returns the
+    file name. When two requests produced the same artifact concurrently,
+    the first row written wins and the other file is deleted again.
+    """
+    name = lookup(key, kind)
+    if name is not None:
+        return name
+
+    name = storage().save(artifact_path(key, kind, ext), ContentFile(data))
+    with transaction.atomic():
+        artifact, created = Artifact.objects.select_for_update().get_or_create(
+            key=key, kind=kind, defaults={'file': name, 'size': len(data)}
+        )
+        if created:
+            return name
+        if not storage().exists(artifact.file.name):
+            # the row outlived its file; ours replaces it
+            artifact.file.name, artifact.size = name, len(data)
+            artifact.save(update_fields=['file', 'size'])
+            return name
+    storage().delete(name)
+    return artifact.file.name
+
+
+def store(project, key, contents):
+    """
+    Store outputs ({kind in KINDS: bytes}) as the artifacts of key and point
+    the project's fields at them. An artifact that already exists for key is
+    used instead of writing the file again. The caller saves the project.
+    """
+    for kind, data in contents.items():
+        field, ext = KINDS[kind]
+        setattr(project, field, put(key, kind, ext, data))
+
+
+def is_shared(project):
+    """Whether another project has this project's inputs or points at any of its outputs"""
+    others = AudioProject.objects.exclude(id=project.id)
+    if project.inputs_key and others.filter(inputs_key=project.inputs_key).exists():
+        return True
+    return any(
+        others.filter(**{KINDS[kind][0]: name}).exists()
+        for kind, name in project_files(project).items()
+    )
+
+
+def rekey(project, key, carry=()):
+    """
+    File the project's outputs under a new key after they were updated in
+    place (incremental processing), moving each file to the new key's path.
+    Outputs from before the store are registered as they are. carry names
+    other artifacts of the project's current key that are still valid for
+    the new one. The caller saves the project.
+    """
+    for kind in carry:
+        artifact = Artifact.objects.filter(key=project.inputs_key, kind=kind).first()
+        if artifact is None or not project.inputs_key or lookup(key, kind) is not None:
+            continue
+        ext = os.path.splitext(artifact.file.name)[1].lstrip('.')
+        artifact.key, artifact.file.name = key, move(artifact.file.name, artifact_path(key, kind, ext))
+        artifact.save(update_fields=['key', 'file'])
+
+    for kind, name in project_files(project).items():
+        artifact = Artifact.objects.filter(file=name).first()
+        if artifact is not None and artifact.key == key:
+            continue
+        existing = Artifact.objects.filter(key=key, kind=kind).first()
+        if existing is not None and storage().exists(existing.file.name):
+            # the new key already has this output; ours is left to collect_garbage
+            setattr(project, KINDS[kind][0], existing.file.name)
+            continue
+
+        new_name = move(name, artifact_path(key, kind, KINDS[kind][1])) if artifact is not None else name
+        Artifact.objects.filter(key=key, kind=kind).delete()
+        if artifact is not None:
+            artifact.key, artifact.file.name = key, new_name
+            artifact.save(update_fields=['key', 'file'])
+        else:
+            Artifact.objects.create(key=key, kind=kind, file=name, size=storage().size(name))
+        setattr(project, KINDS[kind][0], new_name)
+
+
+def move(name, target):
+    """Rename a stored file (same file system); the name is kept where the storage can't"""
+    try:
+        source = storage().path(name)
+        target = storage().get_available_name(target)
+        destination = storage().path(target)
+    except NotImplementedError:
+        return name
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(source, destination)
+    return target
+
+
+def referenced():
+    """Condition: some project has this artifact's key or points at its file"""
+    condition = Q(Exists(AudioProject.objects.filter(inputs_key=OuterRef('key'))))
+    for field in [field for field, _ in KINDS.values()] + list(LEGACY_FIELDS):
+        condition |= Q(Exists(AudioProject.objects.filter(**{field: OuterRef('file')})))
+    return condition
+
+
+def collect_garbage(names=None):
+    """
+    Delete artifacts (rows and files) no project references any more, among
+    the given file names or, without names, all of them. Each row is
+    removed with a single conditional DELETE, so an artifact that a project
+    picks up concurrently is never lost. Returns (artifacts deleted, bytes freed).
+    """
+    candidates = Artifact.objects.all()
+    if names is not None:
+        candidates = candidates.filter(file__in=list(names))
+
+    deleted = freed = 0
+    for artifact in candidates:
+        removed, _ = Artifact.objects.filter(id=artifact.id).exclude(referenced()).delete()
+        if removed:
+            storage().delete(artifact.file.name)
+            deleted += 1
+            freed += artifact.size
+    return deleted, freed
+
+
+def delete_project(project):
+    """Delete a project, its envelope file and whatever artifacts only it referenced"""
+    files = list(project_files(project).values()) + key_files(project.inputs_key)
+    project.delete()
+    envelope_store.delete_envelope(project)
+    return collect_garbage(files)
+
+
+def stats():
+    """How much sharing the store achieves (references count projects by inputs key)"""
+    totals = Artifact.objects.aggregate(count=Count('id'), size=Sum('size'), reuses=Sum('reuse_count'))
+    projects = dict(AudioProject.objects.exclude(inputs_key='').values_list('inputs_key')
+                    .annotate(n=Count('id')))
+    references = referenced_bytes = 0
+    for key, size in Artifact.objects.values_list('key', 'size'):
+        references += projects.get(key, 0)
+        referenced_bytes += projects.get(key, 0) * size
+
+    stored = totals['size'] or 0
+    return {
+        'artifacts': totals['count'],
+        'renders': Artifact.objects.exclude(kind__in=KINDS).count(),
+        'keys': Artifact.objects.values('key').distinct().count(),
+        'stored_bytes': stored,
+        'references': references,
+        'referenced_bytes': referenced_bytes,
+        'saved_bytes': max(0, referenced_bytes - stored),
+        'reuses': totals['reuses'] or 0,
+    }
@@ -0,0 +1,219 @@
+"""
+Cache of decoded, normalized project audio.
+
+Loading a project's audio means reading and normalizing its WAV (or
+generating its wave) on every audio-data request and again for every
+envelope update a worker processes. The result only depends on the source,
+so it is cached as float32 under the project id plus a digest of the
+source: the SHA-256 of the uploaded file, or the wave type and parameters.
+
+There are two tiers:
+
+    memory  per-process LRU of read-only arrays, bounded to
+            AUDIO_CACHE_MAX_BYTES of samples
+    disk    AUDIO_CACHE_DIR/<project id>/<digest>_<sample rate>.npy, opened
+            with np.load(mmap_mode='r') so a process that has not seen the
+            project yet maps the decoded samples instead of decoding again
+            (set AUDIO_CACHE_DIR = None to keep the cache in memory only)
+
+Replacing a file changes its checksum and therefore the key; storing the
+new entry drops the project's older ones, along with any other files kept
+for the old source (derived_path). Cached arrays are read-only, so
+callers that modify audio must work on a copy (dsp.apply_envelope does).
+Counters are per process; stats() reports them for the metrics API.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+# Bump when the decoding or normalization changes so old .npy files are not reused
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (project id, digest) -> (audio, sample rate)
+_bytes = 0
+_checksums = {}  # path -> (size, mtime_ns, sha256), so unchanged files are hashed once
+_counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def max_bytes():
+    return getattr(settings, 'AUDIO_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+def cache_dir():
+    directory = getattr(settings, 'AUDIO_CACHE_DIR', None)
+    return os.fspath(directory) if directory else None
+
+
+def file_checksum(path):
+    """SHA-256 of a file, recomputed only when its size or mtime changes"""
+    stat = os.stat(path)
+    cached = _checksums.get(path)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    _checksums[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def source_digest(project):
+    """Digest of whatever the project's audio is decoded or generated from"""
+    if project.wave_type == 'uploaded' and project.original_file:
+        source = {'file': file_checksum(project.original_file.path)}
+    else:
+        source = {'wave_type': project.wave_type, 'parameters': project.wave_parameters or {}}
+    source['version'] = CACHE_VERSION
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def project_audio(project, decode):
+    """
+    (audio, sample rate) of a project from the cache, calling decode(project)
+    on a miss. The audio is a read-only float32 array.
+    """
+    key = (project.id, source_digest(project))
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            _counters['memory_hits'] += 1
+            return entry
+
+    entry = read_disk(key)
+    if entry is not None:
+        with _lock:
+            _counters['disk_hits'] += 1
+        remember(key, entry)
+        return entry
+
+    audio, sample_rate = decode(project)
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    audio.flags.writeable = False
+    entry = (audio, int(sample_rate))
+    with _lock:
+        _counters['misses'] += 1
+    write_disk(key, entry)
+    remember(key, entry)
+    return entry
+
+
+def remember(key, entry):
+    """Put an entry in the memory tier, dropping stale ones and the least recently used"""
+    global _bytes
+    with _lock:
+        for stale in [k for k in _entries if k[0] == key[0] and k != key]:
+            _bytes -= _entries.pop(stale)[0].nbytes
+        if key in _entries:
+            return
+        _entries[key] = entry
+        _bytes += entry[0].nbytes
+        while _bytes > max_bytes() and len(_entries) > 1:
+            _, (audio, _) = _entries.popitem(last=False)
+            _bytes -= audio.nbytes
+            _counters['evictions'] += 1
+        if _bytes > max_bytes():
+            # a single signal larger than the whole budget is left to the disk tier
+            _entries.clear()
+            _bytes = 0
+
+
+def project_dir(project_id):
+    directory = cache_dir()
+    return os.path.join(directory, str(project_id)) if directory else None
+
+
+def read_disk(key):
+    directory = project_dir(key[0])
+    if directory is None or not os.path.isdir(directory):
+        return None
+    prefix = f'{key[1]}_'
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith('.npy'):
+            try:
+                sample_rate = int(name[len(prefix):-len('.npy')])
+                audio = np.load(os.path.join(directory, name), mmap_mode='r', allow_pickle=False)
+            except (OSError, ValueError):
+                continue
+            return audio, sample_rate
+    return None
+
+
+def write_disk(key, entry):
+    """Write the .npy atomically and remove the project's files for older sources"""
+    directory = project_dir(key[0])
+    if directory is None:
+        return
+    audio, sample_rate = entry
+    name = f'{key[1]}_{sample_rate}.npy'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, audio, allow_pickle=False)
+        os.replace(tmp_path, os.path.join(directory, name))
+        for other in os.listdir(directory):
+            if not other.startswith(f'{key[1]}_') and not other.endswith('.tmp'):
+                os.remove(os.path.join(directory, other))
+    except OSError:
+        pass  # the disk tier is best effort; the entry still lives in memory
+
+
+def derived_path(project, name):
+    """
+    Path for a file derived from the project's current audio source; it is
+    removed together with the cache entry when the source changes. None
+    without a disk tier.
+    """
+    directory = project_dir(project.id)
+    if directory is None:
+        return None
+    return os.path.join(directory, f'{source_digest(project)}_{name}')
+
+
+def invalidate(project_id):
+    """Forget a project's cached audio in this process and on disk"""
+    global _bytes
+    with _lock:
+        for key in [k for k in _entries if k[0] == project_id]:
+            _bytes -= _entries.pop(key)[0].nbytes
+    directory = project_dir(project_id)
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def clear():
+    """Empty the memory tier and reset the counters (the disk tier is kept)"""
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
+        _checksums.clear()
+        for name in _counters:
+            _counters[name] = 0
+
+
+def stats():
+    """Hit/miss counters and the memory tier's size for this process"""
+    with _lock:
+        lookups = sum(_counters[k] for k in ('memory_hits', 'disk_hits', 'misses'))
+        return {
+            **_counters,
+            'hit_rate': (lookups - _counters['misses']) / lookups if lookups else None,
+            'entries': len(_entries),
+            'bytes': _bytes,
+            'max_bytes': max_bytes(),
+            'disk_tier': cache_dir() is not None,
+        }
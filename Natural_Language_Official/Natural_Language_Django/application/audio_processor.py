@@ -1,20 +1,21 @@
-import os
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for Django
-import matplotlib.pyplot as plt
 from scipy.io import wavfile
 from scipy import signal
 import json
 import io
 import base64
-import tempfile
-import time
-import gc  # Add garbage collection
 from django.core.files.base import ContentFile
 from django.conf import settings
+from django.utils import timezone
 from matplotlib.collections import LineCollection
 from matplotlib.colors import ListedColormap, BoundaryNorm
+from matplotlib.figure import Figure
+from . import artifacts, audio_cache, dsp, envelope_store, incremental, renders
+from .renders import DEFAULT_WIDTH, VIEWS
+
+PLOT_DPI = 100  # resolution of the exported PNG visualizations
 
 
 class AudioProcessor:
@@ -73,51 +74,34 @@ class AudioProcessor:
         audio_data = data.astype(float) / np.max(np.abs(data))
         return audio_data, sample_rate
     
+    def load_project_audio(self, project):
+        """
+        Normalized float32 audio and sample rate of a project, through the
+        decoded-audio cache. The array is read-only.
+        """
+        return audio_cache.project_audio(project, self.decode_project_audio)
+    
+    def decode_project_audio(self, project):
+        """Decode the uploaded file or generate the wave of a project (uncached)"""
+        if project.wave_type == 'uploaded' and project.original_file:
+            return self.load_audio_file(project.original_file.path)
+        
+        # Generate custom wave
+        params = project.wave_parameters
+        return self.generate_custom_wave(
+            wave_type=project.wave_type,
+            freq=params.get('freq', 440),
+            spw=params.get('spw', 100),
+            periods=params.get('periods', 10)
+        )
+    
     def apply_envelope(self, audio_data, envelope_pos, envelope_neg):
         """Apply envelope modifications to audio data"""
-        adjusted = np.copy(audio_data)
-        for i in range(len(adjusted)):
-            if adjusted[i] > 0:
-                adjusted[i] = envelope_pos[i] if i < len(envelope_pos) else adjusted[i]
-            elif adjusted[i] < 0:
-                adjusted[i] = envelope_neg[i] if i < len(envelope_neg) else adjusted[i]
-        return adjusted
+        return dsp.apply_envelope(audio_data, envelope_pos, envelope_neg)
     
     def strict_sign_subdivision(self, x, y):
         """Create strict sign-based subdivision for coloring"""
-        new_x = []
-        new_y = []
-        color_val = []
-        
-        n = len(x)
-        if n == 0:
-            return np.array([]), np.array([]), np.array([])
-        
-        def sign_color(val):
-            return 0 if val < 0 else 1
-        
-        for i in range(n - 1):
-            xi, yi = x[i], y[i]
-            xip1, yip1 = x[i + 1], y[i + 1]
-            
-            new_x.append(xi)
-            new_y.append(yi)
-            color_val.append(sign_color(yi))
-            
-            if (yi < 0 and yip1 >= 0) or (yi >= 0 and yip1 < 0):
-                dy = yip1 - yi
-                t = (0 - yi) / dy if abs(dy) > 1e-12 else 0.5
-                x_cross = xi + t * (xip1 - xi)
-                crossing_color = 1 if (yi < 0 and yip1 >= 0) else 0
-                new_x.append(x_cross)
-                new_y.append(0.0)
-                color_val.append(crossing_color)
-        
-        new_x.append(x[-1])
-        new_y.append(y[-1])
-        color_val.append(sign_color(y[-1]))
-        
-        return np.array(new_x), np.array(new_y), np.array(color_val)
+        return dsp.strict_sign_subdivision(x, y)
     
     def plot_strict_sign_colored_line(self, ax, xdata, ydata, neg_color, pos_color, linewidth=2):
         """Plot line with strict sign-based coloring"""
@@ -132,268 +116,220 @@ class AudioProcessor:
         ax.add_collection(lc)
         return lc
     
-    def create_visualization(self, audio_data, sample_rate, bg_color, pos_color, neg_color, 
-                           viz_type='final', modified_data=None, envelope_pos=None, envelope_neg=None):
-        """Create different types of visualizations"""
+    def plot_width_pixels(self, fig, ax):
+        """Width of the plot area in pixels at the PNG export resolution"""
+        return max(1, int(round(ax.get_position().width * fig.get_figwidth() * PLOT_DPI)))
+    
+    def plot_height_pixels(self, fig, ax):
+        """Height of the plot area in pixels at the PNG export resolution"""
+        return max(1, int(round(ax.get_position().height * fig.get_figheight() * PLOT_DPI)))
+    
+    def new_figure(self, bg_color, max_amp, num_points, width=DEFAULT_WIDTH):
+        """
+        Create the shared 16:3 figure (16x3 inches at the default width in
+        pixels) and axes with everything that does not change per view
+        """
+        # Figure objects (not pyplot) so figures can be rendered from several threads
+        fig = Figure(figsize=(width / PLOT_DPI, width * 3 / 16 / PLOT_DPI), facecolor=bg_color)
+        ax = fig.add_subplot(1, 1, 1)
+        fig.subplots_adjust(left=0.06, right=0.98, top=0.95, bottom=0.05)
+        ax.set_facecolor(bg_color)
         
-        # Create figure with proper cleanup
-        fig = None
-        try:
-            fig, ax = plt.subplots(1, 1, figsize=(16, 3), facecolor=bg_color)
-            fig.subplots_adjust(left=0.06, right=0.98, top=0.95, bottom=0.05)
-            ax.set_facecolor(bg_color)
-            
-            num_points = len(audio_data)
-            max_amp = np.max(np.abs(audio_data))
-            margin = 0.1 * max_amp
-            
-            if viz_type == 'final':
-                # Show original faint and envelope drawing
-                ax.plot(audio_data, color=pos_color, alpha=0.15, lw=1)
-                if envelope_pos is not None and envelope_neg is not None:
-                    ax.plot(np.arange(num_points), envelope_pos, color=pos_color, lw=2, label="Positive")
-                    ax.plot(np.arange(num_points), envelope_neg, color=neg_color, lw=2, label="Negative")
-            
-            elif viz_type == 'natural':
-                # Show modified wave with strict sign coloring
-                if modified_data is not None:
-                    xdata = np.arange(len(modified_data))
-                    self.plot_strict_sign_colored_line(ax, xdata, modified_data, neg_color, pos_color, linewidth=2)
-            
-            elif viz_type == 'comparison':
-                # Show original vs modified
-                ax.plot(audio_data, lw=2, color=neg_color, alpha=0.6, label="Original Wave")
-                if modified_data is not None:
-                    ax.plot(modified_data, lw=2, color=pos_color, alpha=0.8, label="Modified Wave")
-            
-            ax.set_xlim(0, num_points)
-            ax.set_ylim(-max_amp - margin, max_amp + margin)
-            ax.tick_params(axis="both", colors="gray")
-            for spine in ax.spines.values():
-                spine.set_color("gray")
-            
-            if viz_type in ['final', 'comparison']:
-                ax.legend(loc="upper right").get_frame().set_alpha(0.5)
-            
-            ax.set_aspect("auto")
-            
-            # Save to bytes with proper buffer handling
-            png_buffer = io.BytesIO()
-            svg_buffer = io.BytesIO()
-            
+        margin = 0.1 * max_amp
+        ax.set_xlim(0, num_points)
+        ax.set_ylim(-max_amp - margin, max_amp + margin)
+        ax.tick_params(axis="both", colors="gray")
+        for spine in ax.spines.values():
+            spine.set_color("gray")
+        ax.set_aspect("auto")
+        return fig, ax
+    
+    def draw_view(self, ax, viz_type, series, pos_color, neg_color):
+        """Add the artists of one view; series holds the decimated (x, y) pairs"""
+        if viz_type == 'final':
+            # Show original faint and envelope drawing
+            ax.plot(*series['audio'], color=pos_color, alpha=0.15, lw=1)
+            if series.get('envelope_pos') is not None and series.get('envelope_neg') is not None:
+                ax.plot(*series['envelope_pos'], color=pos_color, lw=2, label="Positive")
+                ax.plot(*series['envelope_neg'], color=neg_color, lw=2, label="Negative")
+        
+        elif viz_type == 'natural':
+            # Show modified wave with strict sign coloring (crossings are
+            # interpolated between the kept extremes, so colours survive)
+            if series.get('modified') is not None:
+                self.plot_strict_sign_colored_line(ax, *series['modified'], neg_color, pos_color, linewidth=2)
+        
+        elif viz_type == 'comparison':
+            # Show original vs modified
+            ax.plot(*series['audio'], lw=2, color=neg_color, alpha=0.6, label="Original Wave")
+            if series.get('modified') is not None:
+                ax.plot(*series['modified'], lw=2, color=pos_color, alpha=0.8, label="Modified Wave")
+        
+        if viz_type in ['final', 'comparison']:
+            ax.legend(loc="upper right").get_frame().set_alpha(0.5)
+    
+    def export_view(self, fig, ax, bg_color, formats=('png', 'svg')):
+        """Render the current view to PNG and clean (axis-less) SVG bytes, in the order of formats"""
+        out = []
+        for fmt in formats:
+            buffer = io.BytesIO()
             try:
-                # Save PNG
-                fig.savefig(png_buffer, format='png', facecolor=bg_color, dpi=100, bbox_inches='tight')
-                png_buffer.seek(0)
-                png_data = png_buffer.getvalue()
-                
-                # Save SVG version
-                ax.set_axis_off()
-                fig.savefig(svg_buffer, format="svg", transparent=True, bbox_inches="tight", pad_inches=0)
-                svg_buffer.seek(0)
-                svg_data = svg_buffer.getvalue()
-                
-                return png_data, svg_data
-                
+                if fmt == 'svg':
+                    ax.set_axis_off()
+                    fig.savefig(buffer, format="svg", transparent=True, bbox_inches="tight", pad_inches=0)
+                else:
+                    ax.set_axis_on()
+                    fig.savefig(buffer, format=fmt, facecolor=bg_color, dpi=PLOT_DPI, bbox_inches='tight')
+                out.append(buffer.getvalue())
             finally:
-                png_buffer.close()
-                svg_buffer.close()
-                
-        except Exception as e:
-            raise Exception(f"Error creating visualization: {str(e)}")
+                buffer.close()
+        return tuple(out)
+    
+    def export_thumbnail(self, fig, ax, bg_color, fmt):
+        """Render the current view as a bare raster image (no axes, legend or margins)"""
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        ax.set_axis_off()
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, format=fmt, facecolor=bg_color, dpi=PLOT_DPI, bbox_inches='tight', pad_inches=0)
+            return buffer.getvalue()
         finally:
-            # Ensure matplotlib figure is properly closed
-            if fig is not None:
-                plt.close(fig)
+            buffer.close()
+    
+    def render_project_view(self, project, view, fmt, width=DEFAULT_WIDTH):
+        """
+        Draw one view of a processed project in one format, from its audio,
+        its modified WAV and its stored envelope. Returns the file contents.
+        The thumbnail view is the final view without axes or legend.
+        """
+        audio_data, _ = self.load_project_audio(project)
+        num_points = len(audio_data)
+        max_amp = np.max(np.abs(audio_data))
+        fig, ax = self.new_figure(project.background_color, max_amp, num_points, width)
+        n_bins = self.plot_width_pixels(fig, ax)
+        
+        envelope_pos, envelope_neg = project.load_envelope() or (dsp.empty_keypoints(), dsp.empty_keypoints())
+        series = {
+            'audio': dsp.minmax_decimate(audio_data, n_bins),
+            'modified': self.modified_series(project, n_bins),
+            'envelope_pos': dsp.keypoint_polyline(envelope_pos, num_points),
+            'envelope_neg': dsp.keypoint_polyline(envelope_neg, num_points),
+        }
+        if view == renders.THUMBNAIL:
+            self.draw_view(ax, 'final', series, project.positive_color, project.negative_color)
+            return self.export_thumbnail(fig, ax, project.background_color, fmt)
+        self.draw_view(ax, view, series, project.positive_color, project.negative_color)
+        return self.export_view(fig, ax, project.background_color, formats=(fmt,))[0]
+    
+    def modified_series(self, project, n_bins):
+        """Min/max decimated samples of the project's modified WAV, scaled back to [-1, 1]"""
+        _, pcm = wavfile.read(project.modified_file.path, mmap=True)
+        x, y = dsp.minmax_decimate(pcm, n_bins)
+        return x, np.asarray(y, dtype=float) / 32767
     
     def save_audio_file(self, audio_data, sample_rate):
         """Save audio data to WAV format in memory"""
-        import tempfile
-        import time
-        import gc
-        
-        # Create a temporary file path for wavfile.write
-        temp_file_path = None
-        temp_fd = None
         try:
-            # Create temporary file with proper cleanup
-            temp_fd, temp_file_path = tempfile.mkstemp(suffix='.wav')
-            
-            # Close the file descriptor immediately to avoid locking issues
-            os.close(temp_fd)
-            temp_fd = None
-            
-            # Ensure audio data is properly scaled and typed
-            audio_int16 = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
-            
-            # Write audio data to the temporary file
-            wavfile.write(temp_file_path, sample_rate, audio_int16)
-            
-            # Force garbage collection to ensure file handles are freed
-            gc.collect()
-            
-            # Small delay to ensure Windows releases file handles
-            time.sleep(0.05)
-            
-            # Read the file back into memory
-            buffer = io.BytesIO()
-            max_read_attempts = 3
-            
-            for attempt in range(max_read_attempts):
-                try:
-                    with open(temp_file_path, 'rb') as f:
-                        buffer.write(f.read())
-                    break
-                except PermissionError:
-                    if attempt < max_read_attempts - 1:
-                        time.sleep(0.1)
-                        gc.collect()
-                    else:
-                        raise
-            
-            buffer.seek(0)
-            return buffer.getvalue()
-                
+            return dsp.encode_wav_int16(audio_data, sample_rate)
         except Exception as e:
             raise Exception(f"Error saving audio file: {str(e)}")
-        finally:
-            # Ensure file descriptor is closed if still open
-            if temp_fd is not None:
-                try:
-                    os.close(temp_fd)
-                except:
-                    pass
-                    
-            # Clean up temp file with retry logic for Windows
-            if temp_file_path and os.path.exists(temp_file_path):
-                max_retries = 10
-                for attempt in range(max_retries):
-                    try:
-                        # Force garbage collection before deletion attempt
-                        gc.collect()
-                        time.sleep(0.02 * (attempt + 1))  # Progressive delay
-                        os.unlink(temp_file_path)
-                        break
-                    except (PermissionError, OSError):
-                        if attempt < max_retries - 1:
-                            continue
-                        else:
-                            # If we can't delete after all retries, log it but don't fail
-                            print(f"Warning: Could not delete temporary file {temp_file_path}")
-                            pass
     
-    def process_audio_project(self, project, envelope_data=None):
-        """Process complete audio project similar to original script"""
+    def process_audio_project(self, project, envelope_data=None, dirty_range=None):
+        """
+        Process complete audio project similar to original script: produce
+        the modified WAV; views are rendered when first requested (renders).
+        Outputs are shared through the artifact store: a project whose inputs
+        were processed before just points at the stored results. An envelope
+        update with a dirty_range (start, end) is applied to the changed
+        samples only when the stored results allow it (see incremental).
+        """
         try:
+            first_run = not project.inputs_key
             project.is_processing = True
             project.processing_error = ""
             project.save()
+            previous_files = (list(artifacts.project_files(project).values())
+                              + artifacts.key_files(project.inputs_key))
             
             # Load or generate audio
-            if project.wave_type == 'uploaded' and project.original_file:
-                audio_data, sample_rate = self.load_audio_file(project.original_file.path)
-            else:
-                # Generate custom wave
-                params = project.wave_parameters
-                audio_data, sample_rate = self.generate_custom_wave(
-                    wave_type=project.wave_type,
-                    freq=params.get('freq', 440),
-                    spw=params.get('spw', 100),
-                    periods=params.get('periods', 10)
-                )
+            audio_data, sample_rate = self.load_project_audio(project)
+            colors = (project.background_color, project.positive_color, project.negative_color)
             
-            # Apply envelope if provided
-            modified_data = audio_data.copy()
-            envelope_pos = np.zeros(len(audio_data))
-            envelope_neg = np.zeros(len(audio_data))
+            # Apply envelope if provided (keypoints are expanded only inside the apply step);
+            # apply_envelope returns a new array, the cached audio is never written to
+            modified_data = audio_data
+            envelope_pos = envelope_neg = dsp.empty_keypoints()
+            envelope_digest = None
             
             if envelope_data:
-                envelope_pos_list = envelope_data.get('positive', [])
-                envelope_neg_list = envelope_data.get('negative', [])
-                
-                # Ensure envelope arrays match audio data length
-                if envelope_pos_list:
-                    envelope_pos = np.array(envelope_pos_list[:len(audio_data)])
-                    if len(envelope_pos) < len(audio_data):
-                        envelope_pos = np.pad(envelope_pos, (0, len(audio_data) - len(envelope_pos)), 'constant')
+                envelope_pos, envelope_neg, _ = envelope_store.parse_envelope_payload(envelope_data)
+                # apply the envelope exactly as it is stored, so later edits can be diffed against it
+                envelope_pos = envelope_store.round_to_storage(envelope_pos)
+                envelope_neg = envelope_store.round_to_storage(envelope_neg)
+                envelope_digest = incremental.envelope_digest(envelope_pos, envelope_neg)
+            
+            key = artifacts.inputs_key(project, envelope_digest)
+            message = "Processing completed successfully"
+            
+            state = None
+            reused, edited = artifacts.reuse(project, key), False
+            if reused:
+                incremental.discard_state(project)
+                message += " (reused stored results)"
+            elif envelope_data and dirty_range is not None:
+                try:
+                    state, message = self.process_envelope_edit(
+                        project, audio_data, sample_rate, envelope_pos, envelope_neg, dirty_range, colors, key
+                    )
+                    edited = True
+                except incremental.NotIncremental:
+                    pass  # process in full below
+            
+            if not (reused or edited):
+                if envelope_data:
+                    modified_data = dsp.apply_envelope_keypoints(audio_data, envelope_pos, envelope_neg)
+                incremental.discard_state(project)
                 
-                if envelope_neg_list:
-                    envelope_neg = np.array(envelope_neg_list[:len(audio_data)])
-                    if len(envelope_neg) < len(audio_data):
-                        envelope_neg = np.pad(envelope_neg, (0, len(audio_data) - len(envelope_neg)), 'constant')
+                # Column extremes of the default-width views, so an incremental
+                # update can tell which stored renders it leaves valid
+                fig, ax = self.new_figure(colors[0], np.max(np.abs(audio_data)), len(audio_data))
+                state = incremental.build_state(
+                    audio_data, sample_rate, modified_data, envelope_pos, envelope_neg, colors,
+                    self.plot_width_pixels(fig, ax), self.plot_height_pixels(fig, ax), bool(envelope_data)
+                )
                 
-                modified_data = self.apply_envelope(audio_data, envelope_pos, envelope_neg)
-            
-            # Save modified audio
-            audio_bytes = self.save_audio_file(modified_data, sample_rate)
-            project.modified_file.save(
-                f'modified_{project.name}_{project.id}.wav',
-                ContentFile(audio_bytes),
-                save=False
-            )
-            
-            # Create visualizations
-            colors = (project.background_color, project.positive_color, project.negative_color)
-            
-            # Final drawing
-            final_png, final_svg = self.create_visualization(
-                audio_data, sample_rate, *colors, 'final', modified_data, envelope_pos, envelope_neg
-            )
-            project.final_drawing.save(
-                f'final_{project.name}_{project.id}.png', 
-                ContentFile(final_png), 
-                save=False
-            )
-            project.final_drawing_svg.save(
-                f'final_{project.name}_{project.id}.svg', 
-                ContentFile(final_svg), 
-                save=False
-            )
-            
-            # Natural language visualization
-            natural_png, natural_svg = self.create_visualization(
-                audio_data, sample_rate, *colors, 'natural', modified_data
-            )
-            project.natural_lang.save(
-                f'natural_{project.name}_{project.id}.png', 
-                ContentFile(natural_png), 
-                save=False
-            )
-            project.natural_lang_svg.save(
-                f'natural_{project.name}_{project.id}.svg', 
-                ContentFile(natural_svg), 
-                save=False
-            )
-            
-            # Wave comparison
-            comp_png, comp_svg = self.create_visualization(
-                audio_data, sample_rate, *colors, 'comparison', modified_data
-            )
-            project.wave_comparison.save(
-                f'comparison_{project.name}_{project.id}.png', 
-                ContentFile(comp_png), 
-                save=False
-            )
-            project.wave_comparison_svg.save(
-                f'comparison_{project.name}_{project.id}.svg', 
-                ContentFile(comp_svg), 
-                save=False
-            )
+                # Modified audio, stored once per set of inputs
+                artifacts.store(project, key, {'modified': self.save_audio_file(modified_data, sample_rate)})
             
             # Save envelope data
-            project.envelope_data = {
-                'positive': envelope_pos.tolist(),
-                'negative': envelope_neg.tolist()
-            }
+            project.store_envelope(envelope_pos, envelope_neg, len(audio_data))
+            
+            # Views rendered by processing before are replaced by renders of the new inputs
+            for field in artifacts.LEGACY_FIELDS:
+                setattr(project, field, None)
+            if project.inputs_key != key:
+                project.inputs_key = key
+                project.inputs_changed_at = timezone.now()
             
             project.is_processing = False
             project.processing_error = ""
             project.save()
+            artifacts.collect_garbage(previous_files)
             
-            # Force garbage collection to help with file cleanup
-            gc.collect()
+            if state is not None:
+                state['wav_name'] = project.modified_file.name
+                incremental.save_state(project, state)
             
-            return True, "Processing completed successfully"
+            # A new project's gallery thumbnail is drawn right away; every other
+            # view, and the thumbnail of later inputs, is rendered on request
+            if first_run:
+                try:
+                    renders.render_thumbnail(project)
+                except Exception as e:
+                    print(f"Thumbnail error (rendered on request instead): {e}")
+            
+            return True, message
             
         except Exception as e:
             import traceback
@@ -404,7 +340,62 @@ class AudioProcessor:
             project.processing_error = str(e)
             project.save()
             
-            # Force garbage collection even on error
-            gc.collect()
-            
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+    
+    def process_envelope_edit(self, project, audio_data, sample_rate, envelope_pos, envelope_neg,
+                              dirty_range, colors, key):
+        """
+        Apply an envelope edit to the samples it changes: patch them into the
+        project's WAV in place and file it under the new inputs key, together
+        with the stored renders of the views whose pixels did not change.
+        Raises incremental.NotIncremental when the stored results can't be
+        patched, including when other projects share them; returns the
+        updated render state and the outcome message otherwise (the caller
+        saves the project).
+        """
+        length = len(audio_data)
+        state, (stored_pos, stored_neg) = incremental.load_state(project, colors, length, sample_rate)
+        if artifacts.is_shared(project):
+            raise incremental.NotIncremental('Results are shared with other projects')
+        
+        # The client's range, widened to wherever the envelopes really differ
+        ranges = [
+            dsp.keypoints_changed_range(stored_pos, envelope_pos, length),
+            dsp.keypoints_changed_range(stored_neg, envelope_neg, length),
+        ]
+        start, end = max(0, dirty_range[0]), min(length, dirty_range[1])
+        if start < end:
+            ranges.append((start, end))
+        ranges = [r for r in ranges if r is not None]
+        if not ranges:
+            return state, "Processing completed successfully (envelope unchanged)"
+        
+        # Whole plot columns, so their extremes can be recomputed exactly
+        bin_size = state['bin_size']
+        first_bin = min(r[0] for r in ranges) // bin_size
+        last_bin = -(-max(r[1] for r in ranges) // bin_size)
+        start, end = first_bin * bin_size, min(last_bin * bin_size, length)
+        
+        incremental.discard_state(project)
+        modified_slice = dsp.apply_envelope_keypoints(
+            audio_data[start:end], envelope_pos, envelope_neg, start=start
+        )
+        try:
+            with project.modified_file.open('r+b') as f:
+                dsp.patch_wav_int16(f, start, modified_slice, sample_rate, length)
+        except (ValueError, NotImplementedError) as e:
+            raise incremental.NotIncremental(str(e))
+        
+        # The state covers the default width only; renders at other widths are dropped
+        views = incremental.update_state(state, modified_slice, first_bin, last_bin, envelope_pos, envelope_neg)
+        unchanged = [
+            renders.render_kind(view, fmt, DEFAULT_WIDTH)
+            for view in VIEWS if view not in views
+            for fmt in renders.FORMATS
+        ]
+        if not views:
+            unchanged.append(renders.thumbnail_kind())  # nothing moved by a pixel, even at full size
+        artifacts.rekey(project, key, carry=unchanged)
+        
+        stale = ', '.join(views) if views else 'none'
+        return state, f"Processing completed successfully (samples {start}-{end} updated, stale views: {stale})"
@@ -0,0 +1,155 @@
+"""
+Binary wire format for the visualizer's audio data.
+
+    offset 0   b'NLAB'                    magic
+    offset 4   uint32 little-endian       header length H
+    offset 8   H bytes of UTF-8 JSON      header, space padded so the samples
+                                          start on an 8-byte boundary
+    offset 8+H samples                    float32 LE, or int16 LE PCM
+
+The header carries sample_rate, length, dtype, data_offset and the envelope
+in keypoint form, so a client can view the rest of the buffer directly as a
+Float32Array / Int16Array. The body is served from a header bytes object and
+a memoryview of the samples, so byte ranges and streaming never copy the
+whole signal.
+"""
+import json
+import re
+import struct
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+MAGIC = b'NLAB'
+VERSION = 1
+DTYPES = ('float32', 'int16')
+PREFIX_SIZE = 8
+ALIGNMENT = 8
+CHUNK_SIZE = 1 << 20
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def encode_audio_payload(audio_data, sample_rate, envelope=None, dtype='float32'):
+    """Returns (header bytes, memoryview of the sample bytes)"""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+    if dtype == 'int16':
+        samples = (np.clip(audio_data, -1.0, 1.0) * 32767).astype('<i2')
+    else:
+        samples = np.ascontiguousarray(audio_data, dtype='<f4')
+
+    header = {
+        'version': VERSION,
+        'dtype': dtype,
+        'sample_rate': int(sample_rate),
+        'length': len(samples),
+        'envelope': envelope,
+    }
+    if dtype == 'int16':
+        header['scale'] = 1 / 32767
+
+    # data_offset depends on the header's own length; pad until it is stable
+    header['data_offset'] = 0
+    while True:
+        text = json.dumps(header, separators=(',', ':')).encode()
+        data_offset = -(-(PREFIX_SIZE + len(text)) // ALIGNMENT) * ALIGNMENT
+        if header['data_offset'] == data_offset:
+            break
+        header['data_offset'] = data_offset
+    text = text.ljust(data_offset - PREFIX_SIZE, b' ')
+
+    prefix = MAGIC + struct.pack('<I', len(text))
+    return prefix + text, memoryview(samples).cast('B')
+
+
+def payload_size(header, data):
+    return len(header) + len(data)
+
+
+def parse_byte_range(range_header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, or None to serve the
+    whole body (no header, or a form we don't support such as multiple
+    ranges, or an invalid range-spec like bytes=5-3, which RFC 9110 says to
+    ignore). Raises ValueError when a valid range cannot be satisfied.
+    """
+    if not range_header:
+        return None
+    match = RANGE_RE.match(range_header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Range not satisfiable')
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def read_range(header, data, start, end):
+    """Bytes start..end (inclusive) of the payload"""
+    stop = end + 1
+    parts = []
+    if start < len(header):
+        parts.append(header[start:min(stop, len(header))])
+    if stop > len(header):
+        parts.append(data[max(0, start - len(header)):stop - len(header)].tobytes())
+    return b''.join(parts)
+
+
+def iter_payload(header, data, chunk_size=CHUNK_SIZE):
+    """The payload in chunks, for a streaming response"""
+    yield header
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size].tobytes()
+
+
+def iter_gzip_payload(header, data, chunk_size=CHUNK_SIZE, level=1):
+    """The payload gzip-compressed on the fly (level 1: audio barely compresses further)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in iter_payload(header, data, chunk_size):
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def gzip_enabled():
+    # Raw samples only shrink by ~5-10%; on fast links the CPU time may not pay off
+    return getattr(settings, 'AUDIO_BINARY_GZIP', True)
+
+
+def accepts_gzip(request):
+    """
+    Whether Accept-Encoding allows gzip: listed (or covered by '*') with a
+    q-value above 0. An explicit gzip entry overrides '*'.
+    """
+    qvalues = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            qvalues[coding.lower()] = q
+    q = qvalues.get('gzip', qvalues.get('x-gzip', qvalues.get('*', 0.0)))
+    return q > 0
@@ -0,0 +1,224 @@
+"""
+Vectorized signal helpers shared by the audio processor.
+
+Everything here is plain NumPy (no Django, no matplotlib) so it can be used
+from views, background workers and benchmarks alike.
+"""
+import io
+import struct
+
+import numpy as np
+
+# NumPy-only engine shared with the desktop tool (repository root)
+from envelope_engine import (  # noqa: F401
+    KEYPOINT_TOLERANCE, Keypoints, apply_envelope, dense_to_keypoints, strict_sign_subdivision,
+)
+
+
+def minmax_bin_size(n, n_bins):
+    """Samples per bin minmax_decimate uses for n samples (1 when it keeps them all)"""
+    if n_bins <= 0 or n <= 2 * n_bins:
+        return 1
+    return -(-n // n_bins)
+
+
+def minmax_bins(y, bin_size, start=0):
+    """
+    Index of the minimum and of the maximum of every run of bin_size samples
+    of y (the last run may be shorter). start is the offset of y in the full
+    signal, so a slice beginning on a bin boundary gives the same indices as
+    the whole signal would for those bins.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    n_full = n // bin_size
+    body = y[:n_full * bin_size].reshape(n_full, bin_size)
+    starts = start + np.arange(n_full) * bin_size
+    lo = starts + body.argmin(axis=1)
+    hi = starts + body.argmax(axis=1)
+    if n_full * bin_size < n:
+        tail_start = n_full * bin_size
+        tail = y[tail_start:]
+        lo = np.append(lo, start + tail_start + tail.argmin())
+        hi = np.append(hi, start + tail_start + tail.argmax())
+    return lo, hi
+
+
+def minmax_order(lo, hi):
+    """
+    Per-bin extremes as one index sequence in sample order; a flat bin has its
+    min and max on the same sample and contributes it once.
+    """
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+    idx = np.column_stack([first, second]).ravel()
+    keep = np.ones(len(idx), dtype=bool)
+    keep[1::2] = first != second
+    return idx[keep]
+
+
+def minmax_decimate(y, n_bins, x=None):
+    """
+    Peak-preserving decimation for plotting: split y into n_bins equal runs and
+    keep only the minimum and maximum sample of each, in their original order.
+    A line through the result draws the same envelope at n_bins horizontal
+    pixels, and signs (hence zero-crossing colours) of the extremes survive.
+
+    Returns (x, y) with at most 2 * n_bins points; short inputs come back as is.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    x = np.arange(n) if x is None else np.asarray(x)
+    bin_size = minmax_bin_size(n, n_bins)
+    if bin_size == 1:
+        return x, y
+
+    idx = minmax_order(*minmax_bins(y, bin_size))
+    return x[idx], y[idx]
+
+
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+
+def to_pcm16(audio_data):
+    """Float samples in [-1, 1] as little-endian int16, clipping anything outside"""
+    return (np.clip(audio_data, -1.0, 1.0) * 32767).astype('<i2')
+
+
+def encode_wav_int16(audio_data, sample_rate, channels=1):
+    """
+    Encode float samples in [-1, 1] as a 16-bit PCM WAV file, entirely in
+    memory: the 44-byte RIFF header followed by the little-endian int16 data.
+    Samples outside [-1, 1] are clipped. Returns the file contents as bytes.
+    """
+    pcm = to_pcm16(audio_data)
+    data_size = pcm.nbytes
+    block_align = channels * 2
+
+    buffer = io.BytesIO()
+    buffer.write(WAV_HEADER.pack(
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, int(sample_rate), int(sample_rate) * block_align, block_align, 16,
+        b'data', data_size,
+    ))
+    buffer.write(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def patch_wav_int16(fileobj, start, audio_data, sample_rate, length):
+    """
+    Overwrite samples start.. of a mono WAV written by encode_wav_int16, in
+    place, through a file object opened 'r+b'. Raises ValueError unless the
+    file is exactly such a WAV of `length` samples at sample_rate.
+    """
+    fileobj.seek(0)
+    try:
+        fields = WAV_HEADER.unpack(fileobj.read(WAV_HEADER.size))
+    except struct.error:
+        raise ValueError('Not a 16-bit PCM WAV file')
+    expected = (b'RIFF', 36 + 2 * length, b'WAVE', b'fmt ', 16, 1, 1,
+                int(sample_rate), int(sample_rate) * 2, 2, 16, b'data', 2 * length)
+    if fields != expected:
+        raise ValueError('WAV file does not match the audio being patched')
+    if start < 0 or start + len(audio_data) > length:
+        raise ValueError('Patch extends past the end of the WAV data')
+
+    fileobj.seek(WAV_HEADER.size + 2 * start)
+    fileobj.write(to_pcm16(audio_data).tobytes())
+
+
+# Envelopes are drawn as straight ramps between mouse positions, so a sorted
+# list of (index, value) breakpoints (envelope_engine.Keypoints) describes them
+# exactly. They are only expanded to one value per sample where samples are
+# actually replaced.
+def empty_keypoints():
+    return Keypoints(np.zeros(0, dtype=np.int64), np.zeros(0))
+
+
+def keypoints_to_dense(keypoints, length, start=0):
+    """
+    One value per sample for `length` samples from `start`: linear between
+    breakpoints and held flat before the first and after the last one.
+    No breakpoints means an all-zero envelope.
+    """
+    return keypoints_at(keypoints, np.arange(start, start + length))
+
+
+def keypoints_at(keypoints, positions):
+    """The envelope at arbitrary sample positions"""
+    index, value = keypoints
+    if len(index) == 0:
+        return np.zeros(len(positions))
+    return np.interp(positions, index, value)
+
+
+def keypoint_polyline(keypoints, length):
+    """(x, y) vertices that draw keypoints_to_dense(keypoints, length)"""
+    index, value = keypoints
+    if len(index) == 0 or length <= 0:
+        return np.array([0, max(length - 1, 0)]), np.zeros(2)
+
+    inside = index < length
+    x = np.concatenate([[0], index[inside], [length - 1]])
+    y = np.concatenate([[value[0]], value[inside], [np.interp(length - 1, index, value)]])
+    return x, y
+
+
+def apply_envelope_keypoints(audio_data, keypoints_pos, keypoints_neg, offset=0.0, start=0):
+    """
+    apply_envelope for breakpoint envelopes, expanded only for this step.
+    audio_data may be a slice of the signal beginning at sample `start`.
+    """
+    n = len(audio_data)
+    return apply_envelope(
+        audio_data,
+        keypoints_to_dense(keypoints_pos, n, start),
+        keypoints_to_dense(keypoints_neg, n, start),
+        offset,
+    )
+
+
+def keypoint_bin_extremes(keypoints, length, bin_size, first_bin=0, last_bin=None):
+    """
+    (min, max) of keypoints_to_dense(keypoints, length) over each bin from
+    first_bin up to (not including) last_bin, without expanding it: on a
+    piecewise-linear envelope the extremes of a bin lie on its first or last
+    sample or on a breakpoint inside it.
+    """
+    n_total = -(-length // bin_size)
+    last_bin = n_total if last_bin is None else min(last_bin, n_total)
+    bins = np.arange(first_bin, last_bin)
+    index, value = keypoints
+    if len(index) == 0:
+        return np.zeros(len(bins)), np.zeros(len(bins))
+
+    first = np.interp(bins * bin_size, index, value)
+    last = np.interp(np.minimum((bins + 1) * bin_size, length) - 1, index, value)
+    lo, hi = np.minimum(first, last), np.maximum(first, last)
+
+    inside = (index >= first_bin * bin_size) & (index < min(last_bin * bin_size, length))
+    owner = index[inside] // bin_size - first_bin
+    np.minimum.at(lo, owner, value[inside])
+    np.maximum.at(hi, owner, value[inside])
+    return lo, hi
+
+
+def keypoints_changed_range(old, new, length):
+    """
+    [start, end) sample range outside of which the two envelopes are equal,
+    or None when they agree on every one of the first `length` samples. Both
+    are linear between the union of their breakpoints, so comparing them at
+    those breakpoints is enough.
+    """
+    points = np.union1d(old.index, new.index)
+    if len(points) == 0:
+        return None
+
+    differs = np.flatnonzero(keypoints_at(old, points) != keypoints_at(new, points))
+    if len(differs) == 0:
+        return None
+    first, last = differs[0], differs[-1]
+    start = int(points[first - 1]) if first > 0 else 0
+    end = int(points[last + 1]) + 1 if last + 1 < len(points) else length
+    start, end = max(start, 0), min(end, length)
+    return (start, end) if start < end else None
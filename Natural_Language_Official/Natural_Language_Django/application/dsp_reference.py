@@ -0,0 +1,53 @@
+"""
+Plain-Python versions of the dsp helpers, kept as equivalence oracles for
+the tests and benchmarks. Like dsp, this module does not load Django.
+"""
+import numpy as np
+
+
+def reference_apply_envelope(audio_data, envelope_pos, envelope_neg):
+    """The original per-sample AudioProcessor.apply_envelope, kept as the equivalence oracle."""
+    adjusted = np.copy(audio_data)
+    for i in range(len(adjusted)):
+        if adjusted[i] > 0:
+            adjusted[i] = envelope_pos[i] if i < len(envelope_pos) else adjusted[i]
+        elif adjusted[i] < 0:
+            adjusted[i] = envelope_neg[i] if i < len(envelope_neg) else adjusted[i]
+    return adjusted
+
+
+def reference_strict_sign_subdivision(x, y):
+    """The original per-point implementation, kept as the equivalence oracle."""
+    new_x = []
+    new_y = []
+    color_val = []
+
+    n = len(x)
+    if n == 0:
+        return np.array([]), np.array([]), np.array([])
+
+    def sign_color(val):
+        return 0 if val < 0 else 1
+
+    for i in range(n - 1):
+        xi, yi = x[i], y[i]
+        xip1, yip1 = x[i + 1], y[i + 1]
+
+        new_x.append(xi)
+        new_y.append(yi)
+        color_val.append(sign_color(yi))
+
+        if (yi < 0 and yip1 >= 0) or (yi >= 0 and yip1 < 0):
+            dy = yip1 - yi
+            t = (0 - yi) / dy if abs(dy) > 1e-12 else 0.5
+            x_cross = xi + t * (xip1 - xi)
+            crossing_color = 1 if (yi < 0 and yip1 >= 0) else 0
+            new_x.append(x_cross)
+            new_y.append(0.0)
+            color_val.append(crossing_color)
+
+    new_x.append(x[-1])
+    new_y.append(y[-1])
+    color_val.append(sign_color(y[-1]))
+
+    return np.array(new_x), np.array(new_y), np.array(color_val)
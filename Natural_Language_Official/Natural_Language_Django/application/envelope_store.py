@@ -0,0 +1,187 @@
+"""
+Compact storage and wire format for envelopes.
+
+Envelopes are straight ramps between drawn points, so they are kept as
+keypoints: a sorted list of (index, value) breakpoints per polarity (see
+dsp.Keypoints). The API accepts them as
+
+    {"format": "keypoints", "length": N,
+     "positive": [[index, value], ...], "negative": [[index, value], ...]}
+
+and, for older clients, the dense form {"positive": [...], "negative": [...]}
+with one value per sample, which is converted to keypoints on arrival.
+
+On disk they are a compressed .npz beside the other media, holding the
+breakpoint indices (int32) and values (float32 by default, float16 optional
+via AUDIO_ENVELOPE_DTYPE); the model keeps only the file reference and a few
+bytes of metadata in `envelope_data`.
+"""
+import io
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from . import dsp
+
+ENVELOPE_FORMAT = 'keypoints'
+POLARITIES = ('positive', 'negative')
+
+
+def envelope_dtype():
+    return np.dtype(getattr(settings, 'AUDIO_ENVELOPE_DTYPE', 'float32'))
+
+
+def parse_keypoint_list(points):
+    """
+    Validate [[index, value], ...] and return sorted dsp.Keypoints (later
+    duplicates win). Indices past the envelope length are allowed; they only
+    shape the ramp leading out of the last sample.
+    """
+    if not isinstance(points, (list, tuple)):
+        raise ValueError('Keypoints must be a list of [index, value] pairs')
+    if len(points) == 0:
+        return dsp.empty_keypoints()
+    try:
+        pairs = np.asarray(points, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError('Keypoints must be a list of [index, value] pairs')
+    if pairs.ndim != 2 or pairs.shape[1] != 2 or not np.all(np.isfinite(pairs)):
+        raise ValueError('Keypoints must be a list of [index, value] pairs')
+
+    index = pairs[:, 0].astype(np.int64)
+    if np.any(index != pairs[:, 0]) or np.any(index < 0):
+        raise ValueError('Keypoint indices must be non-negative whole sample indices')
+
+    # stable sort, then keep the last value given for each index
+    order = np.argsort(index, kind='stable')
+    index, value = index[order], pairs[order, 1]
+    last = np.append(index[1:] != index[:-1], True)
+    return dsp.Keypoints(index[last], value[last])
+
+
+def dense_list_to_keypoints(values):
+    """A dense per-sample list; samples past its end count as zero, like padding"""
+    dense = np.asarray(values, dtype=np.float64)
+    if len(dense) == 0:
+        return dsp.empty_keypoints()
+    index, value = dsp.dense_to_keypoints(dense)
+    if value[-1] != 0:
+        index, value = np.append(index, len(dense)), np.append(value, 0.0)
+    return dsp.Keypoints(index, value)
+
+
+def parse_envelope_payload(data):
+    """
+    (positive keypoints, negative keypoints, length) from an API payload in
+    either format. length is None when a dense payload does not imply one.
+    Raises ValueError for malformed payloads.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Envelope data must be a dictionary')
+
+    if data.get('format') == ENVELOPE_FORMAT:
+        length = data.get('length')
+        if length is not None and (not isinstance(length, int) or length < 0):
+            raise ValueError('Envelope length must be a non-negative integer')
+        pos, neg = (parse_keypoint_list(data.get(p, [])) for p in POLARITIES)
+        return pos, neg, length
+
+    for polarity in POLARITIES:
+        if not isinstance(data.get(polarity, []), list):
+            raise ValueError(f'{polarity.capitalize()} envelope data must be a list')
+    dense = [data.get(p, []) for p in POLARITIES]
+    length = max(len(d) for d in dense) or None
+    return dense_list_to_keypoints(dense[0]), dense_list_to_keypoints(dense[1]), length
+
+
+def keypoints_payload(keypoints_pos, keypoints_neg, length):
+    """The JSON wire form of an envelope"""
+    return {
+        'format': ENVELOPE_FORMAT,
+        'length': length,
+        **{
+            polarity: [[int(i), float(v)] for i, v in zip(*keypoints)]
+            for polarity, keypoints in zip(POLARITIES, (keypoints_pos, keypoints_neg))
+        },
+    }
+
+
+def normalize_payload(data):
+    """Any accepted payload as a (small) keypoint payload, e.g. for queueing"""
+    pos, neg, length = parse_envelope_payload(data)
+    return keypoints_payload(pos, neg, length)
+
+
+def round_to_storage(keypoints, dtype=None):
+    """Keypoints with their values rounded to the storage dtype, i.e. as they will read back"""
+    dtype = dtype or envelope_dtype()
+    return dsp.Keypoints(np.asarray(keypoints.index, dtype=np.int64),
+                         np.asarray(keypoints.value, dtype=dtype).astype(np.float64))
+
+
+def encode_envelope(keypoints_pos, keypoints_neg, dtype=None):
+    """Serialize both keypoint envelopes to compressed .npz bytes"""
+    dtype = dtype or envelope_dtype()
+    arrays = {}
+    for polarity, (index, value) in zip(POLARITIES, (keypoints_pos, keypoints_neg)):
+        arrays[f'{polarity}_index'] = np.asarray(index, dtype=np.int32)
+        arrays[f'{polarity}_value'] = np.asarray(value, dtype=dtype)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_envelope(fileobj):
+    """Read (positive, negative) keypoints back from an .npz file object or bytes"""
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    with np.load(fileobj, allow_pickle=False) as data:
+        if 'positive' in data:
+            # dense per-sample file written before the keypoint format
+            return tuple(dsp.dense_to_keypoints(data[p]) for p in POLARITIES)
+        return tuple(dsp.Keypoints(data[f'{p}_index'].astype(np.int64), data[f'{p}_value'])
+                     for p in POLARITIES)
+
+
+def envelope_metadata(keypoints_pos, keypoints_neg, length, dtype=None):
+    """The small description kept in AudioProject.envelope_data"""
+    return {
+        'format': ENVELOPE_FORMAT,
+        'dtype': (dtype or envelope_dtype()).name,
+        'length': length,
+        'keypoints': {p: len(k.index) for p, k in zip(POLARITIES, (keypoints_pos, keypoints_neg))},
+    }
+
+
+def write_envelope(project, keypoints_pos, keypoints_neg, length):
+    """Store the envelopes in project.envelope_file (not saved to the DB yet)"""
+    old_name = project.envelope_file.name if project.envelope_file else None
+    project.envelope_file.save(
+        f'envelope_{project.id}.npz',
+        ContentFile(encode_envelope(keypoints_pos, keypoints_neg)),
+        save=False,
+    )
+    if old_name and old_name != project.envelope_file.name:
+        project.envelope_file.storage.delete(old_name)
+    project.envelope_data = envelope_metadata(keypoints_pos, keypoints_neg, length)
+
+
+def delete_envelope(project):
+    """Remove the envelope file of a project that is being deleted"""
+    if project.envelope_file:
+        project.envelope_file.storage.delete(project.envelope_file.name)
+
+
+def read_envelope(project):
+    """(positive, negative) keypoints of a project, or None if it has no envelope yet"""
+    if project.envelope_file:
+        with project.envelope_file.open('rb') as f:
+            return decode_envelope(io.BytesIO(f.read()))
+
+    # Rows not converted yet still carry the float lists inline
+    data = project.envelope_data or {}
+    if 'positive' in data or 'negative' in data:
+        pos, neg, _ = parse_envelope_payload(data)
+        return pos, neg
+    return None
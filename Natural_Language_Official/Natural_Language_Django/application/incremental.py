@@ -0,0 +1,176 @@
+"""
+Incremental reprocessing of envelope edits.
+
+A full run of process_audio_project also writes a small render state next
+to the project's cached audio (audio_cache.derived_path). It records:
+
+- the per-column min/max samples of the original and the modified signal
+  at the default render width (renders.DEFAULT_WIDTH)
+- the pixel rows those extremes and the envelopes land on in the views
+- what the state was built from
+
+An edit that arrives with a dirty range is then applied to that range only:
+
+- The range is the client's dirty range, widened to wherever the stored and
+  the new envelope actually differ (dsp.keypoints_changed_range).
+- The modified samples are recomputed for the columns covering that range
+  and patched into the stored WAV in place.
+- The pixel rows are recomputed from the patched column extremes. Stored
+  renders of views whose rows did not change stay valid for the new inputs;
+  the others ('final' for the envelopes, 'natural' and 'comparison' for the
+  modified signal) are rendered again on their next request.
+
+Anything that does not line up raises NotIncremental, and the caller falls
+back to a full run. That covers a missing state, other colours, and a
+different stored envelope or WAV.
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from . import audio_cache, dsp
+
+STATE_VERSION = 1
+STATE_NAME = 'render.npz'
+
+MODIFIED_VIEWS = ('natural', 'comparison')
+ENVELOPE_VIEWS = ('final',)
+
+
+class NotIncremental(Exception):
+    """The stored results can't be patched; process the project in full"""
+
+
+def envelope_digest(keypoints_pos, keypoints_neg):
+    digest = hashlib.sha256()
+    for index, value in (keypoints_pos, keypoints_neg):
+        digest.update(np.asarray(index, dtype='<i8').tobytes())
+        digest.update(b'|')
+        digest.update(np.asarray(value, dtype='<f8').tobytes())
+        digest.update(b'/')
+    return digest.hexdigest()
+
+
+def pixel_rows(lo_values, hi_values, max_amp, height):
+    """Pixel rows of the plot area (y limits are +-1.1 * max_amp) that values fall on"""
+    span = 2.2 * max_amp or 1.0
+    values = np.column_stack([lo_values, hi_values])
+    return np.floor((values + 1.1 * max_amp) / span * height).astype(np.int32)
+
+
+def envelope_rows(state, keypoints_pos, keypoints_neg, first_bin=0, last_bin=None):
+    return np.stack([
+        pixel_rows(*dsp.keypoint_bin_extremes(keypoints, state['length'], state['bin_size'],
+                                              first_bin, last_bin),
+                   state['max_amp'], state['height'])
+        for keypoints in (keypoints_pos, keypoints_neg)
+    ])
+
+
+def build_state(audio_data, sample_rate, modified_data, keypoints_pos, keypoints_neg,
+                colors, n_bins, height, envelope_applied):
+    """Render state of a full run (the WAV name is added once it is saved)"""
+    length = len(audio_data)
+    max_amp = float(np.max(np.abs(audio_data))) if length else 0.0
+    bin_size = dsp.minmax_bin_size(length, n_bins)
+    modified_lo, modified_hi = dsp.minmax_bins(modified_data, bin_size)
+
+    state = {
+        'version': STATE_VERSION,
+        'length': length,
+        'sample_rate': int(sample_rate),
+        'bin_size': bin_size,
+        'height': int(height),
+        'max_amp': max_amp,
+        'colors': np.array(colors),
+        'envelope_applied': bool(envelope_applied),
+        'envelope_digest': envelope_digest(keypoints_pos, keypoints_neg),
+        'wav_name': '',
+        'modified_lo': modified_lo,
+        'modified_hi': modified_hi,
+    }
+    state['modified_rows'] = pixel_rows(modified_data[modified_lo], modified_data[modified_hi],
+                                        max_amp, height)
+    state['envelope_rows'] = envelope_rows(state, keypoints_pos, keypoints_neg)
+    return state
+
+
+def update_state(state, modified_slice, first_bin, last_bin, keypoints_pos, keypoints_neg):
+    """
+    Splice recomputed column extremes for bins first_bin..last_bin (the
+    modified samples of exactly those bins) into the state. Returns the views
+    whose pixels changed; their rows become the current ones.
+    """
+    start = first_bin * state['bin_size']
+    lo, hi = dsp.minmax_bins(modified_slice, state['bin_size'], start)
+    state['modified_lo'][first_bin:last_bin] = lo
+    state['modified_hi'][first_bin:last_bin] = hi
+    state['envelope_digest'] = envelope_digest(keypoints_pos, keypoints_neg)
+
+    views = []
+    rows = pixel_rows(modified_slice[lo - start], modified_slice[hi - start], state['max_amp'], state['height'])
+    if not np.array_equal(rows, state['modified_rows'][first_bin:last_bin]):
+        state['modified_rows'][first_bin:last_bin] = rows
+        views.extend(MODIFIED_VIEWS)
+    rows = envelope_rows(state, keypoints_pos, keypoints_neg, first_bin, last_bin)
+    if not np.array_equal(rows, state['envelope_rows'][:, first_bin:last_bin]):
+        state['envelope_rows'][:, first_bin:last_bin] = rows
+        views.extend(ENVELOPE_VIEWS)
+    return [view for view in ('final', 'natural', 'comparison') if view in views]
+
+
+def save_state(project, state):
+    path = audio_cache.derived_path(project, STATE_NAME)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # without a state the next edit is simply processed in full
+
+
+def discard_state(project):
+    """Remove the state before the stored results change, so a failure can't leave a stale one"""
+    path = audio_cache.derived_path(project, STATE_NAME)
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+
+def load_state(project, colors, length, sample_rate):
+    """The project's render state, checked against its current results"""
+    path = audio_cache.derived_path(project, STATE_NAME)
+    if path is None or not os.path.exists(path):
+        raise NotIncremental('No render state')
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {name: data[name] for name in data.files}
+    except (OSError, ValueError) as e:
+        raise NotIncremental(f'Unreadable render state: {e}')
+    for name in ('version', 'length', 'sample_rate', 'bin_size', 'height'):
+        state[name] = int(state[name])
+    state['envelope_applied'] = bool(state['envelope_applied'])
+    state['max_amp'] = float(state['max_amp'])
+    for name in ('envelope_digest', 'wav_name'):
+        state[name] = str(state[name])
+
+    if state['version'] != STATE_VERSION:
+        raise NotIncremental('Render state from another version')
+    if (state['length'], state['sample_rate']) != (length, int(sample_rate)):
+        raise NotIncremental('Render state is for other audio')
+    if tuple(state['colors']) != tuple(colors):
+        raise NotIncremental('Colours changed')
+    if not state['envelope_applied']:
+        raise NotIncremental('No envelope was applied before')
+    if not project.modified_file or project.modified_file.name != state['wav_name']:
+        raise NotIncremental('Modified WAV changed')
+
+    stored = project.load_envelope()
+    if stored is None or envelope_digest(*stored) != state['envelope_digest']:
+        raise NotIncremental('Stored envelope differs from the rendered one')
+    return state, stored
@@ -0,0 +1,281 @@
+"""
+Database-backed processing queue.
+
+The web process only enqueues ProcessingJob rows; the `run_audio_workers`
+management command claims them and runs AudioProcessor.process_audio_project
+in a process pool. Because the queue lives in the regular database, jobs
+survive restarts and their state can be reported by the status API.
+
+Updates are coalesced per project: while a job for a project is still
+queued, a newer envelope replaces its payload instead of adding a job, and
+a project never has more than one job running at a time.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .envelope_store import normalize_payload
+from .models import AudioProject, ProcessingJob
+
+PENDING_STATUSES = (ProcessingJob.STATUS_QUEUED, ProcessingJob.STATUS_RUNNING)
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds AUDIO_JOB_QUEUE_LIMIT pending jobs"""
+
+
+def queue_limit():
+    return getattr(settings, 'AUDIO_JOB_QUEUE_LIMIT', 100)
+
+
+def debounce_seconds():
+    return getattr(settings, 'AUDIO_JOB_DEBOUNCE', 0.5)
+
+
+def lease_seconds():
+    return getattr(settings, 'AUDIO_JOB_LEASE', 60)
+
+
+def parse_dirty_range(value):
+    """A [start, end) pair of sample indices from the API, or None; raises ValueError"""
+    if value is None:
+        return None
+    if (not isinstance(value, (list, tuple)) or len(value) != 2
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in value)):
+        raise ValueError('dirty_range must be a [start, end] pair of sample indices')
+    start, end = value
+    if start < 0 or end <= start:
+        raise ValueError('dirty_range must satisfy 0 <= start < end')
+    return start, end
+
+
+def enqueue_project(project, envelope_data=None, dirty_range=None):
+    """
+    Queue (re)processing of a project and mark it as processing. If the
+    project already has a queued job, the latest envelope supersedes the
+    pending one in place and the job's coalesced_count goes up. Envelopes
+    are queued in keypoint form; a malformed envelope raises ValueError.
+    A dirty_range (start, end) of an envelope update lets the worker
+    reprocess just those samples; coalesced ranges are merged, and a job
+    without one processes the whole project.
+    """
+    if envelope_data:
+        envelope_data = normalize_payload(envelope_data)
+    dirty_range = parse_dirty_range(dirty_range) if envelope_data else None
+
+    now = timezone.now()
+    # Envelope saves arrive in bursts; give later ones a moment to replace this one
+    run_after = now + timedelta(seconds=debounce_seconds()) if envelope_data is not None else None
+
+    with transaction.atomic():
+        pending = ProcessingJob.objects.filter(project=project, status=ProcessingJob.STATUS_QUEUED).last()
+        if pending is not None:
+            pending.envelope_data = envelope_data if envelope_data is not None else pending.envelope_data
+            if pending.dirty_range is not None and dirty_range is not None:
+                dirty_range = (min(pending.dirty_start, dirty_range[0]), max(pending.dirty_end, dirty_range[1]))
+            else:
+                dirty_range = None
+            pending.dirty_start, pending.dirty_end = dirty_range or (None, None)
+            pending.coalesced_count += 1
+            # New input: the retry budget and backoff of the old payload no longer apply
+            pending.attempts = 0
+            pending.last_error = ''
+            pending.run_after = run_after
+            pending.save(update_fields=['envelope_data', 'dirty_start', 'dirty_end', 'coalesced_count',
+                                        'attempts', 'last_error', 'run_after'])
+            job = pending
+        else:
+            total = ProcessingJob.objects.filter(status__in=PENDING_STATUSES).count()
+            if total >= queue_limit():
+                raise QueueFull(f'Processing queue is full ({total} jobs pending), try again later')
+
+            job = ProcessingJob.objects.create(
+                project=project,
+                envelope_data=envelope_data,
+                dirty_start=dirty_range[0] if dirty_range else None,
+                dirty_end=dirty_range[1] if dirty_range else None,
+                run_after=run_after,
+                max_attempts=getattr(settings, 'AUDIO_JOB_MAX_ATTEMPTS', 3),
+            )
+        AudioProject.objects.filter(id=project.id).update(is_processing=True)
+        project.is_processing = True
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    Atomically move the oldest runnable queued job to running and return it,
+    or None when nothing is runnable. The conditional UPDATE makes claiming
+    safe with several worker commands sharing one database. Projects that
+    already have a running job are skipped, and a queued job with a newer
+    queued job for the same project (two enqueues racing) is superseded.
+    """
+    now = timezone.now()
+    running_for_project = ProcessingJob.objects.filter(
+        project=OuterRef('project'), status=ProcessingJob.STATUS_RUNNING
+    )
+    candidates = (
+        ProcessingJob.objects
+        .filter(status=ProcessingJob.STATUS_QUEUED)
+        .filter(Q(run_after__isnull=True) | Q(run_after__lte=now))
+        .exclude(Exists(running_for_project))
+        .order_by('created_at', 'id')
+        .values_list('id', 'project_id')[:10]
+    )
+    for job_id, project_id in candidates:
+        newer = ProcessingJob.objects.filter(
+            project_id=project_id, status=ProcessingJob.STATUS_QUEUED, id__gt=job_id
+        ).order_by('id').first()
+        if newer is not None:
+            if supersede_job(job_id, newer):
+                continue
+        claimed = ProcessingJob.objects.filter(id=job_id, status=ProcessingJob.STATUS_QUEUED).update(
+            status=ProcessingJob.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ProcessingJob.objects.get(id=job_id)
+    return None
+
+
+def supersede_job(job_id, newer):
+    """Drop a queued job in favour of a newer one for the same project"""
+    superseded = ProcessingJob.objects.filter(id=job_id, status=ProcessingJob.STATUS_QUEUED).update(
+        status=ProcessingJob.STATUS_SUPERSEDED, finished_at=timezone.now()
+    )
+    if superseded:
+        ProcessingJob.objects.filter(id=newer.id).update(coalesced_count=F('coalesced_count') + 1)
+    return bool(superseded)
+
+
+def complete_job(job_id, success, message=''):
+    """Record the outcome of a run: done, queued again with backoff, or failed"""
+    job = ProcessingJob.objects.select_related('project').filter(id=job_id).first()
+    if job is None:
+        return None  # project (and with it the job) was deleted meanwhile
+
+    now = timezone.now()
+    newer_queued = ProcessingJob.objects.filter(
+        project_id=job.project_id, status=ProcessingJob.STATUS_QUEUED
+    ).exclude(id=job.id).first()
+
+    if success:
+        job.status = ProcessingJob.STATUS_DONE
+        job.finished_at = now
+        job.last_error = ''
+    elif newer_queued is not None:
+        # The failed input was already replaced by a newer envelope; don't retry it
+        job.status = ProcessingJob.STATUS_SUPERSEDED
+        job.finished_at = now
+        job.last_error = message
+    elif job.attempts < job.max_attempts:
+        backoff = getattr(settings, 'AUDIO_JOB_RETRY_BACKOFF', 5) * 2 ** (job.attempts - 1)
+        job.status = ProcessingJob.STATUS_QUEUED
+        job.run_after = now + timedelta(seconds=backoff)
+        job.last_error = message
+    else:
+        job.status = ProcessingJob.STATUS_FAILED
+        job.finished_at = now
+        job.last_error = message
+    job.save(update_fields=['status', 'finished_at', 'run_after', 'last_error'])
+
+    if job.status == ProcessingJob.STATUS_QUEUED or newer_queued is not None:
+        # process_audio_project cleared the flag when it finished; more work is pending
+        AudioProject.objects.filter(id=job.project_id).update(is_processing=True)
+    return job
+
+
+def queue_metrics():
+    """Job counts per status plus how many updates were coalesced away"""
+    counts = dict(
+        ProcessingJob.objects.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n')
+    )
+    coalesced = ProcessingJob.objects.aggregate(total=Sum('coalesced_count'))['total'] or 0
+    return {
+        'jobs': {status: counts.get(status, 0) for status, _ in ProcessingJob.STATUS_CHOICES},
+        'coalesced_updates': coalesced,
+        'queue_limit': queue_limit(),
+    }
+
+
+def has_queued_jobs():
+    return ProcessingJob.objects.filter(status=ProcessingJob.STATUS_QUEUED).exists()
+
+
+def heartbeat(worker_name):
+    """Renew the lease on the jobs a worker is running"""
+    return ProcessingJob.objects.filter(status=ProcessingJob.STATUS_RUNNING, worker=worker_name).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(worker_name=None):
+    """
+    Put jobs left running by a worker that died back in the queue: those
+    whose heartbeat is older than AUDIO_JOB_LEASE seconds, so jobs of live
+    workers are left alone. With a worker_name, that worker's jobs are
+    requeued regardless (it is shutting down).
+    """
+    stale = ProcessingJob.objects.filter(status=ProcessingJob.STATUS_RUNNING)
+    if worker_name is not None:
+        stale = stale.filter(worker=worker_name)
+    else:
+        expired = timezone.now() - timedelta(seconds=lease_seconds())
+        stale = stale.filter(Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=expired))
+    return stale.update(status=ProcessingJob.STATUS_QUEUED, worker='', heartbeat_at=None)
+
+
+def init_worker_process():
+    """Process pool initializer: make Django usable and drop inherited DB handles"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def run_job(job_id):
+    """Run one claimed job inside a pool process; returns (success, message)"""
+    from .audio_processor import AudioProcessor
+
+    try:
+        job = ProcessingJob.objects.select_related('project').get(id=job_id)
+    except ProcessingJob.DoesNotExist:
+        return True, 'Project was deleted before processing'
+
+    try:
+        processor = AudioProcessor()
+        return processor.process_audio_project(job.project, job.envelope_data, job.dirty_range)
+    except Exception as e:
+        return False, str(e)
+    finally:
+        connections.close_all()
+
+
+def job_status(project):
+    """Summary of the latest job of a project for the status API, or None"""
+    job = project.jobs.order_by('-created_at', '-id').first()
+    if job is None:
+        return None
+
+    status = {
+        'id': job.id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'coalesced_count': job.coalesced_count,
+        'dirty_range': job.dirty_range,
+        'last_error': job.last_error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == ProcessingJob.STATUS_QUEUED:
+        status['queue_position'] = ProcessingJob.objects.filter(
+            status=ProcessingJob.STATUS_QUEUED
+        ).filter(Q(created_at__lt=job.created_at) | Q(created_at=job.created_at, id__lt=job.id)).count() + 1
+    return status
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from application import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Delete stored processing outputs that no project references any more'
+
+    def handle(self, *args, **options):
+        deleted, freed = artifacts.collect_garbage()
+        self.stdout.write(f'Deleted {deleted} unreferenced artifact(s), {freed} bytes freed')
+
+        stats = artifacts.stats()
+        self.stdout.write(
+            f"{stats['artifacts']} artifact(s) for {stats['keys']} input set(s): "
+            f"{stats['stored_bytes']} bytes stored, {stats['saved_bytes']} bytes saved by sharing"
+        )
@@ -0,0 +1,93 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from application import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued audio processing jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Maximum number of jobs processed concurrently (default: 2)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between queue polls when idle (default: 1)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling forever')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        worker_name = f'{socket.gethostname()}:{os.getpid()}'
+
+        self.stdout.write(f'{worker_name} processing with {workers} worker process(es)')
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=jobs.init_worker_process)
+        in_flight = {}
+        try:
+            while True:
+                # Keep our leases alive and take back jobs whose worker stopped renewing theirs
+                jobs.heartbeat(worker_name)
+                requeued = jobs.requeue_stale_jobs()
+                if requeued:
+                    self.stdout.write(f'Requeued {requeued} job(s) left running by a dead worker')
+
+                # Fill free slots; the pool size is the concurrency limit
+                while len(in_flight) < workers:
+                    job = jobs.claim_next_job(worker_name)
+                    if job is None:
+                        break
+                    self.stdout.write(
+                        f'Started job {job.id} (project {job.project_id}, attempt {job.attempts}, '
+                        f'{job.coalesced_count} update(s) coalesced)'
+                    )
+                    in_flight[pool.submit(jobs.run_job, job.id)] = job.id
+
+                if not in_flight:
+                    if options['once'] and not jobs.has_queued_jobs():
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    try:
+                        success, message = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        success, message = False, f'Worker process died: {e}'
+                    except Exception as e:
+                        success, message = False, str(e)
+                    self.report(jobs.complete_job(job_id, success, message), job_id)
+
+                if broken:
+                    # A crashed child poisons the whole executor; start a fresh one
+                    for future, job_id in in_flight.items():
+                        self.report(jobs.complete_job(job_id, False, 'Worker process died'), job_id)
+                    in_flight.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=jobs.init_worker_process)
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted, requeueing unfinished jobs')
+            jobs.requeue_stale_jobs(worker_name)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def report(self, job, job_id):
+        if job is None:
+            self.stdout.write(f'Job {job_id} finished for a deleted project')
+        elif job.status == job.STATUS_DONE:
+            self.stdout.write(self.style.SUCCESS(f'Job {job.id} done'))
+        elif job.status == job.STATUS_QUEUED:
+            self.stdout.write(self.style.WARNING(
+                f'Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying: {job.last_error}'
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(f'Job {job.id} failed permanently: {job.last_error}'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:17
+
+import io
+
+import numpy as np
+from django.db import migrations, models
+
+
+def envelopes_to_files(apps, schema_editor):
+    """Move inline JSON envelope lists into compressed .npz files"""
+    from django.core.files.base import ContentFile
+
+    AudioProject = apps.get_model('application', 'AudioProject')
+    for project in AudioProject.objects.exclude(envelope_data={}).iterator():
+        data = project.envelope_data or {}
+        if 'positive' not in data and 'negative' not in data:
+            continue
+        positive = data.get('positive', [])
+        negative = data.get('negative', [])
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            positive=np.asarray(positive, dtype=np.float32),
+            negative=np.asarray(negative, dtype=np.float32),
+        )
+        project.envelope_file.save(f'envelope_{project.id}.npz', ContentFile(buffer.getvalue()), save=False)
+        project.envelope_data = {'format': 'npz', 'dtype': 'float32', 'length': len(positive)}
+        project.save(update_fields=['envelope_file', 'envelope_data'])
+
+
+def envelopes_to_json(apps, schema_editor):
+    """Inline the stored envelopes again as JSON float lists"""
+    AudioProject = apps.get_model('application', 'AudioProject')
+    for project in AudioProject.objects.exclude(envelope_file='').exclude(envelope_file=None).iterator():
+        with project.envelope_file.open('rb') as f:
+            with np.load(io.BytesIO(f.read()), allow_pickle=False) as data:
+                positive, negative = data['positive'], data['negative']
+        project.envelope_file.delete(save=False)
+        project.envelope_data = {'positive': positive.tolist(), 'negative': negative.tolist()}
+        project.save(update_fields=['envelope_file', 'envelope_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0003_processingjob_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audioproject',
+            name='envelope_file',
+            field=models.FileField(blank=True, null=True, upload_to='envelopes/'),
+        ),
+        migrations.RunPython(envelopes_to_files, envelopes_to_json),
+    ]
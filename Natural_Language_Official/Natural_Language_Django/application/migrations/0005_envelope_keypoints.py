@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import migrations
+
+
+def dense_to_keypoints(dense, tolerance=1e-6):
+    """
+    (index, value) breakpoints of a dense envelope; a frozen copy of
+    dsp.dense_to_keypoints as it was when this migration was written.
+    """
+    dense = np.asarray(dense, dtype=np.float64)
+    n = len(dense)
+    if n <= 2:
+        return np.arange(n), dense.copy()
+
+    bends = np.flatnonzero(np.abs(np.diff(dense, 2)) > tolerance) + 1
+    index = np.unique(np.concatenate([[0], bends, [n - 1]]))
+    samples = np.arange(n)
+    while True:
+        error = np.abs(np.interp(samples, index, dense[index]) - dense)
+        drift = np.flatnonzero(error > tolerance)
+        if len(drift) == 0:
+            return index, dense[index]
+        index = np.union1d(index, drift)
+
+
+def dense_files_to_keypoints(apps, schema_editor):
+    """Rewrite per-sample envelope files as (index, value) breakpoints"""
+    AudioProject = apps.get_model('application', 'AudioProject')
+    for project in AudioProject.objects.exclude(envelope_file='').exclude(envelope_file=None).iterator():
+        with project.envelope_file.open('rb') as f:
+            with np.load(io.BytesIO(f.read()), allow_pickle=False) as data:
+                if 'positive' not in data:
+                    continue
+                dense = {p: data[p] for p in ('positive', 'negative')}
+
+        arrays, counts = {}, {}
+        for polarity, values in dense.items():
+            index, value = dense_to_keypoints(values)
+            arrays[f'{polarity}_index'] = index.astype(np.int32)
+            arrays[f'{polarity}_value'] = value.astype(np.float32)
+            counts[polarity] = len(index)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+
+        old_name = project.envelope_file.name
+        project.envelope_file.save(f'envelope_{project.id}.npz', ContentFile(buffer.getvalue()), save=False)
+        project.envelope_file.storage.delete(old_name)
+        project.envelope_data = {
+            'format': 'keypoints', 'dtype': 'float32',
+            'length': len(dense['positive']), 'keypoints': counts,
+        }
+        project.save(update_fields=['envelope_file', 'envelope_data'])
+
+
+def keypoint_files_to_dense(apps, schema_editor):
+    """Expand breakpoint files back to one value per sample"""
+    AudioProject = apps.get_model('application', 'AudioProject')
+    for project in AudioProject.objects.exclude(envelope_file='').exclude(envelope_file=None).iterator():
+        length = (project.envelope_data or {}).get('length') or 0
+        with project.envelope_file.open('rb') as f:
+            with np.load(io.BytesIO(f.read()), allow_pickle=False) as data:
+                if 'positive_index' not in data:
+                    continue
+                dense = {}
+                for polarity in ('positive', 'negative'):
+                    index, value = data[f'{polarity}_index'], data[f'{polarity}_value']
+                    dense[polarity] = (np.interp(np.arange(length), index, value) if len(index)
+                                       else np.zeros(length)).astype(np.float32)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **dense)
+
+        old_name = project.envelope_file.name
+        project.envelope_file.save(f'envelope_{project.id}.npz', ContentFile(buffer.getvalue()), save=False)
+        project.envelope_file.storage.delete(old_name)
+        project.envelope_data = {'format': 'npz', 'dtype': 'float32', 'length': length}
+        project.save(update_fields=['envelope_file', 'envelope_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0004_envelope_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(dense_files_to_keypoints, keypoint_files_to_dense),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0005_envelope_keypoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='dirty_end',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='processingjob',
+            name='dirty_start',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0006_processingjob_dirty_range'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='audioproject',
+            name='final_drawing',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='visualizations/final/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='final_drawing_svg',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='visualizations/final_svg/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='modified_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='audio/modified/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='natural_lang',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='visualizations/natural/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='natural_lang_svg',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='visualizations/natural_svg/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='wave_comparison',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='visualizations/comparison/'),
+        ),
+        migrations.AlterField(
+            model_name='audioproject',
+            name='wave_comparison_svg',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='visualizations/comparison_svg/'),
+        ),
+        migrations.CreateModel(
+            name='Artifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=64)),
+                ('kind', models.CharField(max_length=30)),
+                ('file', models.FileField(max_length=255, upload_to='artifacts/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('reuse_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('key', 'kind'), name='unique_artifact_kind_per_key')],
+            },
+        ),
+    ]
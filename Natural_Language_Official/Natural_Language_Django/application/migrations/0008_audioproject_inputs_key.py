@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0007_artifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audioproject',
+            name='inputs_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='audioproject',
+            name='inputs_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
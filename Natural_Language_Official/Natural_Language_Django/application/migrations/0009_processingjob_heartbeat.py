@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0008_audioproject_inputs_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,12 @@ import os
 import json
 
 
+class AudioProjectQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Rows for galleries and list APIs, without the JSON columns they never show"""
+        return self.defer('envelope_data', 'wave_parameters')
+
+
 class AudioProject(models.Model):
     WAVE_TYPE_CHOICES = [
         ('sine', 'Sine Wave'),
@@ -21,26 +27,32 @@ class AudioProject(models.Model):
     original_file = models.FileField(upload_to='audio/original/', null=True, blank=True)
     
     # Generated/Modified audio
-    modified_file = models.FileField(upload_to='audio/modified/', null=True, blank=True)
+    modified_file = models.FileField(upload_to='audio/modified/', max_length=255, null=True, blank=True)
     
     # Custom wave parameters (stored as JSON)
     wave_parameters = models.JSONField(default=dict, blank=True)
     
-    # Envelope data (stored as JSON)
+    # Envelope metadata (stored as JSON); the keypoints themselves live in envelope_file
     envelope_data = models.JSONField(default=dict, blank=True)
+    envelope_file = models.FileField(upload_to='envelopes/', null=True, blank=True)
     
     # Color settings
     background_color = models.CharField(max_length=7, default='#000000')
     positive_color = models.CharField(max_length=7, default='#00FF00')
     negative_color = models.CharField(max_length=7, default='#00FFFF')
     
-    # Generated visualizations
-    final_drawing = models.ImageField(upload_to='visualizations/final/', null=True, blank=True)
-    final_drawing_svg = models.FileField(upload_to='visualizations/final_svg/', null=True, blank=True)
-    natural_lang = models.ImageField(upload_to='visualizations/natural/', null=True, blank=True)
-    natural_lang_svg = models.FileField(upload_to='visualizations/natural_svg/', null=True, blank=True)
-    wave_comparison = models.ImageField(upload_to='visualizations/comparison/', null=True, blank=True)
-    wave_comparison_svg = models.FileField(upload_to='visualizations/comparison_svg/', null=True, blank=True)
+    # Hash of the inputs the current outputs were produced from (see artifacts.inputs_key)
+    # and when it last changed; views are rendered on request under this key
+    inputs_key = models.CharField(max_length=64, blank=True, db_index=True)
+    inputs_changed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Visualizations rendered by processing before views were rendered on request
+    final_drawing = models.ImageField(upload_to='visualizations/final/', max_length=255, null=True, blank=True)
+    final_drawing_svg = models.FileField(upload_to='visualizations/final_svg/', max_length=255, null=True, blank=True)
+    natural_lang = models.ImageField(upload_to='visualizations/natural/', max_length=255, null=True, blank=True)
+    natural_lang_svg = models.FileField(upload_to='visualizations/natural_svg/', max_length=255, null=True, blank=True)
+    wave_comparison = models.ImageField(upload_to='visualizations/comparison/', max_length=255, null=True, blank=True)
+    wave_comparison_svg = models.FileField(upload_to='visualizations/comparison_svg/', max_length=255, null=True, blank=True)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -48,6 +60,8 @@ class AudioProject(models.Model):
     is_processing = models.BooleanField(default=False)
     processing_error = models.TextField(blank=True)
     
+    objects = AudioProjectQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -61,3 +75,117 @@ class AudioProject(models.Model):
     
     def get_absolute_url(self):
         return f"/project/{self.id}/"
+    
+    @property
+    def visualization_urls(self):
+        """{view: {format: url}} of the project's visualizations (see renders)"""
+        from .renders import view_urls
+        
+        return view_urls(self)
+    
+    @property
+    def thumbnail_url(self):
+        """URL of the small gallery preview (see renders)"""
+        from .renders import thumbnail_url
+        
+        return thumbnail_url(self)
+    
+    def load_envelope(self):
+        """Positive and negative envelope keypoints, read from disk on first use"""
+        from .envelope_store import read_envelope
+        
+        if getattr(self, '_envelope_cache', None) is None:
+            self._envelope_cache = read_envelope(self)
+        return self._envelope_cache
+    
+    def store_envelope(self, keypoints_pos, keypoints_neg, length):
+        """Write the envelope keypoints to envelope_file; the caller saves the row"""
+        from .envelope_store import write_envelope
+        
+        write_envelope(self, keypoints_pos, keypoints_neg, length)
+        self._envelope_cache = (keypoints_pos, keypoints_neg)
+
+
+class ProcessingJob(models.Model):
+    """
+    A queued run of AudioProcessor.process_audio_project, persisted in the
+    database so jobs survive restarts. Jobs are executed by the
+    `manage.py run_audio_workers` command, never inside the web process.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_SUPERSEDED = 'superseded'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SUPERSEDED, 'Superseded'),
+    ]
+    
+    project = models.ForeignKey(AudioProject, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    
+    # Envelope data for a reprocess (empty for the initial processing)
+    envelope_data = models.JSONField(null=True, blank=True)
+    
+    # Number of later updates folded into this job instead of queueing new ones
+    coalesced_count = models.PositiveIntegerField(default=0)
+    
+    # Sample range [start, end) the envelope update touched, for incremental
+    # reprocessing; empty means process the whole project
+    dirty_start = models.PositiveBigIntegerField(null=True, blank=True)
+    dirty_end = models.PositiveBigIntegerField(null=True, blank=True)
+    
+    # Retry bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    # Renewed by the worker while it runs the job; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+    
+    def __str__(self):
+        return f"Job {self.id} for project {self.project_id} ({self.status})"
+    
+    @property
+    def dirty_range(self):
+        if self.dirty_start is None or self.dirty_end is None:
+            return None
+        return self.dirty_start, self.dirty_end
+
+
+class Artifact(models.Model):
+    """
+    A processing output (modified WAV or a rendered view) stored once under
+    the hash of the inputs that produced it. Every AudioProject with the same
+    inputs points its file field at the same file; see application/artifacts.py.
+    """
+    key = models.CharField(max_length=64, db_index=True)
+    kind = models.CharField(max_length=30)
+    file = models.FileField(upload_to='artifacts/', max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    
+    # Number of times a project was given this artifact instead of producing its own
+    reuse_count = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'kind'], name='unique_artifact_kind_per_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.key[:12]}"
@@ -0,0 +1,133 @@
+"""
+Visualizations rendered on request.
+
+Processing only produces the modified WAV, plus the render state that
+incremental edits use. Each view is drawn the first time it is requested,
+in one format and width. The drawing uses the project's audio, its modified
+WAV and its stored envelope. The result goes into the artifact store under
+the project's inputs key, so projects with the same inputs share it and no
+view is drawn twice.
+
+The inputs key plus the view, format and width is the ETag, and
+inputs_changed_at is Last-Modified. A browser revalidating an image gets a
+304 without any rendering.
+
+The exception is the gallery thumbnail: a small WebP (PNG where Pillow
+lacks WebP) of the final view, which processing renders right away.
+"""
+from django.conf import settings
+from django.urls import reverse
+
+from . import artifacts
+
+VIEWS = ('final', 'natural', 'comparison')
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+DEFAULT_WIDTH = 1600  # pixels; the 16x3 inch figure at 100 dpi
+
+THUMBNAIL = 'thumbnail'
+THUMBNAIL_FORMATS = {'webp': 'image/webp', 'png': 'image/png'}
+THUMBNAIL_WIDTH = 320
+
+
+def widths():
+    """Widths a view can be requested at, so the stored renders stay bounded"""
+    return tuple(getattr(settings, 'AUDIO_RENDER_WIDTHS', (400, 800, DEFAULT_WIDTH, 3200)))
+
+
+def render_kind(view, fmt, width):
+    return f'{view}_{width}_{fmt}'
+
+
+def parse_width(value):
+    """Requested width (query string value or None) as one of widths(); raises ValueError"""
+    if value in (None, ''):
+        return DEFAULT_WIDTH
+    try:
+        width = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('width must be an integer')
+    if width not in widths():
+        raise ValueError(f"width must be one of {', '.join(map(str, widths()))}")
+    return width
+
+
+def thumbnail_format():
+    fmt = getattr(settings, 'AUDIO_THUMBNAIL_FORMAT', 'webp')
+    if fmt == 'webp':
+        from PIL import features  # Pillow comes with matplotlib; WebP support is optional
+
+        if not features.check('webp'):
+            return 'png'
+    return fmt
+
+
+def parse_request(view, fmt, width):
+    """
+    (width, content type) of a render request, width being the query
+    string value or None. Raises LookupError for an unknown view or format
+    and ValueError for a width that is not offered.
+    """
+    if view == THUMBNAIL:
+        if fmt != thumbnail_format():
+            raise LookupError(f'Thumbnails are {thumbnail_format()}')
+        return THUMBNAIL_WIDTH, THUMBNAIL_FORMATS[fmt]
+    if view not in VIEWS or fmt not in FORMATS:
+        raise LookupError(f'Unknown visualization {view}.{fmt}')
+    return parse_width(width), FORMATS[fmt]
+
+
+def etag(project, view, fmt, width):
+    return f'{project.inputs_key}-{render_kind(view, fmt, width)}'
+
+
+def render(project, view, fmt, width):
+    """File name of the stored render, drawn on first request"""
+    kind = render_kind(view, fmt, width)
+    name = artifacts.lookup(project.inputs_key, kind)
+    if name is None:
+        from .audio_processor import AudioProcessor  # which imports this module
+
+        data = AudioProcessor().render_project_view(project, view, fmt, width)
+        name = artifacts.put(project.inputs_key, kind, fmt, data)
+    return name
+
+
+def thumbnail_kind():
+    return render_kind(THUMBNAIL, thumbnail_format(), THUMBNAIL_WIDTH)
+
+
+def render_thumbnail(project):
+    return render(project, THUMBNAIL, thumbnail_format(), THUMBNAIL_WIDTH)
+
+
+def thumbnail_url(project):
+    """URL of the gallery thumbnail; older projects fall back to their full final drawing"""
+    if project.inputs_key:
+        return reverse('api_project_render', args=[project.id, THUMBNAIL, thumbnail_format()])
+    return project.final_drawing.url if project.final_drawing else None
+
+
+def view_urls(project, width=None):
+    """
+    {view: {format: url}} of a project's visualizations. Projects processed
+    before views were rendered on request keep the files they have.
+    """
+    if project.inputs_key:
+        query = f'?width={width}' if width else ''
+        return {
+            view: {
+                fmt: reverse('api_project_render', args=[project.id, view, fmt]) + query
+                for fmt in FORMATS
+            }
+            for view in VIEWS
+        }
+
+    legacy = {'final': ('final_drawing', 'final_drawing_svg'),
+              'natural': ('natural_lang', 'natural_lang_svg'),
+              'comparison': ('wave_comparison', 'wave_comparison_svg')}
+    urls = {}
+    for view, fields in legacy.items():
+        files = {fmt: getattr(project, field) for fmt, field in zip(FORMATS, fields)}
+        if files['png']:
+            urls[view] = {fmt: f.url for fmt, f in files.items() if f}
+    return urls
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from .envelope_store import parse_envelope_payload
+from .jobs import parse_dirty_range
 from .models import AudioProject
 
 
@@ -43,50 +45,80 @@ class AudioProjectSerializer(serializers.ModelSerializer):
             return self.context['request'].build_absolute_uri(obj.modified_file.url) if 'request' in self.context else obj.modified_file.url
         return None
     
+    def visualization_url(self, obj, view, fmt):
+        """URL of a view, rendered on request (see renders)"""
+        url = obj.visualization_urls.get(view, {}).get(fmt)
+        if url and 'request' in self.context:
+            return self.context['request'].build_absolute_uri(url)
+        return url
+    
     def get_final_drawing_url(self, obj):
-        if obj.final_drawing:
-            return self.context['request'].build_absolute_uri(obj.final_drawing.url) if 'request' in self.context else obj.final_drawing.url
-        return None
+        return self.visualization_url(obj, 'final', 'png')
     
     def get_final_drawing_svg_url(self, obj):
-        if obj.final_drawing_svg:
-            return self.context['request'].build_absolute_uri(obj.final_drawing_svg.url) if 'request' in self.context else obj.final_drawing_svg.url
-        return None
+        return self.visualization_url(obj, 'final', 'svg')
     
     def get_natural_lang_url(self, obj):
-        if obj.natural_lang:
-            return self.context['request'].build_absolute_uri(obj.natural_lang.url) if 'request' in self.context else obj.natural_lang.url
-        return None
+        return self.visualization_url(obj, 'natural', 'png')
     
     def get_natural_lang_svg_url(self, obj):
-        if obj.natural_lang_svg:
-            return self.context['request'].build_absolute_uri(obj.natural_lang_svg.url) if 'request' in self.context else obj.natural_lang_svg.url
-        return None
+        return self.visualization_url(obj, 'natural', 'svg')
     
     def get_wave_comparison_url(self, obj):
-        if obj.wave_comparison:
-            return self.context['request'].build_absolute_uri(obj.wave_comparison.url) if 'request' in self.context else obj.wave_comparison.url
-        return None
+        return self.visualization_url(obj, 'comparison', 'png')
     
     def get_wave_comparison_svg_url(self, obj):
-        if obj.wave_comparison_svg:
-            return self.context['request'].build_absolute_uri(obj.wave_comparison_svg.url) if 'request' in self.context else obj.wave_comparison_svg.url
-        return None
+        return self.visualization_url(obj, 'comparison', 'svg')
+
+
+class AudioProjectListSerializer(serializers.ModelSerializer):
+    """
+    Summary of a project for lists: no envelope or wave parameters and only
+    the thumbnail and full final drawing URLs. Use it with
+    AudioProject.objects.for_listing().
+    """
+    thumbnail_url = serializers.SerializerMethodField()
+    final_drawing_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AudioProject
+        fields = [
+            'id', 'name', 'description', 'wave_type',
+            'background_color', 'positive_color', 'negative_color',
+            'created_at', 'updated_at', 'is_processing', 'processing_error',
+            'thumbnail_url', 'final_drawing_url'
+        ]
+        read_only_fields = fields
+    
+    def absolute(self, url):
+        if url and 'request' in self.context:
+            return self.context['request'].build_absolute_uri(url)
+        return url
+    
+    def get_thumbnail_url(self, obj):
+        return self.absolute(obj.thumbnail_url)
+    
+    def get_final_drawing_url(self, obj):
+        return self.absolute(obj.visualization_urls.get('final', {}).get('png'))
 
 
 class EnvelopeUpdateSerializer(serializers.Serializer):
     """Serializer for envelope data updates"""
     envelope_data = serializers.JSONField()
+    dirty_range = serializers.JSONField(required=False)
     
     def validate_envelope_data(self, value):
-        """Validate envelope data structure"""
-        if not isinstance(value, dict):
-            raise serializers.ValidationError("Envelope data must be a dictionary")
-        
-        if 'positive' in value and not isinstance(value['positive'], list):
-            raise serializers.ValidationError("Positive envelope data must be a list")
+        """Validate envelope data structure (keypoint or dense form)"""
+        try:
+            parse_envelope_payload(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
         
-        if 'negative' in value and not isinstance(value['negative'], list):
-            raise serializers.ValidationError("Negative envelope data must be a list")
-        
-        return value
\ No newline at end of file
+        return value
+    
+    def validate_dirty_range(self, value):
+        """Optional [start, end) sample range the edit touched"""
+        try:
+            return parse_dirty_range(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import struct
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from scipy.io import wavfile
+
+from . import artifacts, audio_cache, binary_audio, dsp, envelope_store, jobs, renders
+from .audio_processor import AudioProcessor
+from .dsp_reference import reference_apply_envelope, reference_strict_sign_subdivision
+from .models import Artifact, AudioProject, ProcessingJob
+
+
+class MediaRootMixin:
+    """
+    Runs each test against its own temporary MEDIA_ROOT, with the disk audio
+    cache inside it (or none, with audio_cache_dir = False) and an empty
+    in-memory audio cache.
+    """
+    audio_cache_dir = True
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        cache_dir = os.path.join(self.media_root, 'cache') if self.audio_cache_dir else None
+        override = override_settings(MEDIA_ROOT=self.media_root, AUDIO_CACHE_DIR=cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        audio_cache.clear()
+        self.addCleanup(audio_cache.clear)
+
+
+class ApplyEnvelopeTests(SimpleTestCase):
+    """dsp.apply_envelope must match the per-sample loop exactly."""
+
+    def assertMatchesReference(self, audio, pos, neg):
+        expected = reference_apply_envelope(audio, pos, neg)
+        actual = dsp.apply_envelope(audio, pos, neg)
+        np.testing.assert_array_equal(actual, expected)
+        self.assertEqual(actual.dtype, expected.dtype)
+
+    def test_mixed_signs(self):
+        rng = np.random.default_rng(0)
+        audio = rng.uniform(-1, 1, 5000)
+        self.assertMatchesReference(audio, rng.uniform(0, 1, 5000), rng.uniform(-1, 0, 5000))
+
+    def test_zero_samples_are_untouched(self):
+        audio = np.array([0.0, 0.5, -0.0, -0.5, 0.0])
+        out = dsp.apply_envelope(audio, np.full(5, 0.9), np.full(5, -0.9))
+        np.testing.assert_array_equal(out, [0.0, 0.9, 0.0, -0.9, 0.0])
+        self.assertMatchesReference(audio, np.full(5, 0.9), np.full(5, -0.9))
+
+    def test_shorter_envelopes_leave_the_tail(self):
+        audio = np.sin(np.linspace(0, 20, 1000))
+        self.assertMatchesReference(audio, np.full(300, 0.25), np.full(700, -0.75))
+        self.assertMatchesReference(audio, np.array([]), np.array([]))
+
+    def test_longer_envelopes_are_cut(self):
+        audio = np.sin(np.linspace(0, 20, 100))
+        out = dsp.apply_envelope(audio, np.full(150, 0.5), np.full(200, -0.5))
+        self.assertEqual(len(out), 100)
+        self.assertMatchesReference(audio, np.full(150, 0.5), np.full(200, -0.5))
+
+    def test_signs_come_from_the_original(self):
+        # a positive sample given a negative envelope value must not then take the negative one
+        audio = np.array([0.5, -0.5, 0.25])
+        self.assertMatchesReference(audio, np.array([-0.3, -0.3, -0.3]), np.array([0.4, 0.4, 0.4]))
+
+    def test_input_is_not_modified(self):
+        audio = np.array([0.5, -0.5])
+        dsp.apply_envelope(audio, [0.1, 0.1], [-0.1, -0.1])
+        np.testing.assert_array_equal(audio, [0.5, -0.5])
+
+
+class StrictSignSubdivisionTests(SimpleTestCase):
+    """dsp.strict_sign_subdivision must match the per-point implementation exactly."""
+
+    def assertMatchesReference(self, x, y):
+        expected = reference_strict_sign_subdivision(x, y)
+        actual = dsp.strict_sign_subdivision(x, y)
+        for exp, act in zip(expected, actual):
+            np.testing.assert_array_equal(act, exp)
+            self.assertEqual(act.dtype.kind, exp.dtype.kind)
+
+    def test_random_waveform(self):
+        rng = np.random.default_rng(0)
+        y = rng.normal(size=5000)
+        self.assertMatchesReference(np.arange(len(y)), y)
+
+    def test_sine_with_exact_zeros(self):
+        y = np.round(np.sin(np.linspace(0, 20 * np.pi, 2001)), 3)
+        self.assertMatchesReference(np.arange(len(y)), y)
+
+    def test_zero_samples_and_flat_crossings(self):
+        y = np.array([0.0, -1e-13, 0.0, -0.5, 0.5, 0.0, 0.0, -0.0, -2.0, 1.0])
+        self.assertMatchesReference(np.arange(len(y)), y)
+
+    def test_nan_samples(self):
+        y = np.array([0.5, np.nan, -0.5, 0.25, np.nan, np.nan, -1.0])
+        self.assertMatchesReference(np.arange(len(y)), y)
+
+    def test_float_x(self):
+        y = np.sin(np.linspace(0, 6, 50))
+        self.assertMatchesReference(np.linspace(0, 1, 50), y)
+
+    def test_no_crossings(self):
+        y = np.linspace(0.1, 1.0, 10)
+        self.assertMatchesReference(np.arange(10), y)
+
+    def test_short_inputs(self):
+        self.assertMatchesReference(np.arange(1), np.array([-0.3]))
+        self.assertMatchesReference(np.arange(2), np.array([-0.3, 0.3]))
+        for arr in dsp.strict_sign_subdivision(np.array([]), np.array([])):
+            self.assertEqual(len(arr), 0)
+
+
+class MinmaxDecimateTests(SimpleTestCase):
+    """minmax_decimate keeps every bin's extremes, in order, and nothing else."""
+
+    def assertKeepsExtremes(self, y, n_bins):
+        x_out, y_out = dsp.minmax_decimate(y, n_bins)
+        self.assertLessEqual(len(y_out), 2 * n_bins)
+        self.assertTrue(np.all(np.diff(x_out) > 0))
+        np.testing.assert_array_equal(y_out, y[x_out])
+        bin_size = dsp.minmax_bin_size(len(y), n_bins)
+        for start in range(0, len(y), bin_size):
+            chunk = y[start:start + bin_size]
+            kept = y_out[(x_out >= start) & (x_out < start + bin_size)]
+            self.assertEqual(kept.min(), chunk.min())
+            self.assertEqual(kept.max(), chunk.max())
+            self.assertLessEqual(len(kept), 2)
+            if len(kept) == 2:
+                # in sample order: whichever extreme comes first in the bin comes first here
+                first = min(chunk.argmin(), chunk.argmax())
+                self.assertEqual(kept[0], chunk[first])
+        return x_out, y_out
+
+    def test_random_signal(self):
+        y = np.random.default_rng(0).normal(size=10000)
+        self.assertKeepsExtremes(y, 100)
+
+    def test_short_tail_bin(self):
+        y = np.random.default_rng(1).normal(size=1003)
+        x_out, _ = self.assertKeepsExtremes(y, 100)
+        self.assertEqual(dsp.minmax_bin_size(1003, 100), 11)
+        self.assertGreaterEqual(x_out[-1], 990)
+
+    def test_flat_bins_contribute_one_point(self):
+        y = np.concatenate([np.zeros(50), np.linspace(-1, 1, 50), np.full(50, 0.5)])
+        x_out, _ = self.assertKeepsExtremes(y, 15)
+        # five flat bins of zeros, five rising, five flat at 0.5
+        self.assertEqual(len(x_out), 5 + 10 + 5)
+
+    def test_short_input_is_returned_as_is(self):
+        y = np.arange(10.0)
+        x_out, y_out = dsp.minmax_decimate(y, 5)
+        np.testing.assert_array_equal(x_out, np.arange(10))
+        np.testing.assert_array_equal(y_out, y)
+
+    def test_bins_and_order(self):
+        lo, hi = dsp.minmax_bins(np.array([3, 1, 2, 9, 0, 5, 7]), 3, start=6)
+        np.testing.assert_array_equal(lo, [7, 10, 12])
+        np.testing.assert_array_equal(hi, [6, 9, 12])
+        np.testing.assert_array_equal(dsp.minmax_order(lo, hi), [6, 7, 9, 10, 12])
+
+    def test_signs_survive_subdivision(self):
+        y = np.sin(np.linspace(0, 40 * np.pi, 20000)) + np.random.default_rng(2).normal(0, 0.05, 20000)
+        n_bins = 250
+        x_out, y_out = dsp.minmax_decimate(y, n_bins)
+        new_x, new_y, colour = dsp.strict_sign_subdivision(x_out, y_out)
+        bin_size = dsp.minmax_bin_size(len(y), n_bins)
+        for start in range(0, len(y), bin_size):
+            chunk = y[start:start + bin_size]
+            in_bin = (new_x >= start) & (new_x < start + bin_size)
+            expected = {int(v) for v in (chunk.min() >= 0, chunk.max() >= 0)}
+            self.assertTrue(expected <= set(colour[in_bin].astype(int)))
+
+
+class EncodeWavTests(SimpleTestCase):
+    """dsp.encode_wav_int16 must produce the same file as scipy's wavfile.write."""
+
+    def test_matches_scipy_writer(self):
+        rng = np.random.default_rng(1)
+        audio = rng.uniform(-1.5, 1.5, 12345)  # out of range samples get clipped
+        expected_pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            wavfile.write(path, 44100, expected_pcm)
+            with open(path, 'rb') as f:
+                expected = f.read()
+        finally:
+            os.unlink(path)
+        self.assertEqual(dsp.encode_wav_int16(audio, 44100), expected)
+
+    def test_round_trip(self):
+        audio = np.sin(np.linspace(0, 40 * np.pi, 8000))
+        sample_rate, pcm = wavfile.read(io.BytesIO(dsp.encode_wav_int16(audio, 22050)))
+        self.assertEqual(sample_rate, 22050)
+        np.testing.assert_array_equal(pcm, (audio * 32767).astype(np.int16))
+
+    def test_empty(self):
+        self.assertEqual(len(dsp.encode_wav_int16(np.array([]), 44100)), 44)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.project = AudioProject.objects.create(name='queued', wave_type='sine')
+
+    def test_enqueue_marks_project_processing(self):
+        job = jobs.enqueue_project(self.project, {'positive': [0.5], 'negative': [-0.5]})
+        self.assertEqual(job.status, ProcessingJob.STATUS_QUEUED)
+        self.project.refresh_from_db()
+        self.assertTrue(self.project.is_processing)
+        self.assertEqual(jobs.job_status(self.project)['queue_position'], 1)
+
+    def other_project(self):
+        return AudioProject.objects.create(name='other', wave_type='sine')
+
+    @override_settings(AUDIO_JOB_QUEUE_LIMIT=2)
+    def test_queue_is_bounded(self):
+        jobs.enqueue_project(self.project)
+        jobs.enqueue_project(self.other_project())
+        with self.assertRaises(jobs.QueueFull):
+            jobs.enqueue_project(self.other_project())
+        # updates to an already queued project are folded in, not rejected
+        jobs.enqueue_project(self.project, {'positive': [1.0], 'negative': [-1.0]})
+
+    def test_claim_is_oldest_first_and_exclusive(self):
+        first = jobs.enqueue_project(self.project)
+        second = jobs.enqueue_project(self.other_project())
+        claimed = jobs.claim_next_job('w1')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, ProcessingJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(jobs.claim_next_job('w2').id, second.id)
+        self.assertIsNone(jobs.claim_next_job('w3'))
+
+    @override_settings(AUDIO_JOB_MAX_ATTEMPTS=2, AUDIO_JOB_RETRY_BACKOFF=0)
+    def test_failed_job_is_retried_then_failed(self):
+        job = jobs.enqueue_project(self.project)
+        jobs.claim_next_job('w1')
+        job = jobs.complete_job(job.id, False, 'boom')
+        self.assertEqual(job.status, ProcessingJob.STATUS_QUEUED)
+        self.assertEqual(job.last_error, 'boom')
+
+        jobs.claim_next_job('w1')
+        job = jobs.complete_job(job.id, False, 'boom again')
+        self.assertEqual(job.status, ProcessingJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue_project(self.project)
+        jobs.claim_next_job('dead-worker')
+        self.assertEqual(jobs.requeue_stale_jobs(), 0)  # its lease has not run out yet
+
+        ProcessingJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.STATUS_QUEUED)
+
+    def test_jobs_of_live_workers_are_not_requeued(self):
+        dead = jobs.enqueue_project(self.project)
+        live = jobs.enqueue_project(self.other_project())
+        jobs.claim_next_job('dead-worker')
+        jobs.claim_next_job('live-worker')
+        past = timezone.now() - timedelta(minutes=5)
+        ProcessingJob.objects.update(heartbeat_at=past)
+        jobs.heartbeat('live-worker')
+
+        # a second worker starting up takes over only the dead worker's job
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        self.assertEqual(jobs.claim_next_job('new-worker').id, dead.id)
+        live.refresh_from_db()
+        self.assertEqual((live.status, live.worker), (ProcessingJob.STATUS_RUNNING, 'live-worker'))
+        self.assertIsNone(jobs.claim_next_job('new-worker'))
+
+
+@override_settings(AUDIO_JOB_DEBOUNCE=0)
+class JobCoalescingTests(TestCase):
+    def setUp(self):
+        self.project = AudioProject.objects.create(name='coalesced', wave_type='sine')
+
+    def envelope(self, value):
+        return {'positive': [value], 'negative': [-value]}
+
+    def test_pending_updates_keep_only_latest_envelope(self):
+        first = jobs.enqueue_project(self.project, self.envelope(0.1))
+        jobs.enqueue_project(self.project, self.envelope(0.2))
+        last = jobs.enqueue_project(self.project, self.envelope(0.3))
+
+        self.assertEqual(first.id, last.id)
+        self.assertEqual(ProcessingJob.objects.count(), 1)
+        self.assertEqual(last.envelope_data, envelope_store.normalize_payload(self.envelope(0.3)))
+        self.assertEqual(last.coalesced_count, 2)
+        self.assertEqual(jobs.queue_metrics()['coalesced_updates'], 2)
+
+    def test_one_running_job_per_project(self):
+        running = jobs.enqueue_project(self.project, self.envelope(0.1))
+        self.assertEqual(jobs.claim_next_job('w1').id, running.id)
+
+        # a save while processing queues a follow-up that waits for the running one
+        follow_up = jobs.enqueue_project(self.project, self.envelope(0.2))
+        self.assertNotEqual(follow_up.id, running.id)
+        self.assertIsNone(jobs.claim_next_job('w2'))
+
+        jobs.complete_job(running.id, True)
+        self.project.refresh_from_db()
+        self.assertTrue(self.project.is_processing)
+        self.assertEqual(jobs.claim_next_job('w2').id, follow_up.id)
+
+    def test_racing_enqueues_supersede_older_job(self):
+        older = ProcessingJob.objects.create(project=self.project, envelope_data=self.envelope(0.1))
+        newer = ProcessingJob.objects.create(project=self.project, envelope_data=self.envelope(0.2))
+
+        self.assertEqual(jobs.claim_next_job('w1').id, newer.id)
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual(older.status, ProcessingJob.STATUS_SUPERSEDED)
+        self.assertEqual(newer.coalesced_count, 1)
+
+    def test_failed_job_with_newer_update_is_not_retried(self):
+        running = jobs.enqueue_project(self.project, self.envelope(0.1))
+        jobs.claim_next_job('w1')
+        jobs.enqueue_project(self.project, self.envelope(0.2))
+
+        job = jobs.complete_job(running.id, False, 'boom')
+        self.assertEqual(job.status, ProcessingJob.STATUS_SUPERSEDED)
+
+
+class EnvelopeStoreTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = AudioProject.objects.create(name='stored', wave_type='sine')
+
+    def test_round_trip_through_file(self):
+        pos = dsp.Keypoints(np.array([0, 1000, 4999]), np.array([0.0, 0.8, 0.25]))
+        neg = dsp.Keypoints(np.array([10]), np.array([-0.5]))
+        self.project.store_envelope(pos, neg, 5000)
+        self.project.save()
+
+        self.assertEqual(self.project.envelope_data, {
+            'format': 'keypoints', 'dtype': 'float32', 'length': 5000,
+            'keypoints': {'positive': 3, 'negative': 1},
+        })
+        loaded_pos, loaded_neg = AudioProject.objects.get(id=self.project.id).load_envelope()
+        self.assertEqual(loaded_pos.value.dtype, np.float32)
+        np.testing.assert_array_equal(loaded_pos.index, pos.index)
+        np.testing.assert_allclose(loaded_pos.value, pos.value, rtol=1e-6)
+        np.testing.assert_allclose(loaded_neg.value, neg.value, rtol=1e-6)
+
+    def test_replacing_envelope_removes_old_file(self):
+        keypoints = dsp.Keypoints(np.array([0]), np.array([1.0]))
+        self.project.store_envelope(keypoints, keypoints, 10)
+        first = self.project.envelope_file.path
+        self.project.store_envelope(keypoints, keypoints, 10)
+        self.assertTrue(os.path.exists(self.project.envelope_file.path))
+        self.assertNotEqual(self.project.envelope_file.path, first)
+        self.assertFalse(os.path.exists(first))
+
+    def test_deleting_project_removes_file(self):
+        keypoints = dsp.Keypoints(np.array([0]), np.array([1.0]))
+        self.project.store_envelope(keypoints, keypoints, 10)
+        self.project.save()
+        path = self.project.envelope_file.path
+        self.assertEqual(self.client.delete(f'/api/projects/{self.project.id}/delete/').status_code, 204)
+        self.assertFalse(os.path.exists(path))
+
+        other = AudioProject.objects.create(name='other', wave_type='sine')
+        other.store_envelope(keypoints, keypoints, 10)
+        other.save()
+        path = other.envelope_file.path
+        self.client.post(f'/project/{other.id}/delete/')
+        self.assertFalse(AudioProject.objects.filter(id=other.id).exists())
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(AUDIO_ENVELOPE_DTYPE='float16')
+    def test_float16(self):
+        keypoints = dsp.Keypoints(np.array([0, 1]), np.array([0.5, 0.25]))
+        pos, _ = envelope_store.decode_envelope(envelope_store.encode_envelope(keypoints, keypoints))
+        self.assertEqual(pos.value.dtype, np.float16)
+        np.testing.assert_array_equal(pos.value, [0.5, 0.25])
+
+    def test_dense_file_from_earlier_format_is_readable(self):
+        buffer = io.BytesIO()
+        dense = np.concatenate([np.linspace(0, 1, 50), np.linspace(1, 0, 51)[1:]]).astype(np.float32)
+        np.savez_compressed(buffer, positive=dense, negative=-dense)
+        pos, neg = envelope_store.decode_envelope(buffer.getvalue())
+        np.testing.assert_array_equal(pos.index, [0, 49, 99])
+        np.testing.assert_allclose(dsp.keypoints_to_dense(neg, 100), -dense, atol=1e-6)
+
+    def test_unconverted_json_envelope_is_still_readable(self):
+        self.project.envelope_data = {'positive': [0.5, 0.5], 'negative': [-0.5, -0.5]}
+        pos, neg = self.project.load_envelope()
+        np.testing.assert_array_equal(dsp.keypoints_to_dense(neg, 3), [-0.5, -0.5, 0.0])
+
+    def test_no_envelope(self):
+        self.assertIsNone(self.project.load_envelope())
+
+
+class KeypointEnvelopeTests(SimpleTestCase):
+    def test_drawn_ramps_compress_losslessly(self):
+        n = 200_000
+        dense = np.zeros(n)
+        dense[1000:5001] = np.linspace(0, 0.8, 4001)
+        dense[5000:20001] = np.linspace(0.8, 0.3, 15001)
+        dense[90000] = 0.5
+        keypoints = dsp.dense_to_keypoints(dense)
+        self.assertLess(len(keypoints.index), 12)
+        np.testing.assert_allclose(dsp.keypoints_to_dense(keypoints, n), dense, atol=dsp.KEYPOINT_TOLERANCE)
+
+    def test_arbitrary_dense_envelope_round_trips(self):
+        dense = np.random.default_rng(2).uniform(-1, 1, 1000)
+        keypoints = dsp.dense_to_keypoints(dense)
+        np.testing.assert_allclose(dsp.keypoints_to_dense(keypoints, 1000), dense, atol=dsp.KEYPOINT_TOLERANCE)
+
+    def test_apply_matches_dense_apply(self):
+        rng = np.random.default_rng(3)
+        audio = rng.uniform(-1, 1, 5000)
+        pos = dsp.Keypoints(np.array([100, 2000, 4000]), np.array([0.2, 0.9, 0.1]))
+        neg = dsp.Keypoints(np.array([0, 4999]), np.array([-0.3, -0.7]))
+        expected = dsp.apply_envelope(audio, dsp.keypoints_to_dense(pos, 5000), dsp.keypoints_to_dense(neg, 5000))
+        np.testing.assert_array_equal(dsp.apply_envelope_keypoints(audio, pos, neg), expected)
+
+    def test_polyline_draws_the_expanded_envelope(self):
+        keypoints = dsp.Keypoints(np.array([10, 50, 120]), np.array([0.2, 0.9, 0.1]))
+        x, y = dsp.keypoint_polyline(keypoints, 100)
+        np.testing.assert_allclose(np.interp(np.arange(100), x, y), dsp.keypoints_to_dense(keypoints, 100))
+
+    def test_payload_formats_agree(self):
+        dense = [0.0, 0.25, 0.5, 0.5, 0.5]
+        from_dense = envelope_store.normalize_payload({'positive': dense, 'negative': []})
+        from_keypoints = envelope_store.normalize_payload({
+            'format': 'keypoints', 'length': 5,
+            'positive': [[2, 0.5], [0, 0.0], [4, 0.9], [4, 0.5], [5 - 1, 0.5]], 'negative': [],
+        })
+        for payload in (from_dense, from_keypoints):
+            pos, neg, _ = envelope_store.parse_envelope_payload(payload)
+            np.testing.assert_allclose(dsp.keypoints_to_dense(pos, 5), dense)
+            np.testing.assert_array_equal(dsp.keypoints_to_dense(neg, 5), np.zeros(5))
+
+    def test_dense_payload_is_zero_past_its_end(self):
+        pos, _, length = envelope_store.parse_envelope_payload({'positive': [0.5, 0.5], 'negative': []})
+        self.assertEqual(length, 2)
+        np.testing.assert_array_equal(dsp.keypoints_to_dense(pos, 4), [0.5, 0.5, 0.0, 0.0])
+
+    def test_malformed_payloads_are_rejected(self):
+        for payload in (
+            [],
+            {'positive': 'abc'},
+            {'format': 'keypoints', 'positive': [[1.5, 0.2]]},
+            {'format': 'keypoints', 'positive': [[-1, 0.2]]},
+            {'format': 'keypoints', 'length': -3, 'positive': [[3, 0.2]]},
+            {'format': 'keypoints', 'positive': [[1, 0.2, 3]]},
+            {'format': 'keypoints', 'positive': [[1, None]]},
+        ):
+            with self.assertRaises(ValueError, msg=payload):
+                envelope_store.parse_envelope_payload(payload)
+
+
+def parse_binary_audio(body):
+    """Client-side reading of the binary_audio format"""
+    assert body[:4] == binary_audio.MAGIC
+    (header_length,) = struct.unpack('<I', body[4:8])
+    header = json.loads(body[8:8 + header_length])
+    samples = np.frombuffer(body, dtype='<' + ('f4' if header['dtype'] == 'float32' else 'i2'),
+                            offset=header['data_offset'])
+    return header, samples
+
+
+@override_settings(AUDIO_CACHE_DIR=None)
+class BinaryAudioTests(TestCase):
+    def setUp(self):
+        self.project = AudioProject.objects.create(
+            name='binary', wave_type='sine', wave_parameters={'freq': 440, 'spw': 100, 'periods': 10}
+        )
+        self.url = f'/api/projects/{self.project.id}/audio-data/binary/'
+        self.expected, _ = AudioProcessor().load_project_audio(self.project)
+
+    def test_header_and_float32_samples(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(body), int(response['Content-Length']))
+
+        header, samples = parse_binary_audio(body)
+        self.assertEqual(header['data_offset'] % 8, 0)
+        self.assertEqual(header['sample_rate'], 44000)
+        self.assertEqual(header['length'], 1000)
+        self.assertEqual(header['envelope']['format'], 'keypoints')
+        np.testing.assert_array_equal(samples, self.expected.astype(np.float32))
+
+    def test_int16(self):
+        header, samples = parse_binary_audio(b''.join(self.client.get(self.url, {'dtype': 'int16'}).streaming_content))
+        self.assertEqual(header['dtype'], 'int16')
+        np.testing.assert_allclose(samples * header['scale'], self.expected, atol=1 / 32767)
+        self.assertEqual(self.client.get(self.url, {'dtype': 'float64'}).status_code, 400)
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        plain = b''.join(self.client.get(self.url).streaming_content)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    def test_gzip_q_values(self):
+        for accept, expected in (('gzip;q=0', False), ('deflate, gzip; q=0.0', False),
+                                 ('gzip;q=0.5', True), ('*', True), ('*, gzip;q=0', False),
+                                 ('*;q=0', False), ('identity', False), ('x-gzip', True)):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(response.get('Content-Encoding') == 'gzip', expected, accept)
+
+    def test_byte_ranges(self):
+        plain = b''.join(self.client.get(self.url).streaming_content)
+        size = len(plain)
+        for range_header, expected in (
+            ('bytes=0-7', plain[:8]),
+            ('bytes=100-', plain[100:]),
+            ('bytes=-16', plain[-16:]),
+            (f'bytes=5-{size + 100}', plain[5:]),
+        ):
+            response = self.client.get(self.url, HTTP_RANGE=range_header, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, 206, range_header)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response.content, expected, range_header)
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+    def test_invalid_range_is_ignored(self):
+        plain = b''.join(self.client.get(self.url).streaming_content)
+        for range_header in ('bytes=5-3', f'bytes={len(plain) + 10}-{len(plain) + 5}', 'bytes=0-1,4-5'):
+            response = self.client.get(self.url, HTTP_RANGE=range_header)
+            self.assertEqual(response.status_code, 200, range_header)
+            self.assertFalse(response.has_header('Content-Range'))
+            self.assertEqual(b''.join(response.streaming_content), plain, range_header)
+
+
+class AudioCacheTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.processor = AudioProcessor()
+
+    def uploaded_project(self, samples):
+        project = AudioProject(name='cached', wave_type='uploaded')
+        buffer = io.BytesIO()
+        wavfile.write(buffer, 8000, samples)
+        project.original_file.save('cached.wav', ContentFile(buffer.getvalue()), save=False)
+        project.save()
+        return project
+
+    def test_memory_then_disk_hits(self):
+        project = self.uploaded_project(np.array([0, 100, -200, 50], dtype=np.int16))
+        audio, sample_rate = self.processor.load_project_audio(project)
+        self.assertEqual(sample_rate, 8000)
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertFalse(audio.flags.writeable)
+        np.testing.assert_allclose(audio, [0, 0.5, -1, 0.25])
+
+        self.assertIs(self.processor.load_project_audio(project)[0], audio)
+        audio_cache.clear()
+        mapped, _ = self.processor.load_project_audio(project)
+        self.assertIsInstance(mapped, np.memmap)
+        np.testing.assert_array_equal(mapped, audio)
+
+        stats = audio_cache.stats()
+        self.assertEqual((stats['misses'], stats['memory_hits'], stats['disk_hits']), (0, 0, 1))
+
+    def test_replaced_file_and_parameters_miss(self):
+        project = self.uploaded_project(np.array([0, 100, -200], dtype=np.int16))
+        self.processor.load_project_audio(project)
+        buffer = io.BytesIO()
+        wavfile.write(buffer, 8000, np.array([10, -10], dtype=np.int16))
+        with open(project.original_file.path, 'wb') as f:
+            f.write(buffer.getvalue())
+        audio, _ = self.processor.load_project_audio(project)
+        np.testing.assert_allclose(audio, [1, -1])
+        self.assertEqual(len(os.listdir(audio_cache.project_dir(project.id))), 1)
+
+        wave = AudioProject.objects.create(name='wave', wave_type='sine', wave_parameters={'spw': 10, 'periods': 2})
+        self.assertEqual(len(self.processor.load_project_audio(wave)[0]), 20)
+        wave.wave_parameters = {'spw': 10, 'periods': 3}
+        self.assertEqual(len(self.processor.load_project_audio(wave)[0]), 30)
+        self.assertEqual(audio_cache.stats()['misses'], 4)
+
+    @override_settings(AUDIO_CACHE_MAX_BYTES=100)
+    def test_lru_byte_limit_and_invalidate(self):
+        projects = [
+            AudioProject.objects.create(name=f'w{i}', wave_type='sine', wave_parameters={'spw': 10, 'periods': 1})
+            for i in range(3)
+        ]
+        for project in projects:
+            self.processor.load_project_audio(project)  # 40 bytes each
+        stats = audio_cache.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (2, 80, 1))
+
+        audio_cache.invalidate(projects[2].id)
+        self.assertEqual(audio_cache.stats()['entries'], 1)
+        self.assertFalse(os.path.exists(audio_cache.project_dir(projects[2].id)))
+
+
+class IncrementalProcessingTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.processor = AudioProcessor()
+        self.project = AudioProject.objects.create(
+            name='incremental', wave_type='sine', wave_parameters={'freq': 100, 'spw': 100, 'periods': 200}
+        )
+
+    def envelope(self, positive, negative=((0, -0.5),)):
+        return {'format': 'keypoints', 'length': 20000,
+                'positive': [list(p) for p in positive], 'negative': [list(p) for p in negative]}
+
+    def process(self, envelope, dirty_range=None):
+        project = AudioProject.objects.get(id=self.project.id)
+        success, message = self.processor.process_audio_project(project, envelope, dirty_range)
+        self.assertTrue(success, message)
+        return project, message
+
+    def wav(self, project):
+        with project.modified_file.open('rb') as f:
+            return f.read()
+
+    def test_edit_matches_full_processing(self):
+        self.process(self.envelope([(0, 0.5)]))
+        edited = self.envelope([(0, 0.5), (5000, 0.5), (5500, 0.9), (6000, 0.5)])
+        project, message = self.process(edited, (5000, 6000))
+        self.assertIn('samples 4998-6006 updated', message)
+        self.assertIn('stale views: final, natural, comparison', message)
+        patched = self.wav(project)
+
+        audio_cache.clear()
+        Artifact.objects.all().delete()  # process the reference instead of reusing the patched file
+        reference, message = self.process(edited)
+        self.assertEqual(message, 'Processing completed successfully')
+        self.assertEqual(patched, self.wav(reference))
+
+    def test_range_is_widened_to_the_real_change(self):
+        self.process(self.envelope([(0, 0.5)]))
+        edited = self.envelope([(0, 0.5), (100, 0.5), (15000, 0.2)])
+        project, message = self.process(edited, (300, 310))
+        self.assertIn('samples 98-20000 updated', message)
+        reference = AudioProject.objects.create(name='reference', wave_type='sine',
+                                                wave_parameters=self.project.wave_parameters)
+        Artifact.objects.all().delete()
+        self.processor.process_audio_project(reference, edited)
+        self.assertNotEqual(reference.modified_file.name, project.modified_file.name)
+        self.assertEqual(self.wav(project), self.wav(reference))
+
+    def render(self, project, view):
+        response = self.client.get(f'/api/projects/{project.id}/render/{view}.png')
+        self.assertEqual(response.status_code, 200)
+        name = artifacts.lookup(project.inputs_key, renders.render_kind(view, 'png', renders.DEFAULT_WIDTH))
+        return os.stat(artifacts.storage().path(name)).st_mtime_ns
+
+    def test_sub_pixel_edit_keeps_renders(self):
+        project, _ = self.process(self.envelope([(0, 0.5)]))
+        images = [self.render(project, view) for view in ('natural', 'final')]
+        project, message = self.process(self.envelope([(0, 0.5), (700, 0.5), (710, 0.5001), (720, 0.5)]), (700, 720))
+        self.assertIn('stale views: none', message)
+        # the stored renders are moved under the new inputs, not drawn again
+        self.assertEqual([self.render(project, view) for view in ('natural', 'final')], images)
+        self.assertIsNotNone(artifacts.lookup(project.inputs_key, renders.thumbnail_kind()))
+
+    def test_edit_drops_stale_renders(self):
+        project, _ = self.process(self.envelope([(0, 0.5)]))
+        self.render(project, 'natural')
+        with mock.patch.object(renders, 'render_thumbnail') as render_thumbnail:
+            project, message = self.process(
+                self.envelope([(0, 0.5), (5000, 0.5), (5500, 0.9), (6000, 0.5)]), (5000, 6000)
+            )
+        self.assertIn('stale views: final, natural, comparison', message)
+        self.assertIsNone(artifacts.lookup(project.inputs_key, renders.render_kind('natural', 'png', renders.DEFAULT_WIDTH)))
+        # the thumbnail is stale too and is left to be drawn when the gallery asks for it
+        render_thumbnail.assert_not_called()
+        self.assertEqual(list(Artifact.objects.values_list('kind', flat=True)), ['modified'])
+        response = self.client.get(project.thumbnail_url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_falls_back_to_full_processing(self):
+        # nothing to patch yet: the initial run applied no envelope
+        self.process(None)
+        project, message = self.process(self.envelope([(0, 0.5)]), (0, 10))
+        self.assertEqual(message, 'Processing completed successfully')
+        project, message = self.process(self.envelope([(0, 0.4)]), (0, 10))
+        self.assertIn('updated', message)
+
+        with override_settings(AUDIO_CACHE_DIR=None):
+            project, message = self.process(self.envelope([(0, 0.3)]), (0, 10))
+        self.assertEqual(message, 'Processing completed successfully')
+
+    @override_settings(AUDIO_JOB_DEBOUNCE=0)
+    def test_queued_dirty_ranges_are_merged(self):
+        job = jobs.enqueue_project(self.project, self.envelope([(0, 0.5)]), [100, 200])
+        jobs.enqueue_project(self.project, self.envelope([(0, 0.4)]), [50, 120])
+        job.refresh_from_db()
+        self.assertEqual(job.dirty_range, (50, 200))
+        jobs.enqueue_project(self.project, self.envelope([(0, 0.3)]))
+        job.refresh_from_db()
+        self.assertIsNone(job.dirty_range)
+        with self.assertRaises(ValueError):
+            jobs.enqueue_project(self.project, self.envelope([(0, 0.3)]), [5, 5])
+
+
+class ArtifactStoreTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.processor = AudioProcessor()
+        self.envelope = {'format': 'keypoints', 'length': 2000, 'positive': [[0, 0.5]], 'negative': [[0, -0.5]]}
+
+    def create(self, name, **fields):
+        project = AudioProject.objects.create(
+            name=name, wave_type='sine', wave_parameters={'freq': 100, 'spw': 100, 'periods': 20}, **fields
+        )
+        success, message = self.processor.process_audio_project(project, self.envelope)
+        self.assertTrue(success, message)
+        return project, message
+
+    def render(self, project):
+        response = self.client.get(f'/api/projects/{project.id}/render/final.png')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_identical_inputs_share_outputs(self):
+        first, _ = self.create('first')
+        second, message = self.create('second')
+        self.assertIn('reused stored results', message)
+        self.assertEqual(artifacts.project_files(first), artifacts.project_files(second))
+        self.assertEqual(len(artifacts.project_files(first)), len(artifacts.KINDS))
+
+        self.assertEqual(self.render(first), self.render(second))
+
+        third, message = self.create('third', background_color='#111111')
+        self.assertNotIn('reused', message)
+        self.assertNotEqual(third.modified_file.name, first.modified_file.name)
+
+        stats = artifacts.stats()
+        # per key: the WAV and the thumbnail, plus the final view requested for the first one
+        self.assertEqual((stats['artifacts'], stats['renders'], stats['keys'], stats['references']), (5, 3, 2, 8))
+        self.assertEqual(stats['reuses'], 1)
+        self.assertEqual(stats['saved_bytes'], stats['referenced_bytes'] - stats['stored_bytes'])
+        self.assertGreater(stats['saved_bytes'], 0)
+
+    def test_deleting_projects_collects_unreferenced_outputs(self):
+        first, _ = self.create('first')
+        second, _ = self.create('second')
+        self.render(first)
+        path = first.modified_file.path
+
+        self.assertEqual(artifacts.delete_project(first), (0, 0))
+        self.assertTrue(os.path.exists(path))
+        deleted, freed = artifacts.delete_project(second)
+        self.assertEqual(deleted, 3)
+        self.assertGreater(freed, 0)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Artifact.objects.exists())
+
+    def test_reprocessing_collects_replaced_outputs(self):
+        project, _ = self.create('project')
+        self.render(project)
+        old_paths = [artifacts.storage().path(name) for name in artifacts.key_files(project.inputs_key)]
+        project = AudioProject.objects.get(id=project.id)
+        success, message = self.processor.process_audio_project(project, {**self.envelope, 'positive': [[0, 0.8]]})
+        self.assertTrue(success, message)
+        self.assertEqual(len(old_paths), 3)
+        self.assertFalse(any(os.path.exists(path) for path in old_paths))
+        # only a project's first processing draws the thumbnail eagerly
+        self.assertEqual(list(Artifact.objects.values_list('kind', flat=True)), ['modified'])
+
+    def test_shared_outputs_are_not_patched(self):
+        first, _ = self.create('first')
+        second, _ = self.create('second')
+        shared = first.modified_file.path
+        with open(shared, 'rb') as f:
+            before = f.read()
+
+        edited = {**self.envelope, 'positive': [[0, 0.5], [500, 0.9], [600, 0.5]]}
+        first = AudioProject.objects.get(id=first.id)
+        success, message = self.processor.process_audio_project(first, edited, (500, 600))
+        self.assertTrue(success, message)
+        self.assertEqual(message, 'Processing completed successfully')
+        self.assertNotEqual(first.modified_file.name, second.modified_file.name)
+        with open(shared, 'rb') as f:
+            self.assertEqual(f.read(), before)
+
+    def test_concurrent_puts_keep_one_file(self):
+        key, kind = 'a' * 64, renders.render_kind('final', 'png', renders.DEFAULT_WIDTH)
+        first = artifacts.put(key, kind, 'png', b'first')
+        # a second request that missed the lookup before the first one stored its render
+        with mock.patch.object(artifacts, 'lookup', return_value=None):
+            second = artifacts.put(key, kind, 'png', b'second')
+
+        self.assertEqual(second, first)
+        self.assertEqual(Artifact.objects.get(key=key).file.name, first)
+        path = artifacts.storage().path(first)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+    def test_stats_endpoint(self):
+        self.create('first')
+        response = self.client.get('/api/artifacts/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['artifacts'], 2)
+
+
+class RenderOnRequestTests(MediaRootMixin, TestCase):
+    audio_cache_dir = False
+
+    def setUp(self):
+        super().setUp()
+        self.processor = AudioProcessor()
+        self.project = AudioProject.objects.create(
+            name='render', wave_type='sine', wave_parameters={'freq': 100, 'spw': 100, 'periods': 20}
+        )
+        self.url = f'/api/projects/{self.project.id}/render/natural.png'
+
+    def process(self, envelope):
+        project = AudioProject.objects.get(id=self.project.id)
+        success, message = self.processor.process_audio_project(project, envelope)
+        self.assertTrue(success, message)
+        return project
+
+    def envelope(self, level):
+        return {'format': 'keypoints', 'length': 2000, 'positive': [[0, level]], 'negative': [[0, -level]]}
+
+    def test_processing_only_produces_audio_and_thumbnail(self):
+        project = self.process(self.envelope(0.5))
+        self.assertTrue(project.modified_file)
+        self.assertFalse(project.final_drawing or project.natural_lang or project.wave_comparison)
+        self.assertEqual(sorted(Artifact.objects.values_list('kind', flat=True)), ['modified', renders.thumbnail_kind()])
+        self.assertEqual(set(project.visualization_urls), set(renders.VIEWS))
+
+        response = self.client.get(project.thumbnail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], renders.THUMBNAIL_FORMATS[renders.thumbnail_format()])
+        self.assertEqual(Artifact.objects.count(), 2)
+
+    def test_first_request_renders_and_stores(self):
+        self.process(self.envelope(0.5))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(Artifact.objects.count(), 3)
+
+        # stored: served again without adding anything
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(Artifact.objects.count(), 3)
+
+        response = self.client.get(f'/api/projects/{self.project.id}/render/final.svg?width=400')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(Artifact.objects.count(), 4)
+
+    def test_conditional_requests(self):
+        self.process(self.envelope(0.5))
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        # new inputs, new validators
+        self.process(self.envelope(0.3))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)  # not processed yet
+        self.process(None)
+        self.assertEqual(self.client.get(self.url + '?width=123').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/render/other.png').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/render/final.gif').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/render/thumbnail.svg').status_code, 404)
+
+
+class ProjectListTests(MediaRootMixin, TestCase):
+    audio_cache_dir = False
+
+    def setUp(self):
+        super().setUp()
+        processor = AudioProcessor()
+        for i in range(14):
+            project = AudioProject.objects.create(
+                name=f'p{i}', wave_type='sine', wave_parameters={'freq': 100, 'spw': 10, 'periods': 20},
+                # a row whose envelope was never moved to a file still carries it inline
+                envelope_data={'positive': [0.5] * 1000, 'negative': [-0.5] * 1000},
+            )
+            if i >= 12:  # the newest two, listed first
+                processor.process_audio_project(project)
+
+    def test_list_is_lightweight(self):
+        with self.assertNumQueries(2):  # count + one page
+            response = self.client.get('/api/projects/')
+        data = response.json()
+        self.assertEqual((len(data['results']), data['total_projects']), (12, 14))
+        row = data['results'][0]
+        self.assertNotIn('envelope_data', row)
+        self.assertNotIn('wave_parameters', row)
+        self.assertTrue(row['thumbnail_url'].endswith(f'/render/thumbnail.{renders.thumbnail_format()}'))
+        self.assertIsNone(data['results'][-1]['thumbnail_url'])  # not processed
+
+    def test_gallery_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/render/thumbnail.', count=2)
@@ -18,4 +18,9 @@ urlpatterns = [
     path('api/projects/<int:project_id>/status/', views.api_project_status, name='api_project_status'),
     path('api/projects/<int:project_id>/delete/', views.api_delete_project, name='api_delete_project'),
     path('api/projects/<int:project_id>/audio-data/', views.api_project_audio_data, name='api_project_audio_data'),
+    path('api/projects/<int:project_id>/audio-data/binary/', views.api_project_audio_binary, name='api_project_audio_binary'),
+    path('api/projects/<int:project_id>/render/<slug:view>.<slug:fmt>', views.api_project_render, name='api_project_render'),
+    path('api/jobs/metrics/', views.api_job_metrics, name='api_job_metrics'),
+    path('api/audio-cache/metrics/', views.api_audio_cache_metrics, name='api_audio_cache_metrics'),
+    path('api/artifacts/stats/', views.api_artifact_stats, name='api_artifact_stats'),
 ]
\ No newline at end of file
@@ -1,30 +1,32 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 import json
-import threading
+from . import artifacts, audio_cache, binary_audio, dsp, envelope_store, jobs, renders
 from .models import AudioProject
 from .audio_processor import AudioProcessor
-from .serializers import AudioProjectSerializer
+from .serializers import AudioProjectListSerializer, AudioProjectSerializer
 
 
 def gallery_view(request):
     """Gallery page showing all audio projects"""
-    projects = AudioProject.objects.all().order_by('-created_at')
+    projects = AudioProject.objects.for_listing().order_by('-created_at')
     paginator = Paginator(projects, 12)  # Show 12 projects per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
     context = {
         'page_obj': page_obj,
-        'total_projects': projects.count()
+        'total_projects': paginator.count
     }
     return render(request, 'application/gallery.html', context)
 
@@ -86,17 +88,18 @@ def create_project_view(request):
             
             project.save()
             
-            # Process in background
-            def process_project():
-                processor = AudioProcessor()
-                processor.process_audio_project(project)
-            
-            thread = threading.Thread(target=process_project)
-            thread.start()
+            # Process in the background workers
+            jobs.enqueue_project(project)
             
             messages.success(request, f'Project "{name}" created successfully and is being processed.')
             return redirect('project_detail', project_id=project.id)
             
+        except jobs.QueueFull as e:
+            project.is_processing = False
+            project.processing_error = str(e)
+            project.save()
+            messages.error(request, str(e))
+            return redirect('project_detail', project_id=project.id)
         except Exception as e:
             messages.error(request, f'Error creating project: {str(e)}')
     
@@ -126,22 +129,21 @@ def update_envelope_view(request, project_id):
         data = json.loads(request.body)
         envelope_data = data.get('envelope_data', {})
         
-        # Update envelope and reprocess
-        project.is_processing = True
-        project.save()
-        
-        def reprocess_project():
-            processor = AudioProcessor()
-            processor.process_audio_project(project, envelope_data)
-        
-        thread = threading.Thread(target=reprocess_project)
-        thread.start()
+        # Update envelope and reprocess (folded into a still-pending job if there is one)
+        job = jobs.enqueue_project(project, envelope_data, data.get('dirty_range'))
         
         return JsonResponse({
             'status': 'success',
-            'message': 'Envelope updated successfully. Project is being reprocessed.'
+            'message': 'Envelope updated successfully. Project is being reprocessed.',
+            'job_id': job.id,
+            'coalesced': job.coalesced_count > 0
         })
         
+    except jobs.QueueFull as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=503)
     except Exception as e:
         return JsonResponse({
             'status': 'error',
@@ -154,25 +156,35 @@ def delete_project_view(request, project_id):
     project = get_object_or_404(AudioProject, id=project_id)
     
     if request.method == 'POST':
-        project.delete()
+        artifacts.delete_project(project)
+        audio_cache.invalidate(project_id)
         messages.success(request, 'Project deleted successfully.')
         return redirect('gallery')
     
     return render(request, 'application/confirm_delete.html', {'project': project})
 
 
+def project_envelope(project, length):
+    """Stored envelope keypoints; an envelope drawn for audio of another length is reset"""
+    envelope = project.load_envelope()
+    stored_length = (project.envelope_data or {}).get('length')
+    if envelope is None or (stored_length is not None and stored_length != length):
+        return dsp.empty_keypoints(), dsp.empty_keypoints()
+    return envelope
+
+
 # API Views for REST API functionality
 @api_view(['GET'])
 def api_projects_list(request):
-    """API endpoint to list all projects with pagination"""
-    projects = AudioProject.objects.all().order_by('-created_at')
+    """API endpoint to list all projects with pagination (summaries; details per project)"""
+    projects = AudioProject.objects.for_listing().order_by('-created_at')
     
     # Add pagination
     page = request.GET.get('page', 1)
     paginator = Paginator(projects, 12)  # 12 projects per page
     page_obj = paginator.get_page(page)
     
-    serializer = AudioProjectSerializer(page_obj, many=True)
+    serializer = AudioProjectListSerializer(page_obj, many=True)
     
     return Response({
         'results': serializer.data,
@@ -203,13 +215,14 @@ def api_create_project(request):
         if serializer.is_valid():
             project = serializer.save(is_processing=True)
             
-            # Process in background
-            def process_project():
-                processor = AudioProcessor()
-                processor.process_audio_project(project)
-            
-            thread = threading.Thread(target=process_project)
-            thread.start()
+            # Process in the background workers
+            try:
+                jobs.enqueue_project(project)
+            except jobs.QueueFull as e:
+                project.is_processing = False
+                project.processing_error = str(e)
+                project.save()
+                return Response({'error': str(e), 'id': project.id}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
             return Response(AudioProjectSerializer(project).data, status=status.HTTP_201_CREATED)
         else:
@@ -226,21 +239,20 @@ def api_update_envelope(request, project_id):
         project = AudioProject.objects.get(id=project_id)
         envelope_data = request.data.get('envelope_data', {})
         
-        project.is_processing = True
-        project.save()
-        
-        def reprocess_project():
-            processor = AudioProcessor()
-            processor.process_audio_project(project, envelope_data)
-        
-        thread = threading.Thread(target=reprocess_project)
-        thread.start()
+        # dirty_range [start, end) limits reprocessing to the samples the edit touched
+        job = jobs.enqueue_project(project, envelope_data, request.data.get('dirty_range'))
         
         return Response({
             'status': 'success',
-            'message': 'Envelope updated successfully'
+            'message': 'Envelope updated successfully',
+            'job_id': job.id,
+            'coalesced': job.coalesced_count > 0
         })
         
+    except jobs.QueueFull as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except AudioProject.DoesNotExist:
         return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -252,7 +264,8 @@ def api_delete_project(request, project_id):
     """API endpoint to delete project"""
     try:
         project = AudioProject.objects.get(id=project_id)
-        project.delete()
+        artifacts.delete_project(project)
+        audio_cache.invalidate(project_id)
         return Response({'message': 'Project deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
     except AudioProject.DoesNotExist:
         return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -267,7 +280,8 @@ def api_project_status(request, project_id):
             'id': project.id,
             'is_processing': project.is_processing,
             'processing_error': project.processing_error,
-            'updated_at': project.updated_at
+            'updated_at': project.updated_at,
+            'job': jobs.job_status(project)
         })
     except AudioProject.DoesNotExist:
         return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -280,38 +294,130 @@ def api_project_audio_data(request, project_id):
         project = AudioProject.objects.get(id=project_id)
         
         # Load audio data
-        processor = AudioProcessor()
-        if project.wave_type == 'uploaded' and project.original_file:
-            audio_data, sample_rate = processor.load_audio_file(project.original_file.path)
-        else:
-            # Generate custom wave
-            params = project.wave_parameters
-            audio_data, sample_rate = processor.generate_custom_wave(
-                wave_type=project.wave_type,
-                freq=params.get('freq', 440),
-                spw=params.get('spw', 100),
-                periods=params.get('periods', 10)
-            )
+        audio_data, sample_rate = AudioProcessor().load_project_audio(project)
+        envelope_pos, envelope_neg = project_envelope(project, len(audio_data))
         
-        # Get envelope data
-        envelope_pos = project.envelope_data.get('positive', [0] * len(audio_data))
-        envelope_neg = project.envelope_data.get('negative', [0] * len(audio_data))
-        
-        # Ensure envelope arrays match audio length
-        if len(envelope_pos) != len(audio_data):
-            envelope_pos = [0] * len(audio_data)
-        if len(envelope_neg) != len(audio_data):
-            envelope_neg = [0] * len(audio_data)
-        
-        return Response({
+        response = {
             'audio_data': audio_data.tolist(),
             'sample_rate': sample_rate,
-            'envelope_pos': envelope_pos,
-            'envelope_neg': envelope_neg,
+            'envelope': envelope_store.keypoints_payload(envelope_pos, envelope_neg, len(audio_data)),
             'length': len(audio_data)
-        })
+        }
+        
+        # Older clients can still ask for one envelope value per sample
+        if request.GET.get('envelope') == 'dense':
+            response['envelope_pos'] = dsp.keypoints_to_dense(envelope_pos, len(audio_data)).tolist()
+            response['envelope_neg'] = dsp.keypoints_to_dense(envelope_neg, len(audio_data)).tolist()
+        
+        return Response(response)
         
     except AudioProject.DoesNotExist:
         return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_http_methods(["GET", "HEAD"])
+def api_project_audio_binary(request, project_id):
+    """
+    Binary alternative to api_project_audio_data (format in binary_audio):
+    float32 (or ?dtype=int16) little-endian samples after a small JSON header.
+    Supports single byte ranges (206) and gzip for full responses.
+    """
+    project = get_object_or_404(AudioProject, id=project_id)
+    dtype = request.GET.get('dtype', 'float32')
+    if dtype not in binary_audio.DTYPES:
+        return JsonResponse({'error': f"dtype must be one of {', '.join(binary_audio.DTYPES)}"}, status=400)
+    
+    try:
+        audio_data, sample_rate = AudioProcessor().load_project_audio(project)
+        envelope_pos, envelope_neg = project_envelope(project, len(audio_data))
+        envelope = envelope_store.keypoints_payload(envelope_pos, envelope_neg, len(audio_data))
+        header, data = binary_audio.encode_audio_payload(audio_data, sample_rate, envelope, dtype)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    size = binary_audio.payload_size(header, data)
+    try:
+        byte_range = binary_audio.parse_byte_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    if byte_range is not None:
+        # Ranges address the uncompressed payload, so partial responses are never gzipped
+        start, end = byte_range
+        response = HttpResponse(
+            binary_audio.read_range(header, data, start, end),
+            status=206, content_type='application/octet-stream'
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    elif binary_audio.gzip_enabled() and binary_audio.accepts_gzip(request):
+        response = StreamingHttpResponse(
+            binary_audio.iter_gzip_payload(header, data), content_type='application/octet-stream'
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(
+            binary_audio.iter_payload(header, data), content_type='application/octet-stream'
+        )
+        response['Content-Length'] = str(size)
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def api_project_render(request, project_id, view, fmt):
+    """
+    One visualization of a processed project (?width= one of
+    renders.widths()) or its thumbnail, rendered on first request and
+    stored. Conditional requests are answered from the project's inputs
+    without rendering.
+    """
+    project = get_object_or_404(AudioProject, id=project_id)
+    try:
+        width, content_type = renders.parse_request(view, fmt, request.GET.get('width'))
+    except LookupError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not project.inputs_key or not project.modified_file:
+        return JsonResponse({'error': 'Project has not been processed yet'}, status=404)
+    
+    etag = quote_etag(renders.etag(project, view, fmt, width))
+    last_modified = int(project.inputs_changed_at.timestamp()) if project.inputs_changed_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            name = renders.render(project, view, fmt, width)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+        response = FileResponse(artifacts.storage().open(name, 'rb'), content_type=content_type)
+    
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # the URL stays the same when the inputs change, so caches must revalidate
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@api_view(['GET'])
+def api_job_metrics(request):
+    """API endpoint for processing queue metrics, including coalesced updates"""
+    return Response(jobs.queue_metrics())
+
+
+@api_view(['GET'])
+def api_audio_cache_metrics(request):
+    """API endpoint for the decoded-audio cache counters of this web process"""
+    return Response(audio_cache.stats())
+
+
+@api_view(['GET'])
+def api_artifact_stats(request):
+    """API endpoint for how much storage the shared processing outputs save"""
+    return Response(artifacts.stats())
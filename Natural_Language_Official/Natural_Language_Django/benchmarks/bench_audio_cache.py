@@ -0,0 +1,88 @@
+"""
+Benchmark: loading a long uploaded WAV through the decoded-audio cache -
+a cold decode, a memory hit, and a disk hit (memory-mapped .npy, i.e. what a
+fresh worker process sees).
+
+Usage (from the Django project directory):
+    python benchmarks/bench_audio_cache.py [minutes]
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Project-Wave.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+from scipy.io import wavfile  # noqa: E402
+
+from application import audio_cache  # noqa: E402
+from application.audio_processor import AudioProcessor  # noqa: E402
+
+
+class Upload:
+    """Just enough of an AudioProject for the cache: an id and an uploaded file"""
+    def __init__(self, path):
+        self.id = 0
+        self.wave_type = 'uploaded'
+        self.original_file = self
+        self.path = path
+
+    def __bool__(self):
+        return True
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    sample_rate = 44100
+    n = int(minutes * 60 * sample_rate)
+    t = np.arange(n) / sample_rate
+    stereo = (np.stack([np.sin(2 * np.pi * 220 * t), np.sin(2 * np.pi * 330 * t)], axis=1) * 20000).astype(np.int16)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'long.wav')
+        buffer = io.BytesIO()
+        wavfile.write(buffer, sample_rate, stereo)
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+
+        processor = AudioProcessor()
+        project = Upload(path)
+        with override_settings(AUDIO_CACHE_DIR=os.path.join(workdir, 'cache')):
+            t_decode, _ = timed(processor.decode_project_audio, project)
+            t_miss, _ = timed(processor.load_project_audio, project)
+            t_memory, _ = timed(processor.load_project_audio, project)
+            audio_cache.clear()  # as a fresh worker process: checksum + mmap, no decode
+            t_disk, _ = timed(processor.load_project_audio, project)
+            audio_cache.clear()
+            t_disk_read, _ = timed(lambda: float(np.sum(processor.load_project_audio(project)[0])))
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f'samples:             {n} stereo ({minutes:g} min)')
+    print(f'decode (uncached):   {t_decode * 1000:8.1f} ms')
+    print(f'miss (decode+store): {t_miss * 1000:8.1f} ms')
+    print(f'memory hit:          {t_memory * 1000:8.1f} ms')
+    print(f'disk hit (mmap):     {t_disk * 1000:8.1f} ms')
+    print(f'disk hit + read all: {t_disk_read * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
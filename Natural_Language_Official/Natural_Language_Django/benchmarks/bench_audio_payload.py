@@ -0,0 +1,66 @@
+"""
+Benchmark: the JSON audio-data payload vs the binary one (binary_audio) for a
+long signal - server-side encoding, size on the wire and client-side decoding.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_audio_payload.py [minutes]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Project-Wave.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from application import binary_audio, dsp, envelope_store  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    sample_rate = 44100
+    n = int(minutes * 60 * sample_rate)
+    t = np.arange(n) / sample_rate
+    audio = np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(0.3 * t))
+    empty = dsp.empty_keypoints()
+    envelope = envelope_store.keypoints_payload(empty, empty, n)
+
+    t_json, json_body = timed(lambda: JSONRenderer().render({
+        'audio_data': audio.tolist(), 'sample_rate': sample_rate, 'envelope': envelope, 'length': n,
+    }))
+    t_bin, binary_body = timed(lambda: b''.join(binary_audio.iter_payload(
+        *binary_audio.encode_audio_payload(audio, sample_rate, envelope))))
+    t_gzip, gzip_body = timed(lambda: b''.join(binary_audio.iter_gzip_payload(
+        *binary_audio.encode_audio_payload(audio, sample_rate, envelope))))
+
+    t_json_parse, _ = timed(json.loads, json_body)
+    header_length = int.from_bytes(binary_body[4:8], 'little')
+    header = json.loads(binary_body[8:8 + header_length])
+    t_bin_parse, _ = timed(lambda: np.frombuffer(binary_body, '<f4', offset=header['data_offset']))
+
+    print(f'samples:          {n} ({minutes:g} min)')
+    print(f'JSON:             {len(json_body) / 1e6:8.1f} MB  encode {t_json * 1000:8.1f} ms  '
+          f'decode {t_json_parse * 1000:8.1f} ms  (gzip {len(gzip.compress(json_body, 1)) / 1e6:.1f} MB)')
+    print(f'binary float32:   {len(binary_body) / 1e6:8.1f} MB  encode {t_bin * 1000:8.1f} ms  '
+          f'decode {t_bin_parse * 1000:8.1f} ms')
+    print(f'binary + gzip:    {len(gzip_body) / 1e6:8.1f} MB  encode {t_gzip * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Micro-benchmark: per-sample envelope loop vs the vectorized dsp.apply_envelope.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_envelope.py [num_samples]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+
+from application.dsp import apply_envelope  # noqa: E402
+from application.dsp_reference import reference_apply_envelope  # noqa: E402
+
+
+def best_of(fn, repeat, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-1, 1, n)
+    audio[rng.integers(0, n, n // 100)] = 0.0  # exact zeros must stay untouched
+    env_pos = rng.uniform(0, 1, n)
+    env_neg = rng.uniform(-1, 0, n - n // 10)  # shorter envelope: tail untouched
+
+    t_loop, ref = best_of(reference_apply_envelope, 1, audio, env_pos, env_neg)
+    t_vec, out = best_of(apply_envelope, 10, audio, env_pos, env_neg)
+
+    print(f'samples:     {n}')
+    print(f'identical:   {np.array_equal(ref, out)}')
+    print(f'loop:        {t_loop * 1000:10.2f} ms')
+    print(f'vectorized:  {t_vec * 1000:10.2f} ms')
+    print(f'speedup:     {t_loop / t_vec:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
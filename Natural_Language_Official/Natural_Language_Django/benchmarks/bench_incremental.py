@@ -0,0 +1,88 @@
+"""
+Benchmark: reprocessing an envelope edit of a long project in full vs
+incrementally (dirty range), for edits of growing size.
+
+Runs against a throwaway test database and media directory.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_incremental.py [minutes]
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Project-Wave.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.base import ContentFile  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from scipy.io import wavfile  # noqa: E402
+
+from application.audio_processor import AudioProcessor  # noqa: E402
+from application.models import AudioProject  # noqa: E402
+
+
+def envelope(n, bump_start=None, bump_length=0, peak=0.95):
+    positive = [[0, 0.6]]
+    if bump_start is not None:
+        positive += [[bump_start, 0.6], [bump_start + bump_length // 2, peak], [bump_start + bump_length, 0.6]]
+    return {'format': 'keypoints', 'length': n, 'positive': positive, 'negative': [[0, -0.6]]}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    sample_rate = 44100
+    n = int(minutes * 60 * sample_rate)
+    t = np.arange(n) / sample_rate
+    samples = (np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(0.3 * t)) * 30000).astype(np.int16)
+
+    workdir = tempfile.mkdtemp()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(MEDIA_ROOT=workdir, AUDIO_CACHE_DIR=os.path.join(workdir, 'cache')):
+            buffer = io.BytesIO()
+            wavfile.write(buffer, sample_rate, samples)
+            project = AudioProject(name='bench', wave_type='uploaded')
+            project.original_file.save('bench.wav', ContentFile(buffer.getvalue()), save=False)
+            project.save()
+
+            processor = AudioProcessor()
+            processor.process_audio_project(project, envelope(n))
+            t_full, _ = timed(processor.process_audio_project, project, envelope(n, n // 2, sample_rate))
+
+            print(f'samples:      {n} ({minutes:g} min)')
+            print(f'full run:     {t_full * 1000:8.1f} ms')
+            # the last edit moves the envelope by less than a pixel: nothing is redrawn
+            for edit, peak in ((100, 0.95), (sample_rate // 10, 0.95), (sample_rate, 0.95),
+                               (10 * sample_rate, 0.95), (sample_rate, 0.6001)):
+                project = AudioProject.objects.get(id=project.id)
+                processor.process_audio_project(project, envelope(n))  # back to a known state
+                project = AudioProject.objects.get(id=project.id)
+                edited = envelope(n, n // 3, edit, peak)
+                t_inc, (_, message) = timed(processor.process_audio_project, project, edited,
+                                            (n // 3, n // 3 + edit))
+                print(f'edit {edit:>7} samples: {t_inc * 1000:8.1f} ms  {message}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: one page of the project list and the gallery, full serializer
+and full-size preview vs the list serializer and thumbnails.
+
+Runs against a throwaway test database and media directory.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_list_payload.py [projects]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Project-Wave.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, reset_queries  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from application import renders  # noqa: E402
+from application.audio_processor import AudioProcessor  # noqa: E402
+from application.models import AudioProject  # noqa: E402
+from application.serializers import AudioProjectSerializer  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def page_before():
+    # what api_projects_list returned: every column of every project, in full
+    projects = AudioProject.objects.all()[:12]
+    return json.dumps({'results': AudioProjectSerializer(projects, many=True).data}).encode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    workdir = tempfile.mkdtemp()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(MEDIA_ROOT=workdir, AUDIO_CACHE_DIR=None, DEBUG=True,
+                               ALLOWED_HOSTS=['testserver']):
+            processor = AudioProcessor()
+            for i in range(count):
+                project = AudioProject.objects.create(
+                    name=f'bench {i}', wave_type='sine',
+                    wave_parameters={'freq': 100 + i, 'spw': 40, 'periods': 2000},
+                )
+                # half of them from before envelopes were stored as files: dense and inline
+                envelope = {'positive': [0.6] * 80000, 'negative': [-0.6] * 80000}
+                processor.process_audio_project(project, envelope)
+                if i % 2:
+                    AudioProject.objects.filter(id=project.id).update(envelope_data=envelope)
+
+            client = Client()
+            reset_queries()
+            t_before, before = timed(page_before)
+            q_before = len(connection.queries)
+            reset_queries()
+            t_after, response = timed(client.get, '/api/projects/')
+            after = response.content
+            q_after = len(connection.queries)
+
+            project = AudioProject.objects.first()
+            full = b''.join(client.get(project.visualization_urls['final']['png']).streaming_content)
+            thumb = b''.join(client.get(project.thumbnail_url).streaming_content)
+
+            print(f'projects:          {count}')
+            print(f'list before:       {len(before):>9} bytes  {q_before:>2} queries  {t_before * 1000:7.1f} ms')
+            print(f'list after:        {len(after):>9} bytes  {q_after:>2} queries  {t_after * 1000:7.1f} ms')
+            print(f'final view png:    {len(full):>9} bytes per card')
+            print(f'thumbnail {renders.thumbnail_format():<4}:    {len(thumb):>9} bytes per card')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
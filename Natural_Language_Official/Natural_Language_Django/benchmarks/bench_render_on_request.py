@@ -0,0 +1,82 @@
+"""
+Benchmark: processing a long project (audio only) and then requesting its
+views - the first request renders and stores, later ones are served from
+the store, and a conditional request is answered with 304.
+
+Runs against a throwaway test database and media directory.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_render_on_request.py [minutes]
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Project-Wave.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.base import ContentFile  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from scipy.io import wavfile  # noqa: E402
+
+from application.audio_processor import AudioProcessor  # noqa: E402
+from application.models import AudioProject  # noqa: E402
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    sample_rate = 44100
+    n = int(minutes * 60 * sample_rate)
+    t = np.arange(n) / sample_rate
+    samples = (np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(0.3 * t)) * 30000).astype(np.int16)
+    envelope = {'format': 'keypoints', 'length': n, 'positive': [[0, 0.6], [n // 2, 0.9]], 'negative': [[0, -0.6]]}
+
+    workdir = tempfile.mkdtemp()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(MEDIA_ROOT=workdir, AUDIO_CACHE_DIR=os.path.join(workdir, 'cache'),
+                               ALLOWED_HOSTS=['*']):
+            buffer = io.BytesIO()
+            wavfile.write(buffer, sample_rate, samples)
+            project = AudioProject(name='bench', wave_type='uploaded')
+            project.original_file.save('bench.wav', ContentFile(buffer.getvalue()), save=False)
+            project.save()
+
+            t_process, _ = timed(AudioProcessor().process_audio_project, project, envelope)
+            print(f'samples:        {n} ({minutes:g} min)')
+            print(f'processing:     {t_process * 1000:8.1f} ms (audio only)')
+
+            client = Client()
+            for view, fmt in (('final', 'png'), ('natural', 'png'), ('comparison', 'png'), ('natural', 'svg')):
+                url = f'/api/projects/{project.id}/render/{view}.{fmt}'
+                t_first, response = timed(client.get, url)
+                b''.join(response.streaming_content)
+                t_stored, response = timed(client.get, url)
+                b''.join(response.streaming_content)
+                t_304, not_modified = timed(client.get, url, HTTP_IF_NONE_MATCH=response['ETag'])
+                print(f'{view + "." + fmt:15} first {t_first * 1000:7.1f} ms   stored {t_stored * 1000:5.1f} ms'
+                      f'   conditional {t_304 * 1000:5.1f} ms ({not_modified.status_code})')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: per-point strict_sign_subdivision vs the vectorized dsp version
+on multi-million-sample waveforms.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_sign_subdivision.py [num_samples ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # envelope_engine
+
+from application.dsp import strict_sign_subdivision  # noqa: E402
+from application.dsp_reference import reference_strict_sign_subdivision  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000, 4_000_000]
+    rng = np.random.default_rng(0)
+
+    print(f"{'samples':>10} {'crossings':>10} {'loop ms':>10} {'vector ms':>10} {'speedup':>8} {'equal':>6}")
+    for n in sizes:
+        # a noisy multi-tone, like a real upload with lots of zero crossings
+        t = np.arange(n) / 44100
+        y = 0.6 * np.sin(2 * np.pi * 440 * t) + 0.3 * np.sin(2 * np.pi * 3100 * t) + 0.05 * rng.normal(size=n)
+        x = np.arange(n)
+
+        t_loop, ref = timed(reference_strict_sign_subdivision, x, y)
+        t_vec, out = timed(strict_sign_subdivision, x, y)
+        equal = all(np.array_equal(a, b) for a, b in zip(ref, out))
+        print(f"{n:>10} {len(out[0]) - n:>10} {t_loop * 1000:10.1f} {t_vec * 1000:10.1f} "
+              f"{t_loop / t_vec:8.1f} {str(equal):>6}")
+
+
+if __name__ == '__main__':
+    main()
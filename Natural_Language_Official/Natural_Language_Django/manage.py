@@ -2,6 +2,10 @@
 """Django's command-line utility for administrative tasks."""
 import os
 import sys
+from pathlib import Path
+
+# envelope_engine.py, shared with the desktop tool, lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 
 def main():
@@ -240,15 +240,15 @@ export default function Gallery() {
                 
 
                 {/* Preview */}
-                {project.final_drawing ? (
+                {project.thumbnail_url ? (
                   <img
-                    src={`${backendUrl}${project.final_drawing}`}
+                    src={`${backendUrl}${project.thumbnail_url}`}
                     alt="Wave visualization"
                     className={`${viewMode === "list"
                       ? "w-full h-auto object-cover"
                       : "w-full h-35 object-cover"
                       }`}
-                    onClick={() => window.open(`${backendUrl}${project.final_drawing}`, '_blank')}
+                    onClick={() => window.open(`${backendUrl}${project.final_drawing_url}`, '_blank')}
                     onError={(e) => {
                       e.target.style.display = 'none';
                     }}
@@ -122,24 +122,24 @@ const ProjectPage = () => {
         <div className={cardClass}>
           <h2 className="text-xl font-semibold mb-3 text-white">Visualizations</h2>
           <div className="flex flex-col lg:flex-row gap-6">
-            {project.final_drawing && (
+            {project.final_drawing_url && (
               <div className="flex-1">
                 <h3 className="text-gray-300 mb-1">Final Drawing</h3>
                 <img
-                  src={getMediaUrl(project.final_drawing)}
+                  src={getMediaUrl(project.final_drawing_url)}
                   alt="Final Drawing"
                   className={imgHover}
                   onClick={() =>
-                    openImageModal(getMediaUrl(project.final_drawing), "Final Drawing")
+                    openImageModal(getMediaUrl(project.final_drawing_url), "Final Drawing")
                   }
                 />
                 <div className="mt-2 flex gap-2">
-                  <a href={getMediaUrl(project.final_drawing)} download className={btnWhite}>
+                  <a href={getMediaUrl(project.final_drawing_url)} download className={btnWhite}>
                     PNG
                   </a>
-                  {project.final_drawing_svg && (
+                  {project.final_drawing_svg_url && (
                     <a
-                      href={getMediaUrl(project.final_drawing_svg)}
+                      href={getMediaUrl(project.final_drawing_svg_url)}
                       download
                       className={btnWhite}
                     >
@@ -150,24 +150,24 @@ const ProjectPage = () => {
               </div>
             )}
 
-            {project.natural_lang && (
+            {project.natural_lang_url && (
               <div className="flex-1">
                 <h3 className="text-gray-300 mb-1">Natural Language View</h3>
                 <img
-                  src={getMediaUrl(project.natural_lang)}
+                  src={getMediaUrl(project.natural_lang_url)}
                   alt="Natural Language View"
                   className={imgHover}
                   onClick={() =>
-                    openImageModal(getMediaUrl(project.natural_lang), "Natural Language View")
+                    openImageModal(getMediaUrl(project.natural_lang_url), "Natural Language View")
                   }
                 />
                 <div className="mt-2 flex gap-2">
-                  <a href={getMediaUrl(project.natural_lang)} download className={btnWhite}>
+                  <a href={getMediaUrl(project.natural_lang_url)} download className={btnWhite}>
                     PNG
                   </a>
-                  {project.natural_lang_svg && (
+                  {project.natural_lang_svg_url && (
                     <a
-                      href={getMediaUrl(project.natural_lang_svg)}
+                      href={getMediaUrl(project.natural_lang_svg_url)}
                       download
                       className={btnWhite}
                     >
@@ -178,24 +178,24 @@ const ProjectPage = () => {
               </div>
             )}
 
-            {project.wave_comparison && (
+            {project.wave_comparison_url && (
               <div className="flex-1">
                 <h3 className="text-gray-300 mb-1">Wave Comparison</h3>
                 <img
-                  src={getMediaUrl(project.wave_comparison)}
+                  src={getMediaUrl(project.wave_comparison_url)}
                   alt="Wave Comparison"
                   className={imgHover}
                   onClick={() =>
-                    openImageModal(getMediaUrl(project.wave_comparison), "Wave Comparison")
+                    openImageModal(getMediaUrl(project.wave_comparison_url), "Wave Comparison")
                   }
                 />
                 <div className="mt-2 flex gap-2">
-                  <a href={getMediaUrl(project.wave_comparison)} download className={btnWhite}>
+                  <a href={getMediaUrl(project.wave_comparison_url)} download className={btnWhite}>
                     PNG
                   </a>
-                  {project.wave_comparison_svg && (
+                  {project.wave_comparison_svg_url && (
                     <a
-                      href={getMediaUrl(project.wave_comparison_svg)}
+                      href={getMediaUrl(project.wave_comparison_svg_url)}
                       download
                       className={btnWhite}
                     >
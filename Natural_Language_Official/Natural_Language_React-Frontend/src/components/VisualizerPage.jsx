@@ -4,6 +4,70 @@ import axios from "axios";
 import Navbar from "./Navbar";
 import Footer from "./Footer";
 
+// Envelopes travel as sorted [index, value] breakpoints per polarity
+// ({ format: "keypoints", length, positive, negative }). The editor keeps one
+// value per sample and converts only at the API boundary.
+const KEYPOINT_TOLERANCE = 1e-6;
+
+// Linear between breakpoints, held flat before the first and after the last one
+function keypointsToDense(points, length) {
+  const dense = new Array(length).fill(0);
+  if (!points || points.length === 0) return dense;
+  let k = 0;
+  for (let i = 0; i < length; i++) {
+    while (k < points.length - 1 && points[k + 1][0] <= i) k++;
+    const [i0, v0] = points[k];
+    if (i <= i0 || k === points.length - 1) {
+      dense[i] = v0;
+    } else {
+      const [i1, v1] = points[k + 1];
+      dense[i] = v0 + ((v1 - v0) * (i - i0)) / (i1 - i0);
+    }
+  }
+  return dense;
+}
+
+// The ends plus every sample where the slope changes (drawn ramps are straight)
+function denseToKeypoints(dense) {
+  const n = dense.length;
+  const value = (i) => dense[i] || 0;
+  if (n === 0) return [];
+  const keep = new Set([0, n - 1]);
+  for (let i = 1; i < n - 1; i++) {
+    if (Math.abs(value(i - 1) - 2 * value(i) + value(i + 1)) > KEYPOINT_TOLERANCE) keep.add(i);
+  }
+  for (;;) {
+    const indices = [...keep].sort((a, b) => a - b);
+    const points = indices.map((i) => [i, value(i)]);
+    const expanded = keypointsToDense(points, n);
+    let drifted = false;
+    for (let i = 0; i < n; i++) {
+      if (Math.abs(expanded[i] - value(i)) > KEYPOINT_TOLERANCE) {
+        keep.add(i);
+        drifted = true;
+      }
+    }
+    if (!drifted) return points;
+  }
+}
+
+// Binary audio-data payload: "NLAB", uint32 LE header length, JSON header,
+// then float32 LE samples at header.data_offset (8-byte aligned). Returns the
+// same shape as the JSON audio-data endpoint, with a Float32Array of samples.
+function parseAudioPayload(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "NLAB") throw new Error("Unexpected audio payload");
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  return {
+    audio_data: new Float32Array(buffer, header.data_offset, header.length),
+    sample_rate: header.sample_rate,
+    length: header.length,
+    envelope: header.envelope,
+  };
+}
+
 export default function VisualizerPage() {
   const { id: projectId } = useParams();
   const navigate = useNavigate();
@@ -23,6 +87,7 @@ export default function VisualizerPage() {
   const [isDrawing, setIsDrawing] = useState(false);
   const [envelopeHistory, setEnvelopeHistory] = useState([]);
   const [prevIdx, setPrevIdx] = useState(null);
+  const [dirtyRange, setDirtyRange] = useState(null); // [start, end) edited since the last save
   const [numPoints, setNumPoints] = useState(0);
   const [audioContext, setAudioContext] = useState(null);
 
@@ -143,6 +208,11 @@ export default function VisualizerPage() {
     };
   };
 
+  // Grow the edited range so the server only reprocesses those samples
+  const markDirty = (start, end) => {
+    setDirtyRange(prev => (prev ? [Math.min(prev[0], start), Math.max(prev[1], end)] : [start, end]));
+  };
+
   // Save current envelope state to history for undo functionality
   const saveToHistory = () => {
     setEnvelopeHistory(prev => [...prev, { pos: [...envelopePos], neg: [...envelopeNeg] }]);
@@ -152,6 +222,7 @@ export default function VisualizerPage() {
   const undoEnvelope = () => {
     if (envelopeHistory.length > 0) {
       const lastState = envelopeHistory[envelopeHistory.length - 1];
+      markDirty(0, lastState.pos.length);
       setEnvelopePos(lastState.pos);
       setEnvelopeNeg(lastState.neg);
       setEnvelopeHistory(prev => prev.slice(0, -1));
@@ -162,8 +233,9 @@ export default function VisualizerPage() {
   const resetEnvelope = () => {
     if (audioData) {
       saveToHistory();
-      setEnvelopePos(audioData.envelope_pos || []);
-      setEnvelopeNeg(audioData.envelope_neg || []);
+      markDirty(0, audioData.length);
+      setEnvelopePos(keypointsToDense(audioData.envelope?.positive, audioData.length));
+      setEnvelopeNeg(keypointsToDense(audioData.envelope?.negative, audioData.length));
     }
   };
 
@@ -246,6 +318,8 @@ export default function VisualizerPage() {
         endVal = amp;
       }
       
+      markDirty(startIdx, endIdx + 1);
+
       // Linear interpolation between points
       for (let i = startIdx; i <= endIdx; i++) {
         const t = endIdx === startIdx ? 0 : (i - startIdx) / (endIdx - startIdx);
@@ -261,6 +335,7 @@ export default function VisualizerPage() {
     } else {
       // Single point - store directly in the target envelope
       targetEnvelope[idx] = amp;
+      markDirty(idx, idx + 1);
     }
     
     setPrevIdx(idx);
@@ -294,12 +369,16 @@ export default function VisualizerPage() {
         const projectResponse = await axios.get(`${backendUrl}/api/projects/${projectId}/`);
         setProject(projectResponse.data);
         
-        // Fetch audio data for visualization
-        const audioResponse = await axios.get(`${backendUrl}/api/projects/${projectId}/audio-data/`);
-        setAudioData(audioResponse.data);
-        setEnvelopePos(audioResponse.data.envelope_pos || []);
-        setEnvelopeNeg(audioResponse.data.envelope_neg || []);
-        setNumPoints(audioResponse.data.audio_data.length);
+        // Fetch audio data for visualization (binary float32, gzip handled by the browser)
+        const audioResponse = await axios.get(
+          `${backendUrl}/api/projects/${projectId}/audio-data/binary/`,
+          { responseType: "arraybuffer" }
+        );
+        const audio = parseAudioPayload(audioResponse.data);
+        setAudioData(audio);
+        setEnvelopePos(keypointsToDense(audio.envelope?.positive, audio.length));
+        setEnvelopeNeg(keypointsToDense(audio.envelope?.negative, audio.length));
+        setNumPoints(audio.audio_data.length);
         
       } catch (err) {
         console.error("Failed to fetch project data", err);
@@ -426,10 +505,14 @@ export default function VisualizerPage() {
       
       await axios.put(`${backendUrl}/api/projects/${projectId}/envelope/`, {
         envelope_data: {
-          positive: envelopePos,
-          negative: envelopeNeg,
-        }
+          format: "keypoints",
+          length: numPoints,
+          positive: denseToKeypoints(envelopePos),
+          negative: denseToKeypoints(envelopeNeg),
+        },
+        dirty_range: dirtyRange,
       });
+      setDirtyRange(null);
       
       alert("Envelope saved successfully! Project is being reprocessed.");
       
@@ -0,0 +1,145 @@
+"""
+arecibo_batch.py
+
+Non-interactive batch generator: renders many bitstreams to WAV in parallel.
+
+The manifest is a JSON list (or JSON Lines file) of jobs. Every job needs an
+"output" path; everything else falls back to arecibo_old_new.DEFAULT_SETTINGS:
+
+    {"output": "vec_001.wav", "bits": "0101...", "mode": "modern",
+     "fs": 48000, "bit_duration": 0.002, "f0": 6000, "f1": 9000, "fgap": 7500,
+     "gap_bits": 5}
+
+"bits_file" may point to a text file of 0/1 characters instead of "bits"; with
+neither, the Arecibo message is used. Modes are modern / old / cpfsk.
+
+Tone tables are built once per distinct setting in the parent and handed to
+every worker through the pool initializer. A job whose settings are invalid
+(an unknown mode, say) fails on its own and is reported with the others.
+
+Usage: python arecibo_batch.py manifest.jsonl [--out-dir DIR] [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from arecibo_old_new import (
+    DEFAULT_SETTINGS, arecibo_binary, build_tone_table,
+    generate_arecibo_signal, stream_arecibo_wav,
+)
+from scipy.io.wavfile import write
+
+TABLE_KEYS = ("fs", "bit_duration", "f0", "f1", "fgap")
+
+# tone tables shared with the workers (set by _init_worker)
+_TABLES = {}
+
+
+def load_manifest(path):
+    """Reads a JSON list or JSON Lines manifest into a list of job dicts."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for i, job in enumerate(jobs):
+        if "output" not in job:
+            raise ValueError(f"Job {i} has no 'output' path.")
+    return jobs
+
+
+def job_settings(job):
+    """Merges a job with the default generator settings."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update({k: job[k] for k in DEFAULT_SETTINGS if k in job})
+    return settings
+
+
+def table_key(settings):
+    mode = "modern" if settings["mode"] == "cpfsk" else settings["mode"]
+    return (mode,) + tuple(settings[k] for k in TABLE_KEYS)
+
+
+def job_bits(job, base_dir):
+    if "bits" in job:
+        return job["bits"]
+    if "bits_file" in job:
+        with open(os.path.join(base_dir, job["bits_file"]), "r", encoding="ascii") as f:
+            return "".join(f.read().split())
+    return arecibo_binary
+
+
+def _init_worker(tables):
+    global _TABLES
+    _TABLES = tables
+
+
+def render_job(job, base_dir, out_dir):
+    """Renders one job; returns (output path, bits, seconds, error)."""
+    t0 = time.perf_counter()
+    output = os.path.join(out_dir, job["output"])
+    try:
+        settings = job_settings(job)
+        bits = job_bits(job, base_dir)
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        if settings["mode"] == "cpfsk":
+            stream_arecibo_wav(output, bits, **settings)
+        else:
+            table = _TABLES.get(table_key(settings))
+            signal_int16 = generate_arecibo_signal(bits, table=table, **settings)
+            write(output, settings["fs"], signal_int16)
+        return output, len(bits), time.perf_counter() - t0, None
+    except Exception as e:
+        return output, 0, time.perf_counter() - t0, str(e)
+
+
+def run_batch(jobs, base_dir=".", out_dir=".", workers=None):
+    """Fans jobs out over a process pool and returns (results, wall seconds)."""
+    tables = {}
+    results = [None] * len(jobs)
+    for i, job in enumerate(jobs):
+        try:
+            key = table_key(job_settings(job))
+            if key not in tables:
+                tables[key] = build_tone_table(key[0], *key[1:])
+        except Exception as e:
+            results[i] = (os.path.join(out_dir, job["output"]), 0, 0.0, str(e))
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tables,)) as pool:
+        futures = {i: pool.submit(render_job, job, base_dir, out_dir)
+                   for i, job in enumerate(jobs) if results[i] is None}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a manifest of Arecibo-style bitstreams to WAV.")
+    parser.add_argument("manifest", help="JSON list or JSON Lines file of jobs")
+    parser.add_argument("--out-dir", default=".", help="directory the job outputs are relative to")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    results, wall = run_batch(jobs, base_dir, args.out_dir, args.workers)
+
+    failed = [(path, err) for path, _, _, err in results if err]
+    for path, err in failed:
+        print(f"FAILED {path}: {err}", file=sys.stderr)
+
+    done = len(results) - len(failed)
+    total_bits = sum(bits for _, bits, _, err in results if not err)
+    print(f"Rendered {done}/{len(results)} files, {total_bits} bits in {wall:.2f} s")
+    print(f"Throughput: {total_bits / wall:,.0f} bits/s, {done / wall:,.1f} files/s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+arecibo_batch_decode.py
+
+Headless bulk decoder: walks a directory, decodes every WAV on a process pool
+and writes one JSON Lines record per file, in sorted path order:
+
+    {"file": "captures/a.wav", "bits": 1679, "confidence": 0.998,
+     "seconds": 0.004, "fs": 44100, "samples_per_bit": 44, "error": null}
+
+confidence is the mean decision margin (arecibo_decode.decision_margins) of
+the bits that made it into the bit string. Only arecibo_decode is imported,
+never pygame, so workers start cheaply.
+
+Usage: python arecibo_batch_decode.py DIR [-o results.jsonl] [--workers N] [--sync]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+from arecibo_decode import BIT_DURATION, segment_powers, classify_powers, decision_margins
+
+
+def find_wavs(root):
+    """All .wav files under root, sorted for reproducible output."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        found.extend(os.path.join(dirpath, f) for f in filenames if f.lower().endswith(".wav"))
+    return sorted(found)
+
+
+def decode_file(path, bit_duration=BIT_DURATION, sync=False):
+    """Decodes one capture; never raises, errors end up in the record."""
+    t0 = time.perf_counter()
+    record = {"file": path, "bits": 0, "confidence": None, "seconds": None,
+              "fs": None, "samples_per_bit": None, "error": None}
+    try:
+        powers, threshold, fs, spb = segment_powers(path, bit_duration, sync=sync)
+        keep = classify_powers(powers, threshold) != 'G'
+        record["bits"] = int(keep.sum())
+        if keep.any():
+            record["confidence"] = round(float(decision_margins(powers[keep]).mean()), 6)
+        record["fs"] = int(fs)
+        record["samples_per_bit"] = float(spb) if sync else int(spb)
+    except Exception as e:
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - t0, 6)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode a directory of FSK WAV captures.")
+    parser.add_argument("directory", help="directory to walk for .wav files")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--bit-duration", type=float, default=BIT_DURATION)
+    parser.add_argument("--sync", action="store_true", help="recover bit timing before slicing")
+    args = parser.parse_args(argv)
+
+    paths = find_wavs(args.directory)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            # map yields in path order, so records come out sorted whichever file finishes first
+            records = pool.map(decode_file, paths, repeat(args.bit_duration), repeat(args.sync))
+            for record in records:
+                record["file"] = os.path.relpath(record["file"], args.directory)
+                failed += record["error"] is not None
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    wall = time.perf_counter() - t0
+    print(f"Decoded {len(paths) - failed}/{len(paths)} files in {wall:.2f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+arecibo_decode.py
+
+Headless decoding core shared by the viewer and the batch tools (no pygame).
+
+- Decodes an FSK WAV (8kHz=0, 12kHz=1, 10kHz=gap) using Goertzel
+- stream_bits_goertzel() decodes arbitrarily long captures block by block
+- Optional sync stage recovers bit timing (offset, clock error, drift)
+"""
+
+import os
+import numpy as np
+from scipy.io import wavfile
+import math
+
+# -----------------------
+# CONFIG (change if needed)
+# -----------------------
+BIT_DURATION = 0.001        # seconds per bit (must match generator)
+FREQ_0 = 8000              # Hz for bit 0
+FREQ_1 = 12000             # Hz for bit 1
+FREQ_GAP = 10000           # Hz for start/end gap
+GAP_BITS = 5               # gap bits at start/end (must match generator)
+TRACK_BITS = 64            # bits per block for clock-drift tracking
+CLOCK_TOLERANCE = 0.03     # max relative clock error searched by the sync stage
+
+# -----------------------
+# Goertzel implementation
+# -----------------------
+def goertzel_power(samples, sample_rate, target_freq):
+    """
+    Returns the power at target_freq for the given samples using the Goertzel algorithm.
+    """
+    n = len(samples)
+    if n == 0:
+        return 0.0
+    k = int(0.5 + (n * target_freq) / sample_rate)
+    omega = (2.0 * math.pi * k) / n
+    sine = math.sin(omega)
+    cosine = math.cos(omega)
+    coeff = 2.0 * cosine
+    q0 = q1 = q2 = 0.0
+    for s in samples:
+        q0 = coeff * q1 - q2 + s
+        q2 = q1
+        q1 = q0
+    power = q1*q1 + q2*q2 - q1*q2*coeff
+    return float(power)
+
+def goertzel_filter_bank(segments, sample_rate, target_freqs):
+    """
+    Vectorized Goertzel over a (num_segments, n) matrix of equal-length segments.
+    Returns a (num_segments, len(target_freqs)) array of powers, bin-for-bin
+    identical to calling goertzel_power() on every segment/frequency pair.
+    """
+    segments = np.asarray(segments, dtype=float)
+    if segments.ndim != 2:
+        raise ValueError("segments must be a 2-D (num_segments, n) array.")
+    n = segments.shape[1]
+    if n == 0:
+        return np.zeros((segments.shape[0], len(target_freqs)))
+    # same bin rounding as goertzel_power: k = int(0.5 + n*f/fs)
+    k = np.floor(0.5 + (n * np.asarray(target_freqs, dtype=float)) / sample_rate)
+    omega = (2.0 * np.pi / n) * np.outer(np.arange(n), k)   # (n, num_freqs)
+    # Goertzel's final power term equals |X[k]|^2 of the segment's DFT, so the
+    # whole bank reduces to two matrix products against a cos/sin table.
+    re = segments @ np.cos(omega)
+    im = segments @ np.sin(omega)
+    return re * re + im * im
+
+# -----------------------
+# Decode WAV -> bits (two-pass robust approach)
+# -----------------------
+def segment_powers(wav_path, bit_duration=BIT_DURATION, freqs=(FREQ_0, FREQ_1, FREQ_GAP), sync=False):
+    """
+    First pass of the decoder: returns (powers, threshold, fs, samples_per_bit)
+    where powers is the (num_bits, len(freqs)) tone-power matrix of the capture.
+    With sync=True the bit grid comes from recover_symbol_timing() instead of
+    assuming the first sample sits on a bit boundary, and samples_per_bit is the
+    measured (float) value.
+    """
+    if not os.path.exists(wav_path):
+        raise FileNotFoundError(f"{wav_path} not found.")
+
+    fs, data = wavfile.read(wav_path)
+    # If stereo/two-channel, use first channel
+    if data.ndim > 1:
+        data = data[:, 0]
+
+    # convert to float and normalize (avoid division by zero)
+    data = data.astype(float)
+    max_abs = np.max(np.abs(data))
+    if max_abs > 0:
+        data = data / max_abs
+
+    samples_per_bit = int(round(bit_duration * fs))
+    if samples_per_bit <= 0:
+        raise ValueError("bit_duration or sampling rate produces zero samples/bit.")
+
+    num_bits = len(data) // samples_per_bit
+    if num_bits == 0:
+        raise ValueError("Audio too short for the given bit duration.")
+
+    # First pass: powers for every segment and every tone in one shot
+    if sync:
+        starts, samples_per_bit = recover_symbol_timing(data, fs, bit_duration, freqs)
+        seg_len = int(round(samples_per_bit))
+        segments = data[starts[:, None] + np.arange(seg_len)]
+    else:
+        segments = data[:num_bits * samples_per_bit].reshape(num_bits, samples_per_bit)
+    powers = goertzel_filter_bank(segments, fs, freqs)
+    # small silence detection
+    silent = np.max(np.abs(segments), axis=1) < 1e-5
+    powers[silent] = 0.0
+
+    # determine threshold dynamically
+    global_max = powers.max()
+    # if signal is very small, set a small floor
+    if global_max <= 0:
+        raise ValueError("No detectable tone energy found in audio.")
+    threshold = max(global_max * 0.03, 1e-6)  # 3% of max or small floor
+    return powers, threshold, fs, samples_per_bit
+
+def decode_wav_goertzel(wav_path, bit_duration=BIT_DURATION, freqs=(FREQ_0, FREQ_1, FREQ_GAP), sync=False,
+                        soft=False):
+    """
+    Decodes a capture into a '0'/'1' string; see segment_powers() for sync.
+    Returns (bit_string, fs, samples_per_bit).
+
+    With soft=True returns (bit_string, fs, samples_per_bit, llr) instead:
+    inner gaps stay in place as '?' erasures, and llr holds one log-likelihood
+    ratio per character (see soft_decisions()).
+    """
+    powers, threshold, fs, samples_per_bit = segment_powers(wav_path, bit_duration, freqs, sync)
+
+    # Second pass: classify
+    decoded = classify_powers(powers, threshold)
+    if soft:
+        symbols, llr = soft_decisions(powers, decoded)
+        return "".join(symbols), fs, samples_per_bit, llr
+
+    # gaps (leading, trailing and inner) never make it into the bit string
+    bit_string = "".join(decoded[decoded != 'G'])
+    return bit_string, fs, samples_per_bit
+
+def soft_decisions(powers, decoded):
+    """
+    Soft output for classified bits. Leading/trailing gaps are trimmed like the
+    hard decoder, inner gaps become '?' erasures instead of being dropped, so
+    every later bit keeps its grid position.
+
+    llr = log((p1 + n) / (p0 + n)), with n the median power of the losing data
+    tone as a noise-floor estimate: > 0 favours '1', < 0 favours '0', and
+    erasures are exactly 0.
+    """
+    is_bit = decoded != 'G'
+    if not is_bit.any():
+        return np.array([], dtype='<U1'), np.zeros(0)
+    first, last = np.flatnonzero(is_bit)[[0, -1]]
+    powers = powers[first:last + 1]
+    symbols = decoded[first:last + 1].copy()
+    erased = symbols == 'G'
+    symbols[erased] = '?'
+
+    p0, p1 = powers[:, 0], powers[:, 1]
+    noise = float(np.median(np.minimum(p0, p1))) + 1e-12
+    llr = np.log((p1 + noise) / (p0 + noise))
+    llr[erased] = 0.0
+    return symbols, llr
+
+def llr_confidence(llr):
+    """Per-bit confidence in [0, 1] from log-likelihood ratios: |tanh(llr / 2)|."""
+    return np.abs(np.tanh(np.asarray(llr) / 2.0))
+
+def classify_powers(powers, threshold):
+    """
+    Maps a (num_bits, 3) array of (p0, p1, pg) powers to an array of '0'/'1'/'G'.
+    threshold may be a scalar or a per-bit array; argmax keeps the p0 > p1 > pg
+    tie order of the original comparison chain.
+    """
+    symbols = np.array(['0', '1', 'G'])
+    decoded = symbols[np.argmax(powers, axis=1)]
+    decoded[powers.max(axis=1) < threshold] = 'G'   # gap / unknown / silence
+    return decoded
+
+def decision_margins(powers):
+    """
+    Per-bit confidence in [0, 1]: how far the winning data tone beats the other
+    one, (|p1 - p0|) / (p0 + p1). 0 means a coin flip, 1 a clean tone.
+    """
+    p0, p1 = powers[:, 0], powers[:, 1]
+    return np.abs(p1 - p0) / np.maximum(p0 + p1, 1e-30)
+
+# -----------------------
+# Sync: preamble search + symbol timing recovery
+# -----------------------
+def tone_envelopes(data, sample_rate, freqs, window):
+    """
+    Sliding Goertzel: power of every tone in freqs over the window samples that
+    start at each index, computed as one FFT correlation per tone.
+    Returns a (len(freqs), len(data) - window + 1) array.
+    """
+    # scipy.signal costs over a second to import; only the sync stage needs it
+    from scipy.signal import fftconvolve
+
+    t = np.arange(window)
+    out = np.empty((len(freqs), len(data) - window + 1))
+    for row, f in enumerate(freqs):
+        kernel = np.exp(-2j * np.pi * f * t / sample_rate)
+        out[row] = np.abs(fftconvolve(data, kernel[::-1], mode="valid")) ** 2
+    return out
+
+def find_preamble(envelopes, samples_per_bit, gap_bits=GAP_BITS, gap_row=2):
+    """
+    Sliding detector for the FREQ_GAP preamble: returns the first index where the
+    gap tone dominates the other tones for (almost) the whole gap burst, or None.
+    """
+    total = envelopes.sum(axis=0)
+    level = total > 0.01 * total.max()
+    gap_share = np.where(level, envelopes[gap_row] / np.maximum(total, 1e-30), 0.0)
+    run = max(1, (gap_bits - 1) * samples_per_bit)
+    if len(gap_share) < run:
+        return None
+    csum = np.concatenate([[0.0], np.cumsum(gap_share > 0.5)])
+    hits = np.flatnonzero(csum[run:] - csum[:-run] >= 0.9 * run)
+    return int(hits[0]) if len(hits) else None
+
+def recover_symbol_timing(data, fs, bit_duration=BIT_DURATION, freqs=(FREQ_0, FREQ_1, FREQ_GAP),
+                          gap_bits=GAP_BITS, track_bits=TRACK_BITS, tolerance=CLOCK_TOLERANCE):
+    """
+    Finds the bit grid of a capture with an unknown leading offset and clock error.
+
+    1. tone_envelopes() slides a one-bit Goertzel window over the capture; the
+       "purity" max(e)/sum(e) peaks when the window covers exactly one bit, so it
+       carries a spectral line at the symbol rate.
+    2. The FFT of the purity locates that line (rate -> samples per bit) and its
+       phase (fractional bit offset); find_preamble() anchors the grid on the
+       FREQ_GAP burst.
+    3. The phase is re-measured every track_bits bits and interpolated, which
+       follows slow clock drift over the message.
+
+    Returns (starts, samples_per_bit): integer start index of every bit segment
+    and the measured samples per bit (float).
+    """
+    nominal = bit_duration * fs
+    window = int(round(nominal))
+    if window <= 0 or len(data) < 4 * window:
+        raise ValueError("Audio too short for the given bit duration.")
+
+    env = tone_envelopes(data, fs, freqs, window)
+    total = env.sum(axis=0)
+    active = np.flatnonzero(total > 0.01 * total.max())
+    if len(active) == 0:
+        raise ValueError("No detectable tone energy found in audio.")
+    purity = np.where(total > 0.01 * total.max(), env.max(axis=0) / np.maximum(total, 1e-30), 0.0)
+
+    preamble = find_preamble(env, window, gap_bits, gap_row=len(freqs) - 1)
+    first = preamble if preamble is not None else int(active[0])
+    last = int(active[-1])
+    q = purity[first:last + 1]
+    q = q - q.mean()
+    n = len(q)
+
+    # clock rate: strongest spectral line within +-tolerance of the nominal rate,
+    # refined with parabolic interpolation on the zero-padded spectrum
+    nfft = 1 << int(np.ceil(np.log2(8 * n)))
+    spectrum = np.abs(np.fft.rfft(q, nfft))
+    freqs_axis = np.fft.rfftfreq(nfft)
+    lo, hi = np.searchsorted(freqs_axis, [(1 - tolerance) / nominal, (1 + tolerance) / nominal])
+    k = lo + int(np.argmax(spectrum[lo:hi]))
+    if 0 < k < len(spectrum) - 1:
+        a, b, c = spectrum[k - 1], spectrum[k], spectrum[k + 1]
+        denom = a - 2 * b + c
+        k = k + (0.5 * (a - c) / denom if denom != 0 else 0.0)
+    samples_per_bit = 1.0 / (k / nfft)
+
+    # phase of the line per tracking block -> grid offset, unwrapped over blocks
+    idx = np.arange(n)
+    rot = q * np.exp(-2j * np.pi * idx / samples_per_bit)
+    block = max(1, int(round(track_bits * samples_per_bit)))
+    num_blocks = max(1, n // block)
+    edges = np.linspace(0, n, num_blocks + 1).astype(int)
+    sums = np.add.reduceat(rot, edges[:-1])
+    strength = np.abs(sums)
+    reliable = strength >= 0.25 * np.median(strength)
+    phases = np.unwrap(np.angle(sums[reliable]))
+    centers = 0.5 * (edges[:-1] + edges[1:])[reliable]
+
+    # purity peaks at bit starts: offset = -phase/(2 pi) of a period
+    offsets = -phases / (2 * np.pi) * samples_per_bit
+    offsets -= np.floor(offsets[0] / samples_per_bit) * samples_per_bit
+    base = np.arange(int(n / samples_per_bit) + 1) * samples_per_bit
+    positions = base + np.interp(base, centers, offsets)
+
+    starts = np.round(positions).astype(int) + first
+    seg_len = int(round(samples_per_bit))
+    starts = starts[(starts >= 0) & (starts + seg_len <= len(data))]
+    return starts, samples_per_bit
+
+# -----------------------
+# Streaming decode (bounded memory, running statistics)
+# -----------------------
+STREAM_BLOCK_SAMPLES = 1 << 16   # samples read from disk per block
+PEAK_DECAY = 0.9999              # per-bit decay of the running tone-power peak
+
+def stream_segments(data, samples_per_bit, block_samples=STREAM_BLOCK_SAMPLES, scale=1.0):
+    """
+    Walks data (typically a memmap) in fixed-size blocks and yields the
+    (num_bits, samples_per_bit) float matrix of whole bit segments in each
+    block, divided by scale. Samples that do not fill a whole bit are carried
+    over, so the segments are exactly those of the in-memory reshape.
+    """
+    block_samples = max(int(block_samples), 1)
+    carry = np.zeros(0)
+    for start in range(0, len(data), block_samples):
+        chunk = np.concatenate([carry, np.asarray(data[start:start + block_samples], dtype=float) / scale])
+        num_bits = len(chunk) // samples_per_bit
+        carry = chunk[num_bits * samples_per_bit:]
+        if num_bits:
+            yield chunk[:num_bits * samples_per_bit].reshape(num_bits, samples_per_bit)
+
+def stream_bits_goertzel(wav_path, bit_duration=BIT_DURATION, freqs=(FREQ_0, FREQ_1, FREQ_GAP),
+                         block_samples=STREAM_BLOCK_SAMPLES, peak_decay=PEAK_DECAY, exact=False):
+    """
+    Generator version of decode_wav_goertzel for captures too large for RAM.
+
+    The WAV is memory-mapped and walked in fixed-size blocks (stream_segments).
+    Instead of the global max, powers are normalized by the running peak
+    amplitude and thresholded at 3% of a slowly decaying running peak of tone
+    power, so bits are yielded ('0'/'1', gaps skipped) as soon as their
+    segment has been read. This is intentionally not the in-memory decision:
+    bits read before the loudest part of the capture see a lower peak, and a
+    long quiet stretch lets the threshold decay, so weak bits near the 3%
+    threshold can come out differently.
+
+    With exact=True the capture is read three times instead (peak amplitude,
+    peak tone power, then the bits), still in bounded memory, and the bits
+    are exactly those of decode_wav_goertzel(wav_path, bit_duration, freqs).
+    """
+    if not os.path.exists(wav_path):
+        raise FileNotFoundError(f"{wav_path} not found.")
+
+    fs, data = wavfile.read(wav_path, mmap=True)
+    if data.ndim > 1:
+        data = data[:, 0]
+
+    samples_per_bit = int(round(bit_duration * fs))
+    if samples_per_bit <= 0:
+        raise ValueError("bit_duration or sampling rate produces zero samples/bit.")
+
+    if exact:
+        yield from _stream_bits_global(data, fs, samples_per_bit, freqs, block_samples)
+        return
+
+    peak_amp = 0.0
+    peak_power = 0.0
+    for segments in stream_segments(data, samples_per_bit, block_samples):
+        num_bits = len(segments)
+        seg_peak = np.max(np.abs(segments), axis=1)
+        peak_amp = max(peak_amp, float(seg_peak.max()))
+        if peak_amp <= 0:
+            continue
+
+        powers = goertzel_filter_bank(segments, fs, freqs) / (peak_amp * peak_amp)
+        powers[seg_peak < 1e-5 * peak_amp] = 0.0
+
+        # running peak: peak_i = max(peak_{i-1} * decay, m_i), solved in closed
+        # form for the block as a cumulative max in the undecayed domain
+        decay = peak_decay ** np.arange(1, num_bits + 1)
+        running = np.maximum.accumulate(np.concatenate([[peak_power], powers.max(axis=1) / decay]))[1:] * decay
+        peak_power = float(running[-1])
+
+        decoded = classify_powers(powers, np.maximum(running * 0.03, 1e-6))
+        yield from decoded[decoded != 'G'].tolist()
+
+def _stream_bits_global(data, fs, samples_per_bit, freqs, block_samples):
+    """The exact=True passes of stream_bits_goertzel: segment_powers' normalization, block by block."""
+    if len(data) // samples_per_bit == 0:
+        raise ValueError("Audio too short for the given bit duration.")
+    max_abs = 0.0
+    for start in range(0, len(data), max(int(block_samples), 1)):
+        max_abs = max(max_abs, float(np.max(np.abs(np.asarray(data[start:start + block_samples], dtype=float)))))
+    scale = max_abs if max_abs > 0 else 1.0
+
+    def block_powers():
+        for segments in stream_segments(data, samples_per_bit, block_samples, scale):
+            powers = goertzel_filter_bank(segments, fs, freqs)
+            powers[np.max(np.abs(segments), axis=1) < 1e-5] = 0.0
+            yield powers
+
+    global_max = max((float(p.max()) for p in block_powers()), default=0.0)
+    if global_max <= 0:
+        raise ValueError("No detectable tone energy found in audio.")
+    threshold = max(global_max * 0.03, 1e-6)
+    for powers in block_powers():
+        decoded = classify_powers(powers, threshold)
+        yield from decoded[decoded != 'G'].tolist()
@@ -1,3 +1,4 @@
+import wave
 import numpy as np
 from scipy.io.wavfile import write
 
@@ -9,6 +10,17 @@ f1 = 12000           # Frequency for 1 (modern)
 fgap = 10000         # Frequency for gap (modern)
 gap_bits = 5         # Number of gap bits at start/end
 
+# Per-job settings used by the batch generator (module parameters as defaults)
+DEFAULT_SETTINGS = {
+    "mode": "modern",
+    "fs": fs,
+    "bit_duration": bit_duration,
+    "f0": f0,
+    "f1": f1,
+    "fgap": fgap,
+    "gap_bits": gap_bits,
+}
+
 # ===== FULL ARECIBO MESSAGE (1679 bits) =====
 arecibo_binary = (
     "00000010101010000000000"
@@ -94,27 +106,193 @@ def generate_bit_tone(freq, duration, fs):
 def generate_silence(duration, fs):
     return np.zeros(int(fs*duration))
 
-# ===== ASK USER =====
-mode = input("Choose mode (modern / old): ").strip().lower()
+# ===== MODULATOR ENGINE =====
+# Every bit restarts its tone at phase zero, so one bit-long period-table per
+# symbol is enough: the waveform is a gather of table rows by symbol index.
+SYMBOL_GAP = 2       # row index of the gap tone in a "modern" table
+
+def build_tone_table(mode="modern", fs=fs, bit_duration=bit_duration, f0=f0, f1=f1, fgap=fgap):
+    """
+    Returns a (num_symbols, samples_per_bit) float table.
+    modern: rows 0, 1, gap = f0, f1, fgap tones.  old: rows 0, 1 = silence, 10 kHz.
+    """
+    if mode == "modern":
+        rows = [generate_bit_tone(f0, bit_duration, fs),
+                generate_bit_tone(f1, bit_duration, fs),
+                generate_bit_tone(fgap, bit_duration, fs)]
+    elif mode == "old":
+        rows = [generate_silence(bit_duration, fs),
+                generate_bit_tone(10000, bit_duration, fs)]
+    else:
+        raise ValueError("Invalid mode. Choose either 'modern' or 'old'.")
+    return np.vstack(rows)
+
+def bits_to_symbols(bits, mode="modern", gap_bits=gap_bits):
+    """'0'/'1' string -> uint8 symbol indices, with gap symbols around modern messages."""
+    symbols = np.frombuffer(bits.encode("ascii"), dtype=np.uint8) - ord("0")
+    if symbols.size and symbols.max() > 1:
+        raise ValueError("Message must contain only '0' and '1'.")
+    if mode == "modern" and gap_bits > 0:
+        gap = np.full(gap_bits, SYMBOL_GAP, dtype=np.uint8)
+        symbols = np.concatenate([gap, symbols, gap])
+    return symbols
+
+def generate_arecibo_signal(bits=arecibo_binary, mode="modern", fs=fs, bit_duration=bit_duration,
+                            f0=f0, f1=f1, fgap=fgap, gap_bits=gap_bits, table=None):
+    """
+    Builds the normalized int16 waveform for a bit string.
+
+    The float table is normalized once (its peak over the symbols actually used
+    is the peak of the whole signal) and the samples are gathered straight into
+    a preallocated int16 buffer. A table from build_tone_table() can be passed
+    in to reuse it across calls.
+    """
+    if table is None:
+        table = build_tone_table(mode, fs, bit_duration, f0, f1, fgap)
+    symbols = bits_to_symbols(bits, mode, gap_bits)
+    samples_per_bit = table.shape[1]
+
+    used = np.bincount(symbols, minlength=len(table)) > 0
+    peak = np.max(np.abs(table[used])) if samples_per_bit else 0.0
+    if peak == 0:
+        return np.zeros(len(symbols) * samples_per_bit, dtype=np.int16)
+    table_int16 = np.int16(table / peak * 32767)
+
+    signal_int16 = np.empty(len(symbols) * samples_per_bit, dtype=np.int16)
+    np.take(table_int16, symbols, axis=0, out=signal_int16.reshape(len(symbols), samples_per_bit))
+    return signal_int16
+
+def write_arecibo_wav(filename, bits=arecibo_binary, mode="modern", fs=fs, **kwargs):
+    """Generates the message and saves it as a 16-bit WAV."""
+    write(filename, fs, generate_arecibo_signal(bits, mode, fs=fs, **kwargs))
+    return filename
+
+# ===== CONTINUOUS-PHASE FSK + STREAMING WRITER =====
+STREAM_BLOCK_BITS = 2048    # bits synthesized per block when streaming to disk
+
+class StreamingWavWriter:
+    """
+    Mono 16-bit WAV written frame block by frame block; the header sizes are
+    patched by the wave module on close, so nothing is held in memory.
+    """
+    def __init__(self, filename, fs):
+        self.filename = filename
+        self._wav = wave.open(filename, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(int(fs))
+        self.frames_written = 0
+
+    def write(self, frames):
+        frames = np.asarray(frames, dtype="<i2")
+        self._wav.writeframes(frames.tobytes())
+        self.frames_written += len(frames)
 
-if mode == "modern":
-    # Modern encoding: 0 = 8kHz, 1 = 12kHz, gaps = 10kHz
-    gap_signal = np.concatenate([generate_bit_tone(fgap, bit_duration, fs) for _ in range(gap_bits)])
-    message_signal = np.concatenate([generate_bit_tone(f1 if b == '1' else f0, bit_duration, fs) for b in arecibo_binary])
-    full_signal = np.concatenate([gap_signal, message_signal, gap_signal])
-    filename = "arecibo_modern.wav"
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def cpfsk_tables(increments, samples_per_bit):
+    """cos/sin of the phase advance k*increment within one bit, one row per symbol."""
+    ramp = np.outer(increments, np.arange(samples_per_bit))
+    return np.cos(ramp), np.sin(ramp)
+
+def cpfsk_block(symbols, phase, increments, tables):
+    """
+    Phase-accumulator NCO: the phase advances by its tone's increment every
+    sample and is carried from one bit (and block) to the next instead of
+    restarting at zero. Within a bit sin(start + k*inc) expands to
+    sin(start)*cos(k*inc) + cos(start)*sin(k*inc), so only one phase per bit is
+    accumulated and the rest is a gather from the cpfsk_tables() rows.
+    Returns (samples as a (num_bits, samples_per_bit) array, next_phase).
+    """
+    cos_table, sin_table = tables
+    advance = increments[symbols] * cos_table.shape[1]
+    acc = np.cumsum(advance)
+    start = (phase + acc - advance)[:, None]
+    samples = np.take(cos_table, symbols, axis=0)
+    samples *= np.sin(start)
+    quadrature = np.take(sin_table, symbols, axis=0)
+    quadrature *= np.cos(start)
+    samples += quadrature
+    next_phase = (phase + acc[-1]) % (2 * np.pi) if len(acc) else phase
+    return samples, next_phase
+
+def iter_bit_blocks(bits, block_bits=STREAM_BLOCK_BITS):
+    """Splits a bit string, or an iterable of bit-string chunks, into bounded blocks."""
+    chunks = [bits] if isinstance(bits, str) else bits
+    for chunk in chunks:
+        for start in range(0, len(chunk), block_bits):
+            yield chunk[start:start + block_bits]
+
+def stream_arecibo_wav(filename, bits=arecibo_binary, mode="cpfsk", fs=fs, bit_duration=bit_duration,
+                       f0=f0, f1=f1, fgap=fgap, gap_bits=gap_bits, block_bits=STREAM_BLOCK_BITS):
+    """
+    Writes a message of any length to disk in constant memory.
+
+    mode "cpfsk" is phase-continuous modern FSK (0 = f0, 1 = f1, gaps = fgap);
+    "modern" and "old" stream the phase-reset tone tables. Tones have a known
+    amplitude of 1, so samples are scaled straight to int16 without a
+    normalization pass over the whole signal. bits may be a string or an
+    iterable of string chunks (e.g. read from a file). Returns the frame count.
+    """
+    table_mode = "modern" if mode == "cpfsk" else mode
+    table = build_tone_table(table_mode, fs, bit_duration, f0, f1, fgap)
+    table_int16 = np.int16(table * 32767)
+    samples_per_bit = table.shape[1]
+    increments = 2 * np.pi * np.array([f0, f1, fgap], dtype=float) / fs
+    tables = cpfsk_tables(increments, samples_per_bit)
+    with_gaps = table_mode == "modern" and gap_bits > 0
+    gap = np.full(gap_bits, SYMBOL_GAP, dtype=np.uint8)
+    phase = 0.0
+
+    with StreamingWavWriter(filename, fs) as out:
+        def emit(symbols):
+            nonlocal phase
+            if mode == "cpfsk":
+                samples, phase = cpfsk_block(symbols, phase, increments, tables)
+                out.write(np.int16(samples.ravel() * 32767))
+            else:
+                out.write(table_int16[symbols].ravel())
+
+        if with_gaps:
+            emit(gap)
+        for block in iter_bit_blocks(bits, block_bits):
+            emit(bits_to_symbols(block, table_mode, gap_bits=0))
+        if with_gaps:
+            emit(gap)
+        return out.frames_written
+
+# ===== ASK USER =====
+def main():
+    mode = input("Choose mode (modern / old / cpfsk): ").strip().lower()
 
-elif mode == "old":
-    # Old encoding: 0 = silence, 1 = 10kHz, no gaps
-    message_signal = np.concatenate([generate_bit_tone(10000, bit_duration, fs) if b == '1' else generate_silence(bit_duration, fs) for b in arecibo_binary])
-    full_signal = message_signal
-    filename = "arecibo_old.wav"
+    if mode == "modern":
+        # Modern encoding: 0 = 8kHz, 1 = 12kHz, gaps = 10kHz
+        filename = "arecibo_modern.wav"
+    elif mode == "old":
+        # Old encoding: 0 = silence, 1 = 10kHz, no gaps
+        filename = "arecibo_old.wav"
+    elif mode == "cpfsk":
+        # Modern tones with continuous phase, streamed straight to disk
+        filename = "arecibo_cpfsk.wav"
+        stream_arecibo_wav(filename, arecibo_binary, "cpfsk")
+        print(f"Arecibo message audio generated: {filename}")
+        return
+    else:
+        raise ValueError("Invalid mode. Choose 'modern', 'old' or 'cpfsk'.")
 
-else:
-    raise ValueError("Invalid mode. Choose either 'modern' or 'old'.")
+    # ===== NORMALIZE AND SAVE =====
+    write_arecibo_wav(filename, arecibo_binary, mode)
 
-# ===== NORMALIZE AND SAVE =====
-signal_int16 = np.int16(full_signal/np.max(np.abs(full_signal)) * 32767)
-write(filename, fs, signal_int16)
+    print(f"Arecibo message audio generated: {filename}")
 
-print(f"Arecibo message audio generated: {filename}")
+if __name__ == "__main__":
+    main()
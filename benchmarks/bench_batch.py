@@ -0,0 +1,82 @@
+"""
+bench_batch.py
+
+Runs arecibo_batch.run_batch on a manifest that mixes valid jobs with invalid
+ones (an unknown mode, a non-binary payload, a bad sample rate) and checks
+that only the invalid jobs fail: every valid output must exist and match
+generate_arecibo_signal, every invalid job must come back with an error in
+its own slot. Also reports the batch throughput.
+
+Usage: python benchmarks/bench_batch.py [copies]
+Exits non-zero if a valid job fails or an invalid one does not.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+from scipy.io import wavfile  # noqa: E402
+
+from arecibo_batch import job_settings, run_batch  # noqa: E402
+from arecibo_old_new import generate_arecibo_signal  # noqa: E402
+
+VALID = [
+    {"bits": "0110100111", "mode": "modern"},
+    {"bits": "0110100111", "mode": "old"},
+    {"bits": "1100101", "mode": "modern", "f0": 5000, "f1": 8000, "fgap": 6500},
+]
+INVALID = [
+    {"bits": "0110", "mode": "bogus"},
+    {"bits": "01x0", "mode": "modern"},
+    {"bits": "0110", "mode": "old", "fs": "fast"},
+]
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    jobs, expect_ok = [], []
+    for c in range(copies):
+        for j, job in enumerate(VALID):
+            jobs.append(dict(job, output=f"ok_{c}_{j}.wav"))
+            expect_ok.append(True)
+        for j, job in enumerate(INVALID):
+            jobs.append(dict(job, output=f"bad_{c}_{j}.wav"))
+            expect_ok.append(False)
+
+    out_dir = tempfile.mkdtemp()
+    failed = 0
+    try:
+        results, wall = run_batch(jobs, out_dir=out_dir)
+        for job, ok, (path, bits, _, err) in zip(jobs, expect_ok, results):
+            if path != os.path.join(out_dir, job["output"]):
+                print(f"{job['output']}: result out of order ({path})")
+                failed += 1
+            elif ok and err:
+                print(f"{job['output']}: valid job failed: {err}")
+                failed += 1
+            elif not ok and not err:
+                print(f"{job['output']}: invalid job did not fail")
+                failed += 1
+            elif ok:
+                _, written = wavfile.read(path)
+                if not np.array_equal(written, generate_arecibo_signal(job["bits"], **job_settings(job))):
+                    print(f"{job['output']}: output differs from generate_arecibo_signal")
+                    failed += 1
+
+        done = sum(expect_ok)
+        print(f"jobs:        {len(jobs)} ({done} valid, {len(jobs) - done} invalid)")
+        print(f"errors:      {sorted({err for *_, err in results if err})}")
+        print(f"wall:        {wall:.2f} s, {done / wall:,.1f} files/s")
+        print(f"isolated:    {not failed}")
+    finally:
+        shutil.rmtree(out_dir)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
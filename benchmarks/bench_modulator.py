@@ -0,0 +1,62 @@
+"""
+bench_modulator.py
+
+Compares the original per-bit generator (generate_bit_tone for every bit, then
+np.concatenate) with the table-gather modulator in generate_arecibo_signal,
+on the Arecibo message and on random custom payloads.
+
+Usage: python benchmarks/bench_modulator.py [max_bits]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from arecibo_old_new import (  # noqa: E402
+    arecibo_binary, fs, bit_duration, f0, f1, fgap, gap_bits,
+    generate_bit_tone, generate_arecibo_signal,
+)
+
+
+def per_bit_modern(bits):
+    """The original module-level 'modern' branch, including the normalization."""
+    gap_signal = np.concatenate([generate_bit_tone(fgap, bit_duration, fs) for _ in range(gap_bits)])
+    message_signal = np.concatenate([generate_bit_tone(f1 if b == '1' else f0, bit_duration, fs) for b in bits])
+    full_signal = np.concatenate([gap_signal, message_signal, gap_signal])
+    return np.int16(full_signal/np.max(np.abs(full_signal)) * 32767)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    max_bits = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+
+    payloads = [("arecibo", arecibo_binary)]
+    n = 10_000
+    while n <= max_bits:
+        payloads.append((f"random {n}", "".join(rng.choice(["0", "1"], n))))
+        n *= 10
+
+    print(f"{'payload':>16} {'per-bit ms':>11} {'gather ms':>10} {'speedup':>8} {'equal':>6}")
+    for name, bits in payloads:
+        # the per-bit loop is only timed up to 100k bits; beyond that it is minutes
+        if len(bits) <= 100_000:
+            t_old, old = timed(per_bit_modern, bits)
+        else:
+            t_old, old = float("nan"), None
+        t_new, new = timed(generate_arecibo_signal, bits)
+        equal = "-" if old is None else str(np.array_equal(old, new))
+        print(f"{name:>16} {t_old * 1e3:11.1f} {t_new * 1e3:10.1f} {t_old / t_new:8.1f} {equal:>6}")
+
+
+if __name__ == "__main__":
+    main()
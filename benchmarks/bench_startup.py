@@ -0,0 +1,79 @@
+"""
+bench_startup.py
+
+Import-time tracker for the tools, based on `python -X importtime`. Every
+target is imported in a fresh interpreter; the script reports the cumulative
+import time and flags any GUI / audio-device / heavy module that got pulled in.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--budget-ms MS]
+Exits non-zero if a headless core exceeds the budget or imports a GUI module.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (label, import statement, headless?)
+TARGETS = [
+    ("arecibo_decode", "import arecibo_decode", True),
+    ("arecibo_batch_decode", "import arecibo_batch_decode", True),
+    ("arecibo_old_new", "import arecibo_old_new", True),
+    ("envelope_engine", "import envelope_engine", True),
+    ("natural_language_core", "import natural_language_core", True),
+    ("arecibo_grid (viewer)", "import arecibo_grid", False),
+    ("Natural_Language (tool)",
+     "import importlib.util as u; s = u.spec_from_file_location('nl', '\U0001f358Natural_Language.py'); "
+     "s.loader.exec_module(u.module_from_spec(s))", False),
+]
+HEAVY = ("pygame", "matplotlib", "sounddevice", "scipy.signal")
+
+
+def import_profile(statement):
+    """Returns (total cumulative us, set of top-level-ish modules imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    total = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.add(name.strip())
+        # top-level imports are the ones without indentation in the name column
+        if not line.split("|")[2].startswith("  "):
+            total += int(cumulative)
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track import/startup time of the tools.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target, best is reported")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a headless core is slower")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'target':<26} {'import ms':>10}  heavy modules")
+    for label, statement, headless in TARGETS:
+        try:
+            runs = [import_profile(statement) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{label:<26} {'error':>10}  {e}")
+            failed = failed or headless
+            continue
+        best = min(total for total, _ in runs) / 1000
+        heavy = sorted(m for m in HEAVY if m in runs[0][1])
+        print(f"{label:<26} {best:10.1f}  {', '.join(heavy) or '-'}")
+        if headless and (heavy or args.budget_ms is not None and best > args.budget_ms):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
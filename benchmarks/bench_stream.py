@@ -0,0 +1,58 @@
+"""
+bench_stream.py
+
+Compares stream_bits_goertzel with the in-memory decode_wav_goertzel on the
+captures in the repository root: exact=True must decode the same bits for
+every block size, the default running-statistics mode is reported as the
+number of bits that differ. Also times both.
+
+Usage: python benchmarks/bench_stream.py [capture.wav ...]
+Exits non-zero if the exact stream differs from the in-memory decoder.
+"""
+
+import os
+import sys
+import glob
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from arecibo_decode import decode_wav_goertzel, stream_bits_goertzel  # noqa: E402
+
+BLOCK_SIZES = (1000, 4096, 1 << 16)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def differing(a, b):
+    return sum(x != y for x, y in zip(a, b)) + abs(len(a) - len(b))
+
+
+def main():
+    warnings.simplefilter("ignore")  # non-data chunks in some captures
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(ROOT, "*.wav")))
+    failed = 0
+    print(f"{'file':<36} {'bits':>6} {'exact':>6} {'running diff':>13} {'memory ms':>10} {'stream ms':>10}")
+    for path in paths:
+        try:
+            t_mem, (reference, _, _) = timed(lambda: decode_wav_goertzel(path))
+        except ValueError as e:
+            print(f"{os.path.basename(path):<36} skipped: {e}")
+            continue
+        exact = all("".join(stream_bits_goertzel(path, block_samples=b, exact=True)) == reference
+                    for b in BLOCK_SIZES)
+        t_stream, running = timed(lambda: "".join(stream_bits_goertzel(path)))
+        failed += not exact
+        print(f"{os.path.basename(path):<36} {len(reference):>6} {str(exact):>6} "
+              f"{differing(running, reference):>13} {t_mem * 1000:10.2f} {t_stream * 1000:10.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+bench_sync.py
+
+Synthesizes modern-mode captures (5 FREQ_GAP bits, message, 5 FREQ_GAP bits)
+with a random leading offset, a +-1% transmitter clock error, a slowly drifting
+clock and additive noise, then compares bit errors and decode time of the
+plain decoder against decode_wav_goertzel(..., sync=True).
+
+Usage: python benchmarks/bench_sync.py [trials]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from scipy.io import wavfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from arecibo_decode import (  # noqa: E402
+    FREQ_0, FREQ_1, FREQ_GAP, GAP_BITS, decode_wav_goertzel,
+)
+
+FS = 44100
+SAMPLES_PER_BIT = 44          # what arecibo_old_new.py writes at 44.1 kHz / 1 ms
+SNR_DB = 15
+
+
+def synth_capture(bits, offset_s, clock_error, drift, rng):
+    """Phase-reset FSK like the generator, with bit edges on a skewed clock."""
+    symbols = ['G'] * GAP_BITS + list(bits) + ['G'] * GAP_BITS
+    tone = {'0': FREQ_0, '1': FREQ_1, 'G': FREQ_GAP}
+    freqs = np.array([tone[s] for s in symbols], dtype=float)
+
+    # per-bit duration: constant error plus a linear wander of +-drift
+    nominal = SAMPLES_PER_BIT / FS
+    wander = np.linspace(-drift, drift, len(symbols))
+    durations = nominal * (1 + clock_error + wander)
+    edges = offset_s + np.concatenate([[0.0], np.cumsum(durations)])
+
+    t = np.arange(int((edges[-1] + 0.01) * FS)) / FS
+    idx = np.searchsorted(edges, t, side="right") - 1
+    valid = (idx >= 0) & (idx < len(symbols))
+    x = np.zeros_like(t)
+    x[valid] = np.sin(2 * np.pi * freqs[idx[valid]] * (t[valid] - edges[idx[valid]]))
+    x += rng.normal(0, 10 ** (-SNR_DB / 20) / np.sqrt(2), len(x))
+    return (x / np.max(np.abs(x)) * 32767).astype(np.int16)
+
+
+def bit_errors(decoded, reference):
+    m = min(len(decoded), len(reference))
+    diff = np.frombuffer(decoded[:m].encode(), np.uint8) != np.frombuffer(reference[:m].encode(), np.uint8)
+    return int(diff.sum()) + abs(len(decoded) - len(reference))
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    reference, _, _ = decode_wav_goertzel(os.path.join(ROOT, "arecibo_modern.wav"))
+    rng = np.random.default_rng(1974)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.wav")
+        for _ in range(trials):
+            offset = rng.uniform(0, 0.05)
+            error = rng.uniform(-0.01, 0.01)
+            drift = rng.uniform(0, 0.002)
+            wavfile.write(path, FS, synth_capture(reference, offset, error, drift, rng))
+
+            t0 = time.perf_counter()
+            plain, _, _ = decode_wav_goertzel(path)
+            t1 = time.perf_counter()
+            synced, _, spb = decode_wav_goertzel(path, sync=True)
+            t2 = time.perf_counter()
+            rows.append((offset, error, drift, bit_errors(plain, reference),
+                         bit_errors(synced, reference), spb, t1 - t0, t2 - t1))
+
+    print(f"{'offset ms':>9} {'clock %':>8} {'drift %':>8} {'plain err':>9} {'sync err':>8} {'spb':>8} {'sync ms':>8}")
+    for off, err, drift, e_plain, e_sync, spb, _, t_sync in rows:
+        print(f"{off * 1e3:9.2f} {err * 100:+8.3f} {drift * 100:8.3f} {e_plain:9d} {e_sync:8d} {spb:8.3f} {t_sync * 1e3:8.1f}")
+
+    rows = np.array(rows)
+    print(f"\nmean bit errors / {len(reference)}: plain {rows[:, 3].mean():.1f}, sync {rows[:, 4].mean():.2f}")
+    print(f"mean decode time: plain {rows[:, 6].mean() * 1e3:.1f} ms, sync {rows[:, 7].mean() * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+envelope_engine.py
+
+NumPy-only signal engine shared by the desktop tool (natural_language_core)
+and the web app (application/dsp.py re-exports it): envelope application,
+strict sign subdivision and the keypoint form of drawn envelopes. No Django, matplotlib or scipy imports, so either
+side can load it cheaply.
+
+The web app's entry points (manage.py, wsgi.py, asgi.py and its benchmarks)
+add this directory to sys.path.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+def apply_envelope(audio_data, envelope_pos, envelope_neg, offset=0.0):
+    """
+    Replace every positive sample with the positive envelope and every negative
+    sample with the negative envelope (plus offset). Zero samples, and samples
+    past the end of a shorter envelope, are left untouched.
+    """
+    original = np.asarray(audio_data)
+    adjusted = np.copy(original)
+    envelope_pos = np.asarray(envelope_pos)
+    envelope_neg = np.asarray(envelope_neg)
+    n_pos = min(len(adjusted), len(envelope_pos))
+    n_neg = min(len(adjusted), len(envelope_neg))
+
+    # signs are always read from the original samples, never from written ones
+    adjusted[:n_pos] = np.where(original[:n_pos] > 0, envelope_pos[:n_pos] + offset, adjusted[:n_pos])
+    adjusted[:n_neg] = np.where(original[:n_neg] < 0, envelope_neg[:n_neg] + offset, adjusted[:n_neg])
+    return adjusted
+
+
+def strict_sign_subdivision(x, y):
+    """
+    Insert a zero-crossing vertex between every pair of neighbours whose signs
+    differ, so each segment can be coloured by the sign of its start point.
+
+    Returns (new_x, new_y, color_val) with color 0 for negative and 1 for
+    non-negative points; a crossing takes the colour of the side it leads into.
+    All crossings are found and interpolated in one pass and scattered into
+    preallocated output buffers.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if n == 0:
+        return np.array([]), np.array([]), np.array([])
+
+    y0, y1 = y[:-1], y[1:]
+    rising = (y0 < 0) & (y1 >= 0)
+    falling = (y0 >= 0) & (y1 < 0)
+    idx = np.flatnonzero(rising | falling)
+
+    # crossing positions, with the same near-flat fallback as the scalar version
+    dy = y1[idx] - y0[idx]
+    steep = np.abs(dy) > 1e-12
+    t = np.full(len(idx), 0.5)
+    t[steep] = (0 - y0[idx][steep]) / dy[steep]
+    x_cross = x[idx] + t * (x[idx + 1] - x[idx])
+
+    # every original point shifts right by the number of crossings before it
+    shift = np.zeros(n, dtype=np.intp)
+    shift[idx + 1] = 1
+    orig_pos = np.arange(n) + np.cumsum(shift)
+    cross_pos = orig_pos[idx] + 1
+
+    size = n + len(idx)
+    new_x = np.empty(size, dtype=np.result_type(x, x_cross) if len(idx) else x.dtype)
+    new_y = np.empty(size, dtype=np.result_type(y, 0.0) if len(idx) else y.dtype)
+    color_val = np.empty(size, dtype=int)
+
+    new_x[orig_pos] = x
+    new_y[orig_pos] = y
+    color_val[orig_pos] = np.where(y < 0, 0, 1)
+    new_x[cross_pos] = x_cross
+    new_y[cross_pos] = 0.0
+    color_val[cross_pos] = rising[idx]
+    return new_x, new_y, color_val
+
+
+# Envelopes are drawn as straight ramps between mouse positions, so a sorted
+# list of (index, value) breakpoints describes them exactly. They are only
+# expanded to one value per sample where samples are actually replaced.
+Keypoints = namedtuple('Keypoints', ['index', 'value'])
+
+KEYPOINT_TOLERANCE = 1e-6  # well below one int16 step (3e-5) of the output WAV
+
+
+def dense_to_keypoints(dense, tolerance=KEYPOINT_TOLERANCE):
+    """
+    Breakpoints of a dense envelope: the ends plus every sample where the slope
+    changes. Linear interpolation through them reproduces every sample within
+    tolerance; samples that would drift further are kept as breakpoints too.
+    """
+    dense = np.asarray(dense, dtype=np.float64)
+    n = len(dense)
+    if n <= 2:
+        return Keypoints(np.arange(n), dense.copy())
+
+    bends = np.flatnonzero(np.abs(np.diff(dense, 2)) > tolerance) + 1
+    index = np.unique(np.concatenate([[0], bends, [n - 1]]))
+    samples = np.arange(n)
+    while True:
+        error = np.abs(np.interp(samples, index, dense[index]) - dense)
+        drift = np.flatnonzero(error > tolerance)
+        if len(drift) == 0:
+            return Keypoints(index, dense[index])
+        index = np.union1d(index, drift)
@@ -0,0 +1,67 @@
+"""
+natural_language_core.py
+
+Processing core of 🍘Natural_Language.py with no GUI or audio-device imports:
+wave synthesis, WAV loading and the envelope CSV. The interactive tool imports
+matplotlib and sounddevice lazily on top of this.
+
+Envelope application and sign subdivision come from envelope_engine, which
+the web app's application/dsp.py shares, so both tools run the same code.
+"""
+
+import csv
+
+import numpy as np
+from scipy.io import wavfile
+
+from envelope_engine import apply_envelope, dense_to_keypoints, strict_sign_subdivision  # noqa: F401
+
+
+##############################################################################
+# 1) WAVE SYNTHESIS / LOADING
+##############################################################################
+def synthesize_wave(wave_type="sine", freq=440.0, spw=100, periods=10):
+    """Returns (wave normalized to +-1, sample_rate, duration in seconds)."""
+    total_samples = spw * periods
+    sample_rate = int(freq * spw)
+    duration = periods / freq
+    t = np.linspace(0, duration, total_samples, endpoint=False)
+
+    if wave_type == "square":
+        wave = np.sign(np.sin(2 * np.pi * freq * t))
+    elif wave_type in ("triangle", "sawtooth"):
+        # scipy.signal is slow to import and only these two shapes need it
+        from scipy import signal
+
+        width = 0.5 if wave_type == "triangle" else 1
+        wave = signal.sawtooth(2 * np.pi * freq * t, width)
+    else:
+        wave = np.sin(2 * np.pi * freq * t)
+
+    wave /= np.max(np.abs(wave))
+    return wave, sample_rate, duration
+
+
+def load_wave(wav_file):
+    """Returns (sample_rate, mono audio normalized to +-1)."""
+    sample_rate, data = wavfile.read(wav_file)
+    if data.ndim > 1:
+        data = np.mean(data, axis=1)
+    return sample_rate, data.astype(float) / np.max(np.abs(data))
+
+
+##############################################################################
+# 2) ENVELOPE CSV
+##############################################################################
+def save_envelope_csv(csv_path, drawing_pos, drawing_neg):
+    """
+    Keypoint CSV: one row per breakpoint of either envelope instead of one per
+    sample (update_drawing only draws straight ramps). Interpolating each
+    column linearly over Index restores the full per-sample envelopes.
+    """
+    index = np.union1d(dense_to_keypoints(drawing_pos).index, dense_to_keypoints(drawing_neg).index)
+    with open(csv_path, "w", newline="") as f_:
+        writer = csv.writer(f_)
+        writer.writerow(["Index", "Positive", "Negative"])
+        for i in index:
+            writer.writerow([int(i), drawing_pos[i], drawing_neg[i]])
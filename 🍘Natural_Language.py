@@ -1,20 +1,27 @@
-import matplotlib
-
-# Disable the Matplotlib navigation toolbar so panning is gone
-matplotlib.rcParams["toolbar"] = "None"
-
 import os
 import sys
 import shutil
 import numpy as np
-import matplotlib.pyplot as plt
+
+from natural_language_core import (
+    synthesize_wave,
+    load_wave,
+    apply_envelope,
+    save_envelope_csv,
+    strict_sign_subdivision,
+)
 from scipy.io import wavfile
-import csv
-import sounddevice as sd
-from scipy import signal
-from matplotlib.collections import LineCollection
-from matplotlib.colors import ListedColormap, BoundaryNorm
-from matplotlib.widgets import Slider
+
+
+def _load_matplotlib():
+    """Imports pyplot on first use, with the navigation toolbar disabled."""
+    import matplotlib
+
+    # Disable the Matplotlib navigation toolbar so panning is gone
+    matplotlib.rcParams["toolbar"] = "None"
+    import matplotlib.pyplot as plt
+
+    return plt
 
 
 ##############################################################################
@@ -86,20 +93,7 @@ def generate_custom_wave():
         )
 
     total_samples = spw * periods
-    sample_rate = int(freq * spw)
-    duration = periods / freq
-    t = np.linspace(0, duration, total_samples, endpoint=False)
-
-    if wave_type == "square":
-        wave = np.sign(np.sin(2 * np.pi * freq * t))
-    elif wave_type == "triangle":
-        wave = signal.sawtooth(2 * np.pi * freq * t, 0.5)
-    elif wave_type == "sawtooth":
-        wave = signal.sawtooth(2 * np.pi * freq * t)
-    else:
-        wave = np.sin(2 * np.pi * freq * t)
-
-    wave /= np.max(np.abs(wave))
+    wave, sample_rate, duration = synthesize_wave(wave_type, freq, spw, periods)
 
     out_file = input(
         "Enter name for custom wave file (e.g. my_custom_signal.wav): "
@@ -192,47 +186,14 @@ def run_color_picker(default_bg, default_pos, default_neg):
 
 
 ##############################################################################
-# 3) STRICT SIGN SUBDIVISION HELPERS
+# 3) STRICT SIGN SUBDIVISION HELPERS (subdivision itself lives in natural_language_core)
 ##############################################################################
-def strict_sign_subdivision(x, y):
-    new_x = []
-    new_y = []
-    color_val = []
-
-    n = len(x)
-    if n == 0:
-        return np.array([]), np.array([]), np.array([])
-
-    def sign_color(val):
-        return 0 if val < 0 else 1
-
-    for i in range(n - 1):
-        xi, yi = x[i], y[i]
-        xip1, yip1 = x[i + 1], y[i + 1]
-
-        new_x.append(xi)
-        new_y.append(yi)
-        color_val.append(sign_color(yi))
-
-        if (yi < 0 and yip1 >= 0) or (yi >= 0 and yip1 < 0):
-            dy = yip1 - yi
-            t = (0 - yi) / dy if abs(dy) > 1e-12 else 0.5
-            x_cross = xi + t * (xip1 - xi)
-            crossing_color = 1 if (yi < 0 and yip1 >= 0) else 0
-            new_x.append(x_cross)
-            new_y.append(0.0)
-            color_val.append(crossing_color)
-
-    new_x.append(x[-1])
-    new_y.append(y[-1])
-    color_val.append(sign_color(y[-1]))
-
-    return np.array(new_x), np.array(new_y), np.array(color_val)
-
-
 def plot_strict_sign_colored_line(
     ax, xdata, ydata, neg_color, pos_color, linewidth=2, label="Modified Wave"
 ):
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import ListedColormap, BoundaryNorm
+
     sx, sy, cvals = strict_sign_subdivision(xdata, ydata)
     points = np.array([sx, sy]).T.reshape(-1, 1, 2)
     segments = np.concatenate([points[:-1], points[1:]], axis=1)
@@ -266,10 +227,7 @@ class EnvelopePlot:
         self.fig = self.ax.figure
         self.fig.patch.set_facecolor(self.canvas_bg_color)
 
-        self.sample_rate, data = wavfile.read(wav_file)
-        if data.ndim > 1:
-            data = np.mean(data, axis=1)
-        self.audio_data = data.astype(float) / np.max(np.abs(data))
+        self.sample_rate, self.audio_data = load_wave(wav_file)
         self.num_points = len(self.audio_data)
         self.max_amp = np.max(np.abs(self.audio_data))
 
@@ -398,12 +356,10 @@ class EnvelopePlot:
         self.ax.figure.canvas.draw_idle()
 
     def preview_envelope(self):
-        adjusted = np.copy(self.audio_data)
-        for i in range(len(adjusted)):
-            if adjusted[i] > 0:
-                adjusted[i] = self.drawing_pos[i] + self.offset
-            elif adjusted[i] < 0:
-                adjusted[i] = self.drawing_neg[i] + self.offset
+        # audio device is only opened when a preview is requested
+        import sounddevice as sd
+
+        adjusted = get_modified_wave(self)
         audio_int16 = (adjusted * 32767).astype(np.int16)
         sd.play(audio_int16, self.sample_rate)
         sd.wait()
@@ -441,13 +397,7 @@ class EnvelopePlot:
 
 
 def get_modified_wave(ep):
-    adjusted = np.copy(ep.audio_data)
-    for i in range(len(adjusted)):
-        if adjusted[i] > 0:
-            adjusted[i] = ep.drawing_pos[i] + ep.offset
-        elif adjusted[i] < 0:
-            adjusted[i] = ep.drawing_neg[i] + ep.offset
-    return adjusted
+    return apply_envelope(ep.audio_data, ep.drawing_pos, ep.drawing_neg, ep.offset)
 
 
 ##############################################################################
@@ -477,6 +427,8 @@ def process_single_file():
     shutil.copy(wf, new_folder)
     print(f"Copied {wf} to {new_folder}")
 
+    plt = _load_matplotlib()
+
     # =========== Drawing Canvas =============
     print("\n=== Drawing Canvas Color Picker ===")
     draw_bg, draw_pos, draw_neg = run_color_picker("#000000", "#00FF00", "#00FF00")
@@ -578,11 +530,7 @@ def process_single_file():
     print(f"final_drawing.svg saved to {final_svg_path}")
 
     csv_path = os.path.join(new_folder, "envelope.csv")
-    with open(csv_path, "w", newline="") as f_:
-        writer = csv.writer(f_)
-        writer.writerow(["Index", "Positive", "Negative"])
-        for i in range(ep.num_points):
-            writer.writerow([i, ep.drawing_pos[i], ep.drawing_neg[i]])
+    save_envelope_csv(csv_path, ep.drawing_pos, ep.drawing_neg)
     print(f"Envelope data saved to {csv_path}")
 
     mod_wave = get_modified_wave(ep)